@@ -0,0 +1,266 @@
+"""
+Record the bytes a connection receives and play them back later.
+
+A capture log starts with a 16 byte header (magic, version, whether the
+frames are masked, creation time in ns) followed by one record per chunk
+read from the transport: an 8 byte timestamp in ns, a 4 byte length and
+the chunk as it arrived. The chunks are kept exactly as they were read,
+so a replay cuts the frames at the same places. Records are only ever
+appended; the offset of every record goes to a second file, `<log>.idx`.
+All numbers are little endian, both files can be memory-mapped.
+
+    capture = Capture('feed.cap')
+    aws = AioWebSocket(uri, capture=capture)
+    ...
+    capture.close()
+
+    with CaptureLog('feed.cap') as log:
+        converse = replay(log)
+        while True:
+            message = await converse.receive()
+"""
+import asyncio
+import mmap
+import sys
+import time
+from array import array
+from struct import Struct
+
+from .converses import Converse
+
+
+MAGIC = b'AWSCAP'
+VERSION = 1
+HEADER = Struct('<6sBBQ')
+RECORD = Struct('<QI')
+OFFSET = Struct('<Q')
+
+
+class Capture:
+    """Append-only log of the chunks received by connections.
+    Frames opens it when a connection starts and records every chunk
+    read from the transport into the Capture `open` returned. Writes are
+    buffered, `close` (or leaving a with block) flushes them.
+
+    The first connection is logged to `path`. One Capture can be given
+    to a server, a pool or a ReconnectingWebSocket: every further
+    connection gets a log of its own, `path` numbered with the
+    connection count if it contains `{n}`, `path.1`, `path.2` ...
+    otherwise. `paths` lists the logs written.
+    """
+    def __init__(self, path: str, buffering: int = 2**16):
+        self.path = path
+        self.buffering = buffering
+        self.file = None
+        self.index = None
+        self.offset = 0
+        self.count = 0
+        self.paths = []
+        self.children = []
+
+    def log_path(self, number: int) -> str:
+        if '{n}' in self.path:
+            return self.path.format(n=number)
+        return '{}.{}'.format(self.path, number) if number else self.path
+
+    def open(self, masked: bool = False) -> 'Capture':
+        """Start the log of one more connection and return the Capture
+        recording it, `masked` for the client frames a server receives"""
+        path = self.log_path(len(self.paths))
+        capture = self if not self.paths else Capture(path, self.buffering)
+        capture.start(path, masked)
+        self.paths.append(path)
+        if capture is not self:
+            self.children.append(capture)
+        return capture
+
+    def start(self, path: str, masked: bool):
+        self.file = open(path, 'wb', buffering=self.buffering)
+        self.index = open(path + '.idx', 'wb', buffering=self.buffering)
+        self.file.write(HEADER.pack(MAGIC, VERSION, 1 if masked else 0, time.time_ns()))
+        self.offset = HEADER.size
+
+    def record(self, data):
+        length = len(data)
+        self.file.write(RECORD.pack(time.time_ns(), length))
+        self.file.write(data)
+        self.index.write(OFFSET.pack(self.offset))
+        self.offset += RECORD.size + length
+        self.count += 1
+
+    def flush(self):
+        if self.file is not None:
+            self.file.flush()
+            self.index.flush()
+        for capture in self.children:
+            capture.flush()
+
+    def close(self):
+        if self.file is not None:
+            self.file.close()
+            self.index.close()
+        for capture in self.children:
+            capture.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+
+class CaptureLog:
+    """A capture log mapped into memory.
+    `log[i]` is the (timestamp_ns, chunk) of record i, the chunk is a
+    memoryview into the mapping and only valid until `close`. Without
+    an index file, or with one that is behind the log, the records are
+    found by walking the log once.
+    """
+    def __init__(self, path: str):
+        self.path = path
+        with open(path, 'rb') as file:
+            self.map = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, masked, self.created = HEADER.unpack_from(self.map)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError('{} is not a capture log'.format(path))
+        self.masked = bool(masked)
+        self.index_map = None
+        self.offsets = self.load_index(path + '.idx')
+
+    def load_index(self, path: str):
+        try:
+            with open(path, 'rb') as file:
+                self.index_map = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        except (OSError, ValueError):
+            # no index, or an empty one
+            return self.scan()
+        if sys.byteorder == 'little':
+            offsets = memoryview(self.index_map)[:len(self.index_map) // 8 * 8].cast('Q')
+        else:
+            offsets = array('Q', self.index_map[:len(self.index_map) // 8 * 8])
+            offsets.byteswap()
+        if len(offsets) and self.end(offsets[-1]) > len(self.map):
+            # the last records were indexed but never made it to the log
+            return self.scan()
+        return offsets
+
+    def scan(self):
+        offsets, position, size = array('Q'), HEADER.size, len(self.map)
+        while position + RECORD.size <= size:
+            end = self.end(position)
+            if end > size:
+                break
+            offsets.append(position)
+            position = end
+        return offsets
+
+    def end(self, offset: int) -> int:
+        """Offset right after the record at `offset`"""
+        return offset + RECORD.size + RECORD.unpack_from(self.map, offset)[1]
+
+    def __len__(self):
+        return len(self.offsets)
+
+    def __getitem__(self, position: int):
+        offset = self.offsets[position]
+        timestamp, length = RECORD.unpack_from(self.map, offset)
+        start = offset + RECORD.size
+        return timestamp, memoryview(self.map)[start:start + length]
+
+    def __iter__(self):
+        for position in range(len(self.offsets)):
+            yield self[position]
+
+    @property
+    def duration(self) -> float:
+        """Seconds from the first to the last record"""
+        if not len(self):
+            return 0.0
+        return (self[-1][0] - self[0][0]) / 1e9
+
+    def close(self):
+        if isinstance(self.offsets, memoryview):
+            self.offsets.release()
+        for mapping in (self.index_map, self.map):
+            if mapping is not None:
+                try:
+                    mapping.close()
+                except BufferError:
+                    # chunks handed out are still in use, the mapping goes with them
+                    pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+
+class ReplayReader:
+    """Stand-in for a StreamReader which returns the recorded chunks.
+    With a `speed` every chunk is held back until its time has come,
+    1.0 being the recorded pace; without one they come as fast as the
+    consumer reads them. An empty chunk marks the end of the log.
+    """
+    def __init__(self, log: CaptureLog, speed: float = None):
+        self.log = log
+        self.speed = speed
+        self.position = 0
+        self.rest = None
+        self.origin = None
+
+    async def read(self, n: int = -1):
+        chunk = self.rest
+        self.rest = None
+        if chunk is None:
+            if self.position >= len(self.log):
+                return b''
+            timestamp, chunk = self.log[self.position]
+            self.position += 1
+            if self.speed is not None:
+                await self.wait(timestamp)
+        if 0 <= n < len(chunk):
+            chunk, self.rest = chunk[:n], chunk[n:]
+        return chunk
+
+    async def wait(self, timestamp: int):
+        loop = asyncio.get_event_loop()
+        if self.origin is None:
+            self.origin = (loop.time(), timestamp)
+        due = self.origin[0] + (timestamp - self.origin[1]) / 1e9 / self.speed
+        delay = due - loop.time()
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+    def at_eof(self):
+        return self.rest is None and self.position >= len(self.log)
+
+
+class NullWriter:
+    """Writer of a replayed connection, whatever it sends is dropped"""
+    transport = None
+
+    def write(self, data):
+        pass
+
+    def writelines(self, data):
+        pass
+
+    async def drain(self):
+        pass
+
+    def is_closing(self):
+        return False
+
+    def close(self):
+        pass
+
+    def get_extra_info(self, name, default=None):
+        return default
+
+
+def replay(log: CaptureLog, speed: float = None, **options) -> Converse:
+    """A Converse reading from a capture log, see ReplayReader for `speed`.
+    Remaining keyword arguments go to the Converse; a log of compressed
+    frames needs the negotiated extension set on `converse.frame`."""
+    return Converse(ReplayReader(log, speed), NullWriter(), server=log.masked, **options)
@@ -0,0 +1,127 @@
+import asyncio
+import socket
+import ssl
+import time
+
+from .parts import parse_uri
+
+
+class ResumingSSLContext(ssl.SSLContext):
+    """SSLContext that offers the last TLS session of a host again.
+
+    asyncio wraps every connection with `wrap_bio`, the stored session is
+    passed there, so a reconnect can skip the full TLS handshake when
+    the server supports resumption. Sessions are stored by `remember`
+    once a connection has been established.
+    """
+    def __new__(cls, protocol=ssl.PROTOCOL_TLS_CLIENT, *args, **kwargs):
+        context = super().__new__(cls, protocol, *args, **kwargs)
+        context.sessions = {}
+        return context
+
+    def wrap_bio(self, incoming, outgoing, server_side=False,
+                 server_hostname=None, session=None):
+        if session is None and not server_side:
+            session = self.sessions.get(server_hostname)
+        return super().wrap_bio(incoming, outgoing, server_side=server_side,
+                                server_hostname=server_hostname, session=session)
+
+    def remember(self, server_hostname: str, ssl_object):
+        """Keep the session of an established connection"""
+        if ssl_object is not None and ssl_object.session is not None:
+            self.sessions[server_hostname] = ssl_object.session
+
+
+def create_ssl_context(cafile=None, capath=None, cadata=None):
+    """Build a ResumingSSLContext with the settings
+    of ssl.create_default_context"""
+    context = ResumingSSLContext(ssl.PROTOCOL_TLS_CLIENT)
+    if cafile or capath or cadata:
+        context.load_verify_locations(cafile, capath, cadata)
+    else:
+        context.load_default_certs(ssl.Purpose.SERVER_AUTH)
+    return context
+
+
+_ssl_context = None
+
+
+def default_ssl_context():
+    """The SSLContext shared by every wss connection of the process"""
+    global _ssl_context
+    if _ssl_context is None:
+        _ssl_context = create_ssl_context()
+    return _ssl_context
+
+
+class Resolver:
+    """DNS cache keyed on (host, port) with a time to live.
+    Concurrent lookups of the same host share one getaddrinfo call,
+    so a reconnect storm resolves every host only once.
+    """
+    def __init__(self, ttl: float = 60):
+        self.ttl = ttl
+        self.cache = {}
+        self.lookups = {}
+
+    async def resolve(self, host: str, port: int):
+        """Return the addresses of a host, newest lookup first"""
+        key = (host, port)
+        cached = self.cache.get(key)
+        if cached is not None and cached[0] > time.monotonic():
+            return cached[1]
+        lookup = self.lookups.get(key)
+        if lookup is None:
+            lookup = asyncio.ensure_future(self.lookup(host, port))
+            self.lookups[key] = lookup
+            lookup.add_done_callback(lambda _: self.lookups.pop(key, None))
+        return await asyncio.shield(lookup)
+
+    async def lookup(self, host: str, port: int):
+        loop = asyncio.get_event_loop()
+        infos = await loop.getaddrinfo(host, port, type=socket.SOCK_STREAM)
+        addresses = []
+        for family, kind, proto, canonname, sockaddr in infos:
+            if sockaddr[0] not in addresses:
+                addresses.append(sockaddr[0])
+        self.cache[(host, port)] = (time.monotonic() + self.ttl, addresses)
+        return addresses
+
+    def clear(self):
+        self.cache.clear()
+
+
+resolver = Resolver()
+
+
+async def prewarm(uris, handshake: bool = False, timeout: float = 10,
+                  context: ResumingSSLContext = None):
+    """Resolve the hosts of `uris` and prepare the shared SSLContext ahead
+    of time. With `handshake` a TLS connection is opened to every wss
+    host as well, so the first real connection can resume its session.
+    Return the errors of hosts that could not be warmed, keyed by uri.
+    """
+    context = context or default_ssl_context()
+
+    async def warm(uri):
+        scheme, host, port, resource, secure = parse_uri(uri)
+        addresses = await resolver.resolve(host, port)
+        if secure and handshake:
+            reader, writer = await asyncio.open_connection(
+                addresses[0], port, ssl=context, server_hostname=host)
+            ssl_object = writer.get_extra_info('ssl_object')
+            # TLS 1.3 servers send the session ticket after the handshake
+            for _ in range(100):
+                if ssl_object.session is not None and ssl_object.session.has_ticket:
+                    break
+                await asyncio.sleep(0.001)
+            context.remember(host, ssl_object)
+            writer.close()
+
+    errors = {}
+    results = await asyncio.gather(*[asyncio.wait_for(warm(uri), timeout) for uri in uris],
+                                   return_exceptions=True)
+    for uri, result in zip(uris, results):
+        if isinstance(result, BaseException):
+            errors[uri] = result
+    return errors
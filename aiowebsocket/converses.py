@@ -1,21 +1,41 @@
 import asyncio
 import logging
-from asyncio import Queue
+import time
 
-from .freams import Frames
-from .enumerations import SocketState, ControlFrames, DataFrames
+from .freams import Frames, PreparedMessage, prepared_messages
+from .connectors import ResumingSSLContext, default_ssl_context, resolver
+from .enumerations import SocketState, ControlFrames, DataFrames, CloseCodes
+from .exceptions import FrameError
+from .extensions import PerMessageDeflate
 from .handshakes import HandShake
+from .heartbeats import Heartbeat, default_heartbeat
+from .metrics import Metrics
+from .offloads import Offload
 from .parts import parse_uri
+from .protocols import WebSocketProtocol
+from .queues import MessageQueue
+from .serializers import Codec, get_codec
 
 
 class AioWebSocket:
     """Responsible for managing the
     connection between client and server
     """
+    __slots__ = ('uri', 'hands', 'reader', 'writer', 'converse', 'timeout', 'read_timeout',
+                 'headers', 'union_header', 'raw_protocol', 'reader_task', 'coalesce',
+                 'compression', 'ssl', 'address', 'dns_cache', 'heartbeat', 'metrics', 'codec',
+                 'offload', 'subprotocols', 'subprotocol', 'close_timeout', 'capture', 'max_size',
+                 'state')
 
     def __init__(self, uri: str, headers: list = [],
                  union_header: dict = {}, timeout: int = 30,
-                 read_timeout: int = 120):
+                 read_timeout: int = 120, raw_protocol: bool = False,
+                 reader_task: bool = False, coalesce: bool = False,
+                 compression: PerMessageDeflate = None,
+                 ssl=None, address: str = None, dns_cache: bool = True,
+                 heartbeat: Heartbeat = None, metrics: Metrics = None,
+                 codec: Codec = None, offload: Offload = None, subprotocols: list = None,
+                 close_timeout: float = 5, capture=None, max_size: int = 2**24):
         self.uri = uri
         self.hands = None
         self.reader = None
@@ -25,18 +45,52 @@ class AioWebSocket:
         self.read_timeout = read_timeout
         self.headers = headers
         self.union_header = union_header
+        self.raw_protocol = raw_protocol
+        self.reader_task = reader_task
+        self.coalesce = coalesce
+        self.compression = compression
+        self.ssl = ssl
+        self.address = address
+        self.dns_cache = dns_cache
+        self.heartbeat = default_heartbeat() if heartbeat is True else heartbeat
+        # a Metrics that is passed in aggregates, the connection counts in its own child
+        if metrics is True:
+            metrics = Metrics()
+        elif metrics is not None:
+            metrics = metrics.child()
+        self.metrics = metrics
+        self.codec = codec
+        self.offload = offload
+        self.subprotocols = subprotocols
+        # the subprotocol the server selected
+        self.subprotocol = None
+        self.close_timeout = close_timeout
+        # a captures.Capture recording what the server sends
+        self.capture = capture
+        # the largest message accepted from the server
+        self.max_size = max_size
         self.state = SocketState.zero.value
 
-    async def close_connection(self):
+    async def close_connection(self, code: int = CloseCodes.normal.value, reason: str = '',
+                               timeout: float = None) -> bool:
         """Close connection.
         Check connection status before closing.
-        Send Closed Frame to Server.
+        Send a Close frame to the server and wait for its answer, at most
+        `timeout` seconds (close_timeout by default). Return whether the
+        server answered, the connection is aborted otherwise.
         """
         if self.state is SocketState.closed.value:
             raise ConnectionError('SocketState is closed, can not close.')
-        if self.state is SocketState.closing:
+        if self.state is SocketState.closing.value:
             logging.warning('SocketState is closing')
-        await self.converse.send(message=b'')
+        self.state = SocketState.closing.value
+        if self.heartbeat is not None:
+            self.heartbeat.unregister(self.converse)
+        try:
+            return await self.converse.close(code, reason,
+                                             self.close_timeout if timeout is None else timeout)
+        finally:
+            self.state = SocketState.closed.value
 
     async def create_connection(self):
         """Create connection.
@@ -46,19 +100,81 @@ class AioWebSocket:
         if self.state is not SocketState.zero.value:
             raise ConnectionError('Connection is already exists.')
         remote = scheme, host, port, resource, ssl = parse_uri(self.uri)
-        reader, writer = await asyncio.open_connection(host=host, port=port, ssl=ssl)
+        reader, writer = await self.open(host, port, ssl)
         self.reader = reader
         self.writer = writer
         self.hands = HandShake(remote, reader, writer,
                                headers=self.headers,
-                               union_header=self.union_header)
+                               union_header=self.union_header,
+                               extensions=[self.compression] if self.compression else None,
+                               subprotocols=self.subprotocols)
+        started = time.perf_counter()
         await self.hands.shake_()
         status_code = await self.hands.shake_result()
-        if status_code is not 101:
+        if self.metrics is not None:
+            self.metrics.observe('handshake', time.perf_counter() - started)
+        if status_code != 101:
             raise ConnectionError('Connection failed,status code:{code}'.format(code=status_code))
-        self.converse = Converse(reader, writer)
+        if ssl and isinstance(self.ssl_context, ResumingSSLContext):
+            self.ssl_context.remember(host, writer.get_extra_info('ssl_object'))
+        self.converse = Converse(None if self.raw_protocol else reader, writer,
+                                 coalesce=self.coalesce, metrics=self.metrics,
+                                 codec=self.codec, offload=self.offload, capture=self.capture,
+                                 max_size=self.max_size)
+        if self.metrics is not None:
+            self.metrics.watch(self.converse)
+        for extension in self.hands.negotiate():
+            self.converse.frame.extension = extension
+        self.subprotocol = self.hands.subprotocol
+        # nothing of the handshake is needed any more
+        self.hands = None
+        if self.raw_protocol:
+            writer.upgrade(self.converse)
+        elif self.reader_task:
+            self.converse.start_reader()
+        if self.heartbeat is not None:
+            self.heartbeat.register(self.converse)
         self.state = SocketState.opened.value
 
+    @property
+    def ssl_context(self):
+        return self.ssl or default_ssl_context()
+
+    async def open(self, host: str, port: int, ssl: bool):
+        """Open the TCP (and TLS) connection.
+        wss connections use the process-wide SSLContext unless `ssl` was
+        given, addresses come from the DNS cache unless `address` was
+        given; they are tried in order until one accepts.
+        """
+        options = {'port': port}
+        if ssl:
+            options['ssl'] = self.ssl_context
+            options['server_hostname'] = host
+        if self.address:
+            addresses = [self.address]
+        elif self.dns_cache:
+            addresses = await resolver.resolve(host, port)
+        else:
+            addresses = [host]
+        for index, address in enumerate(addresses):
+            try:
+                if self.raw_protocol:
+                    loop = asyncio.get_event_loop()
+                    _, protocol = await loop.create_connection(WebSocketProtocol, host=address, **options)
+                    return protocol, protocol
+                return await asyncio.open_connection(host=address, **options)
+            except OSError:
+                if index == len(addresses) - 1:
+                    raise
+
+    @property
+    def connected(self):
+        """Whether the transport is still open in both directions"""
+        if self.writer is None or self.writer.is_closing():
+            return False
+        at_eof = getattr(self.reader, 'at_eof', None)
+        return not (at_eof is not None and at_eof())
+
     @property
     def manipulator(self):
         return self.converse
@@ -78,33 +194,497 @@ class AioWebSocket:
 class Converse:
     """Responsible for communication
     between client and server
+
+    A received message may not exceed `max_size` bytes, as a frame, as
+    fragments put together or inflated; larger ones raise FrameError.
     """
-    def __init__(self, reader: object, writer: object, maxsize: int = 2**16):
+    __slots__ = ('reader', 'writer', 'coalesce', 'pending', 'pending_bytes', 'fragmented',
+                 'receive_buffer', 'codec', 'flush_handle', 'flushes', 'write_high', 'write_low',
+                 'message_queue', 'frame', 'offload', 'send_lock', 'reader_task', '__weakref__')
+    def __init__(self, reader: object, writer: object, maxsize: int = 2**16,
+                 maxbytes: int = 2**24, coalesce: bool = False,
+                 write_high: int = 2**16, write_low: int = None, metrics: Metrics = None,
+                 codec: Codec = None, offload: Offload = None, server: bool = False,
+                 capture=None, max_size: int = 2**24):
         self.reader = reader
         self.writer = writer
-        self.message_queue = Queue(maxsize=maxsize)
-        self.frame = Frames(self.reader, self.writer)
+        self.coalesce = coalesce
+        # coalesced buffers and the receive_view buffer only exist once used
+        self.pending = None
+        self.pending_bytes = 0
+        self.fragmented = False
+        self.receive_buffer = None
+        # a codec name or None for the fastest JSON codec installed
+        self.codec = codec if isinstance(codec, Codec) else get_codec(codec)
+        self.flush_handle = None
+        self.flushes = 0
+        self.write_high = write_high
+        self.write_low = write_high // 4 if write_low is None else write_low
+        self.message_queue = MessageQueue(maxsize=maxsize, maxbytes=maxbytes,
+                                          on_pause=self.pause_reading,
+                                          on_resume=self.resume_reading,
+                                          metrics=metrics)
+        self.frame = Frames(self.reader, self.writer, maxsize=max_size, metrics=metrics,
+                            offload=offload, server=server, capture=capture)
+        self.offload = offload
+        # offloaded sends finish out of order, the lock keeps frames in compression order
+        self.send_lock = asyncio.Lock() if offload is not None else None
+        self.reader_task = None
+        self.set_write_limits()
+
+    def pause_reading(self):
+        transport = getattr(self.writer, 'transport', None)
+        if transport is not None and not transport.is_closing():
+            transport.pause_reading()
+
+    def resume_reading(self):
+        transport = getattr(self.writer, 'transport', None)
+        if transport is not None and not transport.is_closing():
+            transport.resume_reading()
+
+    def start_reader(self, mask=False):
+        """Read frames in a background task from now on.
+        Control frames are answered as soon as they arrive, data frames
+        wait in the message queue until `receive` picks them up."""
+        if self.reader_task is None and self.reader is not None:
+            self.reader_task = asyncio.ensure_future(self.read_forever(mask))
+
+    def stop_reader(self):
+        if self.reader_task is not None:
+            self.reader_task.cancel()
+            self.reader_task = None
+
+    async def read_forever(self, mask=False):
+        """Body of the background reader task"""
+        queue = self.message_queue
+        try:
+            while True:
+                if queue.paused:
+                    await queue.wait_resumed()
+                frame = await self.frame.unpack_frame(mask)
+                if frame.code in DataFrames._value2member_map_:
+                    queue.put_nowait(frame)
+                else:
+                    await self.frame.extra_operation(frame.code, frame.message)
+        except asyncio.CancelledError:
+            raise
+        except Exception as exc:
+            queue.put_nowait(exc)
+            self.frame.connection_lost(exc)
+
+    @property
+    def queued(self):
+        """Whether messages arrive through the message queue
+        (raw protocol mode or background reader) instead of
+        being read on demand"""
+        return self.reader is None or self.reader_task is not None
+
+    def set_write_limits(self, high: int = None, low: int = None):
+        """Set the write buffer watermarks.
+        `send` waits for the transport once more than `high` bytes are
+        buffered and continues when it drained below `low`."""
+        if high is not None:
+            self.write_high = high
+        if low is not None:
+            self.write_low = low
+        transport = getattr(self.writer, 'transport', None)
+        if transport is not None:
+            transport.set_write_buffer_limits(high=self.write_high, low=self.write_low)
 
     async def send(self, message,
-                   fin: bool = True, mask: bool = True):
-        """Send message to server """
+                   fin: bool = True, mask: bool = True, code: int = None):
+        """Send message to server
+        As a text frame unless another opcode is given. A message sent
+        with `fin` false is continued by the following sends, which go
+        out as continuation frames until one of them has `fin` set.
+        """
+        if self.send_lock is not None:
+            async with self.send_lock:
+                await self.send_frame(message, fin, mask, code)
+        else:
+            await self.send_frame(message, fin, mask, code)
 
+    async def send_frame(self, message, fin: bool = True, mask: bool = True, code: int = None):
+        """Body of send, runs with the send lock held if there is one"""
         if isinstance(message, str):
             message = message.encode()
-        code = DataFrames.text.value
-        await self.frame.write(fin=fin, code=code, message=message, mask=mask)
+        offloaded = self.offload is not None and self.offload.wanted(len(message))
+        rsv1 = 0
+        if self.fragmented:
+            code = DataFrames.cont.value
+        else:
+            if code is None:
+                code = DataFrames.text.value
+            if fin and offloaded:
+                message, rsv1 = await self.offload.run_thread(self.frame.compress, message)
+            elif fin:
+                message, rsv1 = self.frame.compress(message)
+        self.fragmented = not fin
+        if offloaded:
+            buffers = await self.offload.run_thread(self.frame.encode, fin, code, message, mask, rsv1)
+        else:
+            buffers = self.frame.encode(fin=fin, code=code, message=message, mask=mask, rsv1=rsv1)
+        self.write_buffers(buffers)
+        await self.drain()
+
+    def write_buffers(self, buffers):
+        """Write the buffers of one frame, or gather them when coalescing"""
+        if self.coalesce:
+            if self.pending is None:
+                self.pending = []
+            self.pending.extend(buffers)
+            self.pending_bytes += sum(len(buffer) for buffer in buffers)
+            if self.flush_handle is None:
+                self.flush_handle = asyncio.get_event_loop().call_soon(self.flush)
+        else:
+            for buffer in buffers:
+                self.writer.write(buffer)
+            self.flushes += 1
+
+    async def send_prepared(self, message, mask: bool = True, code: int = None):
+        """Send a message whose frame is encoded once for many sends.
+        `message` is a PreparedMessage, or bytes or str that are looked up
+        in the process-wide prepared_messages cache. It is sent whole and
+        uncompressed.
+        """
+        if self.send_lock is not None:
+            async with self.send_lock:
+                await self.send_prepared_frame(message, mask, code)
+        else:
+            await self.send_prepared_frame(message, mask, code)
+
+    async def send_prepared_frame(self, message, mask: bool = True, code: int = None):
+        """Body of send_prepared, runs with the send lock held if there is one"""
+        if self.fragmented:
+            raise FrameError('A fragmented message is still being sent')
+        if not isinstance(message, PreparedMessage):
+            message = prepared_messages.get(message, DataFrames.text.value if code is None else code)
+        self.write_buffers(self.frame.encode_prepared(message, mask))
+        await self.drain()
+
+    async def send_text(self, message: str, fin: bool = True, mask: bool = True):
+        """Send a str (or UTF-8 bytes) as a text frame"""
+        await self.send(message, fin, mask, code=DataFrames.text.value)
+
+    async def send_binary(self, message, fin: bool = True, mask: bool = True):
+        """Send bytes, bytearray or memoryview as a binary frame,
+        the receiver needs no text decoding"""
+        await self.send(message, fin, mask, code=DataFrames.binary.value)
+
+    async def send_many(self, messages, mask: bool = True, code: int = None):
+        """Send several messages with a single transport write"""
+        if self.send_lock is not None:
+            async with self.send_lock:
+                await self.send_many_frames(messages, mask, code)
+        else:
+            await self.send_many_frames(messages, mask, code)
+
+    async def send_many_frames(self, messages, mask: bool = True, code: int = None):
+        """Body of send_many, runs with the send lock held if there is one"""
+        if self.fragmented:
+            raise FrameError('A fragmented message is still being sent')
+        if code is None:
+            code = DataFrames.text.value
+        for message in messages:
+            if isinstance(message, str):
+                message = message.encode()
+            message, rsv1 = self.frame.compress(message)
+            buffers = self.frame.encode(fin=True, code=code, message=message, mask=mask, rsv1=rsv1)
+            if self.pending is None:
+                self.pending = []
+            self.pending.extend(buffers)
+            self.pending_bytes += sum(len(buffer) for buffer in buffers)
+        self.flush()
+        await self.drain()
+
+    def flush(self):
+        """Write every frame gathered by coalescing at once"""
+        if self.flush_handle is not None:
+            self.flush_handle.cancel()
+            self.flush_handle = None
+        if self.pending:
+            pending, self.pending, self.pending_bytes = self.pending, None, 0
+            self.writer.writelines(pending)
+            self.flushes += 1
 
-    async def receive(self, text=False, mask=False):
+    async def drain(self):
+        """Wait for the transport while too much is buffered"""
+        if self.get_write_buffer_size > self.write_high:
+            self.flush()
+            await self.writer.drain()
+
+    @property
+    def get_write_buffer_size(self):
+        """Bytes handed to send but not yet taken by the kernel"""
+        transport = getattr(self.writer, 'transport', None)
+        buffered = transport.get_write_buffer_size() if transport is not None else 0
+        return buffered + self.pending_bytes
+
+    async def close(self, code: int = CloseCodes.normal.value, reason: str = '',
+                    timeout: float = 5) -> bool:
+        """Close handshake: send a Close frame with `code` and `reason`,
+        wait at most `timeout` seconds for the peer's Close frame and end
+        the TCP connection. Return whether the peer answered in time,
+        a connection that did not is aborted.
+        """
+        started = time.perf_counter()
+        frames = self.frame
+        self.flush()
+        clean = frames.close_code is not None
+        try:
+            if not clean and not self.writer.is_closing():
+                frames.send_close(code, reason)
+                try:
+                    await asyncio.wait_for(self.wait_close(), timeout)
+                    clean = True
+                except (asyncio.TimeoutError, asyncio.IncompleteReadError, ConnectionError,
+                        FrameError):
+                    pass
+        finally:
+            # whatever went wrong, the connection does not stay open
+            self.stop_reader()
+            if clean:
+                self.writer.close()
+            else:
+                transport = getattr(self.writer, 'transport', None)
+                if transport is not None:
+                    transport.abort()
+            if frames.metrics is not None:
+                frames.metrics.closed(clean, time.perf_counter() - started)
+        return clean
+
+    async def wait_close(self):
+        """Wait for the Close frame of the peer, data
+        frames arriving before it are dropped. While another task is
+        reading, that task gets the Close frame and resolves the wait."""
+        if self.queued or self.frame.reading:
+            await self.frame.wait_close()
+            return
+        frames = self.frame
+        while frames.close_code is None:
+            frame = await frames.unpack_frame()
+            if frame.code not in DataFrames._value2member_map_:
+                await frames.extra_operation(frame.code, frame.message)
+
+    async def receive(self, text=False, mask=False, control=True):
         """Get a message
-        If there is no message in the message queue,
-        try to read it or pop up directly from the message queue
+        Pop it from the message queue if there is one waiting,
+        otherwise read it straight from the frame parser.
+        When the queue is filled by the protocol or the background
+        reader this only waits for it, control frames never reach it.
+        With `control` false control frames are skipped when reading
+        on demand as well.
         """
-        if not self.message_queue.qsize():
-            single_message = await self.frame.read(text, mask)
-            await self.message_queue.put(single_message)
-        message = await self.message_queue.get()
+        if self.message_queue.qsize() or self.queued:
+            frame = None
+            while frame is None:
+                frame = self.frame.assemble(await self.queued_frame())
+            if self.offload is not None and self.offload.wanted(len(frame.message)):
+                message = await self.offload.complete(self.frame, frame, text)
+            else:
+                message = self.frame.complete(frame, text)
+        else:
+            message = await self.frame.read(text, mask, control=control)
         return message or None
 
+    async def receive_stream(self, mask=False):
+        """Iterate over the payload of the next message chunk by chunk,
+        one chunk per frame of a fragmented message:
+
+            async for chunk in converse.receive_stream():
+                ...
+        """
+        if self.message_queue.qsize() or self.queued:
+            frame = await self.queued_frame()
+            if frame.code == DataFrames.cont:
+                raise FrameError('Continuation frame without a message to continue')
+            extension = self.frame.extension if frame.rsv1 else None
+            while True:
+                if extension is not None:
+                    yield extension.decode(frame.message, frame.fin, self.frame.maxsize)
+                else:
+                    yield frame.message
+                if frame.fin:
+                    return
+                frame = await self.queued_frame()
+                if frame.code != DataFrames.cont:
+                    raise FrameError('Expected a continuation frame')
+        else:
+            async for chunk in self.frame.stream(mask):
+                yield chunk
+
+    async def send_obj(self, obj, mask: bool = True):
+        """Serialize an object with the codec and send it"""
+        await self.send(self.codec.encode(obj), mask=mask, code=self.codec.opcode)
+
+    async def receive_obj(self, mask=False):
+        """Decode the next message with the codec,
+        straight from the received bytes"""
+        message = await self.receive(mask=mask, control=False) or b''
+        if self.offload is not None and self.offload.wanted(len(message)):
+            return await self.offload.run(self.codec.decode, message)
+        return self.codec.decode(message)
+
+    async def receive_objs(self, limit: int = None, mask=False) -> list:
+        """Wait for the next message, then decode it together with every
+        complete message that was received already (at most `limit`)
+        with a single call of the codec"""
+        messages = [await self.receive(mask=mask, control=False) or b'']
+        messages.extend(await self.ready_messages(None if limit is None else limit - 1))
+        return self.codec.decode_many(messages)
+
+    async def ready_messages(self, limit: int = None) -> list:
+        """Return the payloads of the messages which are complete
+        already, without waiting for more to arrive"""
+        messages = []
+        queue, frames = self.message_queue, self.frame.frames
+        while limit is None or len(messages) < limit:
+            if queue.qsize():
+                frame = queue.get_nowait()
+                if isinstance(frame, Exception):
+                    queue.put_nowait(frame)
+                    break
+            elif frames and not self.queued:
+                frame = self.frame.own(frames.popleft())
+                if frame.code not in DataFrames._value2member_map_:
+                    await self.frame.extra_operation(frame.code, frame.message)
+                    continue
+            else:
+                break
+            frame = self.frame.assemble(frame)
+            if frame is not None:
+                messages.append(self.frame.complete(frame))
+        return messages
+
+    async def receive_into(self, buffer, mask=False) -> int:
+        """Copy the payload of the next data message into `buffer` and
+        return its length, like socket.recv_into. The frames of a
+        fragmented message are written straight into the buffer. A
+        message which does not fit is read to its end and dropped,
+        then ValueError is raised.
+        """
+        size = 0
+        with memoryview(buffer) as view, view.cast('B') as target:
+            capacity = len(target)
+
+            def write(chunk):
+                nonlocal size
+                end = size + len(chunk)
+                if end <= capacity:
+                    target[size:end] = chunk
+                size = end
+            await self.read_chunks(write, mask)
+        if size > capacity:
+            raise ValueError('Message of {} bytes does not fit into {} bytes'.format(
+                size, capacity))
+        return size
+
+    async def receive_view(self, mask=False) -> memoryview:
+        """Return the payload of the next data message as a memoryview,
+        so no buffer is allocated per message. A message that came in
+        one uncompressed frame is not copied at all: read on demand it
+        is a view into the chunk read from the transport, from the
+        queue a view of the frame's payload. Other messages are joined
+        in a receive buffer which is reused by every call, that view
+        is only valid until the next call. The buffer grows to the
+        largest such message seen.
+        """
+        frame = await self.data_frame(mask, view=True)
+        if frame.fin and not (frame.rsv1 and self.frame.extension is not None):
+            if frame.code == DataFrames.cont:
+                raise FrameError('Continuation frame without a message to continue')
+            return memoryview(frame.message)
+        size = 0
+
+        def write(chunk):
+            nonlocal size
+            end = size + len(chunk)
+            buffer = self.receive_buffer
+            if buffer is None:
+                buffer = self.receive_buffer = bytearray(end)
+            elif end > len(buffer):
+                # a new buffer, the old one may still be exported by a view
+                grown = bytearray(max(end, 2 * len(buffer)))
+                grown[:size] = memoryview(buffer)[:size]
+                buffer = self.receive_buffer = grown
+            buffer[size:end] = chunk
+            size = end
+        await self.read_chunks(write, mask, frame)
+        return memoryview(self.receive_buffer)[:size]
+
+    async def read_chunks(self, write, mask=False, frame=None):
+        """Pass the payload of the next data message to `write` frame by
+        frame, control frames in between are handled. Unlike
+        receive_stream there is no async generator to resume per frame.
+        The chunks may be views into the data read from the transport,
+        they are only valid during the call. `frame` is the first frame
+        of the message if it was read already."""
+        if frame is None:
+            frame = await self.data_frame(mask, view=True)
+        if frame.code == DataFrames.cont:
+            raise FrameError('Continuation frame without a message to continue')
+        extension = self.frame.extension if frame.rsv1 else None
+        while True:
+            if extension is not None:
+                write(extension.decode(frame.message, frame.fin, self.frame.maxsize))
+            else:
+                write(frame.message)
+            if frame.fin:
+                return
+            frame = await self.data_frame(mask, view=True)
+            if frame.code != DataFrames.cont:
+                raise FrameError('Expected a continuation frame')
+
+    async def data_frame(self, mask=False, view=False):
+        """Return the next data frame from the queue or the reader,
+        see Frames.unpack_frame for `view`"""
+        if self.message_queue.qsize() or self.queued:
+            return await self.queued_frame()
+        frame = await self.frame.unpack_frame(mask, view=view)
+        while frame.code not in DataFrames._value2member_map_:
+            await self.frame.extra_operation(frame.code, bytes(frame.message))
+            frame = await self.frame.unpack_frame(mask, view=view)
+        return frame
+
+    async def queued_frame(self):
+        """Pop a frame from the message queue,
+        re-raise the error that ended the connection"""
+        if self.message_queue.qsize():
+            frame = self.message_queue.get_nowait()
+        else:
+            frame = await self.message_queue.get()
+        if isinstance(frame, Exception):
+            self.message_queue.put_nowait(frame)
+            raise frame
+        return frame
+
     @property
     def get_queue_size(self):
         return self.message_queue.qsize()
+
+    @property
+    def get_queue_bytes(self):
+        return self.message_queue.nbytes
+
+
+async def close_all(connections, code: int = CloseCodes.going_away.value, reason: str = '',
+                    timeout: float = 5) -> dict:
+    """Close many AioWebSocket or Converse connections concurrently.
+    Every close handshake gets the same `timeout`, so the whole call
+    ends within about `timeout` seconds however many connections there
+    are; those whose peer did not answer by then are aborted.
+    Return how many were closed cleanly and how many aborted.
+    """
+    closes = []
+    for connection in connections:
+        if isinstance(connection, AioWebSocket):
+            if connection.state is SocketState.opened.value:
+                closes.append(connection.close_connection(code, reason, timeout))
+        else:
+            closes.append(connection.close(code, reason, timeout))
+    results = await asyncio.gather(*closes, return_exceptions=True)
+    clean = sum(1 for result in results if result is True)
+    for result in results:
+        if isinstance(result, Exception):
+            logging.debug('Close failed: {!r}'.format(result))
+    return {'clean': clean, 'aborted': len(results) - clean}
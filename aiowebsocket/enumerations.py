@@ -1,7 +1,7 @@
 from enum import IntEnum
 
 
-__all__ = ['SocketState', 'DataFrames', 'ControlFrames', 'StatusCodes']
+__all__ = ['SocketState', 'DataFrames', 'ControlFrames', 'StatusCodes', 'CloseCodes']
 
 
 # When closing an established connection (e.g., when sending a Close
@@ -18,6 +18,17 @@ __all__ = ['SocketState', 'DataFrames', 'ControlFrames', 'StatusCodes']
 StatusCodes = [1000, 1001, 1002, 1003, 1007, 1008, 1009, 1010, 1011]
 
 
+class CloseCodes(IntEnum):
+    """Names of the status codes. no_status and abnormal are never
+    sent, they stand for a Close frame without a code and for a
+    connection that ended without any Close frame.
+    """
+    normal, going_away, protocol_error, unsupported_data = (1000, 1001, 1002, 1003)
+    no_status, abnormal = (1005, 1006)
+    invalid_data, policy_violation, too_big, missing_extension, internal_error = (
+        1007, 1008, 1009, 1010, 1011)
+
+
 class SocketState(IntEnum):
     """WebSocket connection state """
     zero, connecting, opened, closing, closed = (0, 0, 1, 2, 3)
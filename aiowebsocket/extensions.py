@@ -0,0 +1,191 @@
+import sys
+import zlib
+
+from .exceptions import FrameError, HandShakeError
+
+
+_EMPTY_BLOCK = b'\x00\x00\xff\xff'
+
+# zlib refuses a raw deflate window of 8 bits, a limit of 8 for our own
+# compressor is never offered or accepted
+_MIN_COMPRESS_BITS = 9
+
+
+class PerMessageDeflate:
+    """Compression Extensions for WebSocket
+
+    The "permessage-deflate" extension compresses the payload of a data
+    message with DEFLATE and marks it with the RSV1 bit of its first
+    frame. An instance passed to AioWebSocket describes the offer, the
+    instance returned by `accept` holds the negotiated parameters and
+    the compression contexts of one connection.
+
+    Messages shorter than `min_size` are sent uncompressed, for them the
+    deflate overhead usually costs more than it saves.
+
+    https://tools.ietf.org/html/rfc7692
+    """
+    name = 'permessage-deflate'
+
+    def __init__(self, client_max_window_bits=True, server_max_window_bits: int = None,
+                 client_no_context_takeover: bool = False,
+                 server_no_context_takeover: bool = False,
+                 min_size: int = 64, level: int = 6):
+        self.client_max_window_bits = client_max_window_bits
+        self.server_max_window_bits = server_max_window_bits
+        self.client_no_context_takeover = client_no_context_takeover
+        self.server_no_context_takeover = server_no_context_takeover
+        self.min_size = min_size
+        self.level = level
+        self.compressor = None
+        self.decompressor = None
+
+    def offer(self):
+        """Value of the Sec-WebSocket-Extensions request header"""
+        params = [self.name]
+        if (not isinstance(self.client_max_window_bits, bool) and
+                self.client_max_window_bits and self.client_max_window_bits < _MIN_COMPRESS_BITS):
+            raise ValueError('client_max_window_bits must be at least {}'.format(_MIN_COMPRESS_BITS))
+        if self.client_max_window_bits is True:
+            params.append('client_max_window_bits')
+        elif self.client_max_window_bits:
+            params.append('client_max_window_bits={}'.format(self.client_max_window_bits))
+        if self.server_max_window_bits:
+            params.append('server_max_window_bits={}'.format(self.server_max_window_bits))
+        if self.client_no_context_takeover:
+            params.append('client_no_context_takeover')
+        if self.server_no_context_takeover:
+            params.append('server_no_context_takeover')
+        return '; '.join(params)
+
+    def accept(self, header: str):
+        """Parse the Sec-WebSocket-Extensions response header.
+        Return the negotiated extension, or None when the
+        server did not agree to compress.
+        """
+        for extension in header.split(','):
+            name, *params = [item.strip() for item in extension.split(';')]
+            if name == self.name:
+                break
+        else:
+            return None
+        client_bits = 15
+        if self.client_max_window_bits and not isinstance(self.client_max_window_bits, bool):
+            client_bits = self.client_max_window_bits
+        server_bits = 15
+        client_takeover = not self.client_no_context_takeover
+        server_takeover = True
+        for param in params:
+            key, _, value = param.partition('=')
+            key, value = key.strip(), value.strip().strip('"')
+            if key == 'client_max_window_bits':
+                if not self.client_max_window_bits:
+                    raise HandShakeError('Server sent client_max_window_bits which was not offered')
+                client_bits = int(value) if value else client_bits
+            elif key == 'server_max_window_bits':
+                server_bits = int(value)
+            elif key == 'client_no_context_takeover':
+                client_takeover = False
+            elif key == 'server_no_context_takeover':
+                server_takeover = False
+            else:
+                raise HandShakeError('Unsupported extension parameter: {}'.format(key))
+            if not 8 <= client_bits <= 15 or not 8 <= server_bits <= 15:
+                raise HandShakeError('Invalid window bits: {}'.format(param))
+        if client_bits < _MIN_COMPRESS_BITS:
+            raise HandShakeError('Cannot compress with a window of {} bits'.format(client_bits))
+        negotiated = PerMessageDeflate(client_bits, server_bits,
+                                       not client_takeover, not server_takeover,
+                                       self.min_size, self.level)
+        negotiated.reset_compressor()
+        negotiated.reset_decompressor()
+        return negotiated
+
+    def respond(self, header: str):
+        """Server side of the negotiation: accept the first usable offer
+        of the Sec-WebSocket-Extensions request header within the limits
+        of this instance. Return the extension for the connection and the
+        response header value, or (None, None).
+
+        The returned instance has the client and server parameters
+        swapped, so that `encode` and `decode` keep meaning "ours" and
+        "the peer's" on the server as well.
+        """
+        for extension in header.split(','):
+            name, *params = [item.strip() for item in extension.split(';')]
+            if name != self.name:
+                continue
+            server_bits = self.server_max_window_bits or 15
+            client_bits = None
+            server_takeover = not self.server_no_context_takeover
+            client_takeover = True
+            try:
+                for param in params:
+                    key, _, value = param.partition('=')
+                    key, value = key.strip(), value.strip().strip('"')
+                    if key == 'server_max_window_bits':
+                        server_bits = min(server_bits, int(value))
+                    elif key == 'client_max_window_bits':
+                        client_bits = int(value) if value else 15
+                    elif key == 'server_no_context_takeover':
+                        server_takeover = False
+                    elif key == 'client_no_context_takeover':
+                        client_takeover = False
+                    else:
+                        raise ValueError(key)
+            except ValueError:
+                continue
+            if client_bits is not None and not isinstance(self.client_max_window_bits, bool):
+                client_bits = min(client_bits, self.client_max_window_bits or 15)
+            # server_bits limit our compressor
+            if not _MIN_COMPRESS_BITS <= server_bits <= 15 or not 8 <= (client_bits or 15) <= 15:
+                continue
+            response = [self.name]
+            if server_bits != 15:
+                response.append('server_max_window_bits={}'.format(server_bits))
+            if client_bits is not None and client_bits != 15:
+                response.append('client_max_window_bits={}'.format(client_bits))
+            if not server_takeover:
+                response.append('server_no_context_takeover')
+            if not client_takeover:
+                response.append('client_no_context_takeover')
+            negotiated = PerMessageDeflate(server_bits, client_bits or 15,
+                                           not server_takeover, not client_takeover,
+                                           self.min_size, self.level)
+            negotiated.reset_compressor()
+            negotiated.reset_decompressor()
+            return negotiated, '; '.join(response)
+        return None, None
+
+    def reset_compressor(self):
+        self.compressor = zlib.compressobj(self.level, zlib.DEFLATED,
+                                           -self.client_max_window_bits)
+
+    def reset_decompressor(self):
+        # a larger window inflates whatever an 8 bit one deflated
+        self.decompressor = zlib.decompressobj(-max(_MIN_COMPRESS_BITS,
+                                                    self.server_max_window_bits))
+
+    def encode(self, message):
+        """Compress one message"""
+        data = self.compressor.compress(message) + self.compressor.flush(zlib.Z_SYNC_FLUSH)
+        if data.endswith(_EMPTY_BLOCK):
+            data = data[:-4]
+        if self.client_no_context_takeover:
+            self.reset_compressor()
+        return data
+
+    def decode(self, message, final: bool = True, maxsize: int = None):
+        """Decompress a message, or the next part of one when `final`
+        is false. `maxsize` bounds the inflated size."""
+        if final:
+            message = bytes(message) + _EMPTY_BLOCK
+        if not maxsize or maxsize >= sys.maxsize:
+            maxsize = 0
+        data = self.decompressor.decompress(message, maxsize)
+        if self.decompressor.unconsumed_tail:
+            self.reset_decompressor()
+            raise FrameError('Message length is too long')
+        if final and self.server_no_context_takeover:
+            self.reset_decompressor()
+        return data
@@ -107,21 +107,169 @@
 
 """
 
-import io
 import random
+import asyncio
 import logging
-from struct import pack, unpack
-from itertools import cycle
+import time
+from collections import OrderedDict, deque, namedtuple
+from struct import pack, unpack_from
 from .enumerations import *
 from .exceptions import FrameError
 
 
+# Masking works on slices of this many bytes at a time: every slice is
+# turned into one big integer and XORed against the repeated key, so the
+# per-byte work happens inside CPython instead of in a Python loop.
+MASK_CHUNK = 2**14
+
+# Unmasked payloads smaller than this are joined with their header and
+# sent in one write, larger ones are handed to the transport as they are.
+SMALL_FRAME = 2**12
+
+
+def mask_into(target, message, mask, offset: int = 0):
+    """XOR `message` with the 4-byte `mask` and store the result
+    in the preallocated `target` starting at `offset`.
+    `message` may be any bytes-like object, it is never copied as a whole.
+    """
+    if len(mask) != 4:
+        raise FrameError("The 'mask' must contain 4 bytes")
+    view = memoryview(message).cast('B')
+    length = len(view)
+    step = min(MASK_CHUNK, length) & ~3
+    if step:
+        key = int.from_bytes(mask * (step // 4), 'little')
+        for start in range(0, length - length % step, step):
+            chunk = int.from_bytes(view[start:start + step], 'little') ^ key
+            target[offset + start:offset + start + step] = chunk.to_bytes(step, 'little')
+    start = length - length % step if step else 0
+    rest = length - start
+    if rest:
+        key = int.from_bytes((mask * (rest // 4 + 1))[:rest], 'little')
+        chunk = int.from_bytes(view[start:], 'little') ^ key
+        target[offset + start:offset + length] = chunk.to_bytes(rest, 'little')
+    return target
+
+
+Frame = namedtuple('Frame', ['fin', 'code', 'rsv1', 'rsv2', 'rsv3', 'message'])
+
+
+class FrameParser:
+    """Sans-IO frame parser.
+    Chunks received from the transport are passed to `feed`, which
+    returns every frame completed by them, so several frames packed in
+    one TCP segment cost a single call. Incomplete data is kept
+    until the next chunk arrives; the buffer for it only exists while
+    there is such data. With `views` set, unmasked payloads parsed from
+    a bytes chunk are memoryviews into that chunk instead of copies.
+    """
+    __slots__ = ('mask', 'maxsize', 'views', 'buffer')
+
+    def __init__(self, mask: bool = False, maxsize: int = None, views: bool = False):
+        self.mask = mask
+        self.maxsize = maxsize
+        self.views = views
+        self.buffer = None
+
+    def feed(self, data) -> list:
+        """Parse `data` together with what is left from previous chunks"""
+        if self.buffer:
+            self.buffer += data
+            data = self.buffer
+        frames = []
+        # bytes never change, views into them stay valid; the buffer is reused
+        views = self.views and type(data) is bytes
+        with memoryview(data) as view:
+            position = self.parse(view, frames, views)
+        if data is self.buffer:
+            if position < len(data):
+                del self.buffer[:position]
+            else:
+                self.buffer = None
+        elif position < len(data):
+            self.buffer = bytearray(data[position:])
+        return frames
+
+    def parse(self, view, frames: list, views: bool = False):
+        """Append complete frames in `view` to `frames`,
+        return the offset where the first incomplete frame starts.
+        Unmasked payloads are slices of `view` if `views`."""
+        position, size = 0, len(view)
+        while size - position >= 2:
+            head1, head2 = view[position], view[position + 1]
+            if (True if head2 & 0b10000000 else False) != self.mask:
+                raise FrameError("Incorrect masking")
+            start = position + 2
+            length = head2 & 0b01111111
+            if length == 126:
+                if size - start < 2:
+                    break
+                length, = unpack_from('!H', view, start)
+                start += 2
+            elif length == 127:
+                if size - start < 8:
+                    break
+                length, = unpack_from('!Q', view, start)
+                start += 8
+            if self.maxsize and length > self.maxsize:
+                raise FrameError("Message length is too long: {} > {}".format(length, self.maxsize))
+            if self.mask:
+                mask_bits = bytes(view[start:start + 4])
+                start += 4
+            end = start + length
+            if end > size:
+                break
+            if self.mask:
+                message = bytes(mask_into(bytearray(length), view[start:end], mask_bits))
+            elif views:
+                message = view[start:end]
+            else:
+                message = view[start:end].tobytes()
+            frames.append(Frame(True if head1 & 0b10000000 else False,
+                                head1 & 0b00001111,
+                                True if head1 & 0b01000000 else False,
+                                True if head1 & 0b00100000 else False,
+                                True if head1 & 0b00010000 else False,
+                                message))
+            position = end
+        return position
+
+
 class Frames:
     """数据帧相关操作"""
-    def __init__(self, reader: object, writer: object):
+    __slots__ = ('reader', 'writer', 'maxsize', 'read_size', 'server', 'parser', 'frames',
+                 'fragments', 'fragment_head', 'extension', 'on_pong', 'metrics', 'offload',
+                 'close_code', 'close_reason', 'close_sent', 'close_waiter', 'capture',
+                 'reading')
+
+    def __init__(self, reader: object, writer: object, read_size: int = 2**16,
+                 maxsize: int = 2**64, metrics=None, offload=None, server: bool = False,
+                 capture=None):
         self.reader = reader
         self.writer = writer
-        self.maxsize = 2**64
+        self.maxsize = maxsize
+        self.read_size = read_size
+        # frames from a client are masked, frames of a server never are
+        self.server = server
+        self.parser = FrameParser(mask=server, maxsize=maxsize)
+        # frames parsed from the last chunk beyond the first one, only
+        # allocated once a chunk held several frames
+        self.frames = None
+        self.fragments = None
+        self.fragment_head = None
+        self.extension = None
+        self.on_pong = None
+        self.metrics = metrics
+        self.offload = offload
+        # code and reason of the Close frame received from the peer
+        self.close_code = None
+        self.close_reason = None
+        self.close_sent = False
+        self.close_waiter = None
+        # whether a task waits for data from the reader
+        self.reading = False
+        # every chunk read from the transport is recorded here
+        self.capture = None if capture is None else capture.open(masked=server)
 
     @staticmethod
     def message_mask(message: bytes, mask):
@@ -159,9 +307,8 @@ class Frames:
        the "Payload data", e.g., the number of bytes following the masking
        key.
    """
-        if len(mask) != 4:
-            raise FrameError("The 'mask' must contain 4 bytes")
-        return bytes(b ^ m for b, m in zip(message, cycle(mask)))
+        view = memoryview(message).cast('B')
+        return bytes(mask_into(bytearray(len(view)), view, mask))
 
     async def pong(self, message: bytes = b''):
         """大太监彭公公
@@ -187,13 +334,18 @@ class Frames:
             if code is ControlFrames.ping.value:
                 await self.pong(message=message)
             elif code is ControlFrames.close.value:
-                await self.receive_close()
+                await self.receive_close(message)
+            elif code is ControlFrames.pong.value:
+                if self.on_pong is not None:
+                    self.on_pong(message)
             else:
                 raise FrameError('Invalid operation code.')
 
-    async def unpack_frame(self, mask=False, maxsize=None):
+    async def unpack_frame(self, mask=False, maxsize=None, view=False):
         """Unpack data frame,data frame unmasked return from server
         so when unpacking, mask is false.
+        With `view` the payload may be a memoryview into the chunk
+        read from the transport instead of bytes.
 
         This wire format for the data transfer part is described by the ABNF
         [RFC5234] given in detail in this section.  (Note that, unlike in
@@ -205,46 +357,144 @@ class Frames:
         conflict between the figure below and the ABNF specified later in
         this section, the figure is authoritative.
         """
-        reader = self.reader.readexactly
-        frame_header = await reader(2)
-        head1, head2 = unpack('!BB', frame_header)
-
-        fin = True if head1 & 0b10000000 else False
-        rsv1 = True if head1 & 0b01000000 else False
-        rsv2 = True if head1 & 0b00100000 else False
-        rsv3 = True if head1 & 0b00010000 else False
-        code = head1 & 0b00001111
-
-        if (True if head2 & 0b10000000 else False) != mask:
-            raise FrameError("Incorrect masking")
-
-        length = head2 & 0b01111111
-        if length == 126:
-            message = await reader(2)
-            length, = unpack('!H', message)
-        elif length == 127:
-            message = await reader(8)
-            length, = unpack('!Q', message)
-        if maxsize and length > maxsize:
-            raise FrameError("Message length is too long)".format(length, maxsize))
-        if mask:
-            mask_bits = await reader(4)
-        message = self.message_mask(message, mask_bits) if mask else await reader(length)
-        return fin, code, rsv1, rsv2, rsv3, message
+        frames = self.frames
+        if frames:
+            return frames.popleft() if view else self.own(frames.popleft())
+        parser = self.parser
+        parser.mask, parser.views = mask or self.server, view
+        parser.maxsize = maxsize or self.maxsize
+        parsed = None
+        while not parsed:
+            self.reading = True
+            try:
+                data = await self.reader.read(self.read_size)
+            finally:
+                self.reading = False
+            if not data:
+                raise asyncio.IncompleteReadError(bytes(parser.buffer or b''), None)
+            if self.capture is not None:
+                self.capture.record(data)
+            if self.metrics is None:
+                parsed = parser.feed(data)
+            else:
+                started = time.perf_counter()
+                parsed = parser.feed(data)
+                self.metrics.received(parsed, time.perf_counter() - started)
+        if len(parsed) == 1:
+            return parsed[0]
+        if frames is None:
+            frames = self.frames = deque()
+        frames.extend(parsed)
+        return frames.popleft()
 
-    async def read(self, text=False, mask=False, maxsize=None):
+    @staticmethod
+    def own(frame):
+        """The frame with its payload copied out of the chunk
+        it was parsed from, if it is a view into it"""
+        if type(frame.message) is memoryview:
+            return frame._replace(message=frame.message.tobytes())
+        return frame
+
+    async def read(self, text=False, mask=False, maxsize=None, control=True):
         """return information about message
+        The payload of a control frame is returned as well
+        unless `control` is false.
         """
-        fin, code, rsv1, rsv2, rsv3, message = await self.unpack_frame(mask, maxsize)
-        await self.extra_operation(code, message)  # 根据操作码决定后续操作
-        if any([rsv1, rsv2, rsv3]):
+        while True:
+            frame = await self.unpack_frame(mask, maxsize)
+            if frame.code not in DataFrames._value2member_map_:
+                await self.extra_operation(frame.code, frame.message)  # 根据操作码决定后续操作
+                if control:
+                    return self.convert(frame, text)
+                continue
+            frame = self.assemble(frame)
+            if frame is not None:
+                if self.offload is not None and self.offload.wanted(len(frame.message)):
+                    return await self.offload.complete(self, frame, text)
+                return self.complete(frame, text)
+
+    def inflate(self, frame):
+        """Decompress a complete message marked with RSV1
+        by the negotiated extension"""
+        if frame.rsv1 and self.extension is not None:
+            message = self.extension.decode(frame.message, True, self.maxsize)
+            return frame._replace(rsv1=False, message=message)
+        return frame
+
+    def compress(self, message):
+        """Return the payload to send for a complete message
+        and the RSV1 bit that goes with it"""
+        if self.extension is None or len(message) < self.extension.min_size:
+            return message, 0
+        return self.extension.encode(message), 1
+
+    async def stream(self, mask=False, maxsize=None):
+        """Yield the payload of the next message frame by frame,
+        so a fragmented message never has to be held in memory as a whole.
+        Control frames arriving in between are handled, not yielded.
+        """
+        started = compressed = False
+        while True:
+            frame = await self.unpack_frame(mask, maxsize)
+            if frame.code not in DataFrames._value2member_map_:
+                await self.extra_operation(frame.code, frame.message)
+                continue
+            if started != (frame.code == DataFrames.cont):
+                raise FrameError('Unexpected frame in a fragmented message')
+            if not started:
+                started, compressed = True, frame.rsv1 and self.extension is not None
+            if compressed:
+                yield self.extension.decode(frame.message, frame.fin, self.maxsize)
+            else:
+                yield frame.message
+            if frame.fin:
+                return
+
+    def complete(self, frame, text=False):
+        """Inflate and convert a message put together by `assemble`"""
+        return self.convert(self.inflate(frame), text)
+
+    def assemble(self, frame):
+        """Join the fragments of a message.
+        Return the complete frame, or None while continuation frames
+        are still expected. Fragments are collected in one growing
+        bytearray which may not exceed `maxsize`. The message is
+        still compressed, `complete` inflates it.
+        https://tools.ietf.org/html/rfc6455#section-5.4
+        """
+        if frame.code == DataFrames.cont:
+            if self.fragments is None:
+                raise FrameError('Continuation frame without a message to continue')
+            if len(self.fragments) + len(frame.message) > self.maxsize:
+                self.fragments = self.fragment_head = None
+                raise FrameError('Message length is too long')
+            self.fragments += frame.message
+            if not frame.fin:
+                return None
+            message, self.fragments = bytes(self.fragments), None
+            return self.fragment_head._replace(fin=True, message=message)
+        if self.fragments is not None:
+            raise FrameError('Expected a continuation frame')
+        if frame.fin:
+            return frame
+        self.fragments = bytearray(frame.message)
+        self.fragment_head = frame
+        return None
+
+    @staticmethod
+    def convert(frame, text=False):
+        """Check the flags of a parsed frame and
+        convert its message into the requested type
+        """
+        fin, code, rsv1, rsv2, rsv3, message = frame
+        if rsv1 or rsv2 or rsv3:
             logging.warning('RSV not 0')
         if not fin:
             logging.warning('Fragmented control frame:Not FIN')
-        if code is DataFrames.binary.value and text:
+        if code == DataFrames.binary and text:
             if isinstance(message, bytes):
                 message = message.decode()
-        if code is DataFrames.text.value and not text:
+        if code == DataFrames.text and not text:
             if isinstance(message, str):
                 message = message.encode()
         return message
@@ -265,32 +515,204 @@ class Frames:
         head2 = 0b10000000 if mask else 0  # Whether to mask or not
         return head1, head2
 
+    @staticmethod
+    def pack_length(head1, head2, length):
+        """Pack the first two bytes and the extended payload length"""
+        if length < 126:
+            return pack('!BB', head1, head2 | length)
+        if length < 2**16:
+            return pack('!BBH', head1, head2 | 126, length)
+        if length < 2**64:
+            return pack('!BBQ', head1, head2 | 127, length)
+        raise ValueError('Message is too long')
+
+    def encode(self, fin, code, message, mask=True, rsv1=0, rsv2=0, rsv3=0):
+        """Converting message into the buffers of one data frame.
+        `message` can be bytes, bytearray or memoryview, it is only
+        copied when it has to be masked. In that case the header and the
+        masked payload share one preallocated bytearray. Frames of a
+        server are never masked.
+        """
+        if self.server:
+            mask = False
+        head1, head2 = self.pack_message(fin, code, mask, rsv1, rsv2, rsv3)
+        payload = memoryview(message).cast('B')
+        length = len(payload)
+        header = self.pack_length(head1, head2, length)
+        if self.metrics is not None:
+            self.metrics.sent(code, length)
+        if mask:
+            mask_bits = pack('!I', random.getrandbits(32))
+            offset = len(header) + 4
+            frame = bytearray(offset + length)
+            frame[:offset] = header + mask_bits
+            return mask_into(frame, payload, mask_bits, offset),
+        if length < SMALL_FRAME:
+            return header + payload,
+        return header, payload
+
     async def write(self, fin, code, message, mask=True, rsv1=0, rsv2=0, rsv3=0):
         """Converting messages to data frames and sending them.
         Client data frames must be masked,so mask is True.
         """
-        head1, head2 = self.pack_message(fin, code, mask, rsv1, rsv2, rsv3)
-        output = io.BytesIO()
-        length = len(message)
-        if length < 126:
-            output.write(pack('!BB', head1, head2 | length))
-        elif length < 2**16:
-            output.write(pack('!BBH', head1, head2 | 126, length))
-        elif length < 2**64:
-            output.write(pack('!BBQ', head1, head2 | 127, length))
+        self.send_frame(fin, code, message, mask, rsv1, rsv2, rsv3)
+
+    def send_frame(self, fin, code, message, mask=True, rsv1=0, rsv2=0, rsv3=0):
+        """Hand one frame to the writer without waiting,
+        for callers that are not coroutines"""
+        for buffer in self.encode(fin, code, message, mask, rsv1, rsv2, rsv3):
+            self.writer.write(buffer)
+
+    def encode_prepared(self, prepared, mask=True):
+        """The buffers of a PreparedMessage, like encode"""
+        if self.metrics is not None:
+            self.metrics.sent(prepared.code, len(prepared.payload))
+        return prepared.encode(mask and not self.server)
+
+    async def receive_close(self, message: bytes = b''):
+        """The peer sent a Close frame: keep its code and reason and
+        answer with a Close frame unless one was sent already. A server
+        ends the TCP connection right away, a client leaves that to the
+        server.
+        https://tools.ietf.org/html/rfc6455#section-5.5.1
+        """
+        try:
+            self.close_code, self.close_reason = self.parse_close(message)
+        except (FrameError, UnicodeDecodeError):
+            self.close_code, self.close_reason = CloseCodes.protocol_error.value, ''
+        if valid_close_code(self.close_code):
+            self.send_close(self.close_code)
         else:
-            raise ValueError('Message is too long')
+            self.send_close(CloseCodes.normal.value)
+        if self.close_waiter is not None and not self.close_waiter.done():
+            self.close_waiter.set_result(self.close_code)
+        if self.server:
+            self.writer.close()
+
+    def send_close(self, code: int = CloseCodes.normal.value, reason: str = ''):
+        """Send the Close frame, only the first call does"""
+        if self.close_sent:
+            return
+        self.close_sent = True
+        if not self.writer.is_closing():
+            self.send_frame(True, ControlFrames.close.value, self.pack_close(code, reason))
+
+    def wait_close(self):
+        """Future of the code in the peer's Close frame, for
+        connections whose frames are read by someone else"""
+        if self.close_waiter is None:
+            self.close_waiter = asyncio.get_event_loop().create_future()
+            if self.close_code is not None:
+                self.close_waiter.set_result(self.close_code)
+        return self.close_waiter
+
+    def connection_lost(self, exc):
+        """The reader ended before a Close frame arrived"""
+        if self.close_waiter is not None and not self.close_waiter.done():
+            self.close_waiter.set_exception(exc)
 
-        if mask:
-            # pack mask
-            mask_bits = pack('!I', random.getrandbits(32))
-            output.write(mask_bits)
-            message = self.message_mask(message, mask_bits)
-
-        output.write(message)
-        self.writer.write(output.getvalue())
+    @staticmethod
+    def pack_close(code: int, reason: str = '') -> bytes:
+        """Payload of a Close frame: the status code and a UTF-8 reason"""
+        if not valid_close_code(code):
+            raise FrameError('Invalid close code {}'.format(code))
+        payload = pack('!H', code) + reason.encode()
+        if len(payload) > 125:
+            raise FrameError('The close reason is too long')
+        return payload
 
-    async def receive_close(self):
-        """ When you receive a message that
-        the server closes the connection, you
-        can do something here """
+    @staticmethod
+    def parse_close(message) -> tuple:
+        """Status code and reason of a received Close frame"""
+        if not message:
+            return CloseCodes.no_status.value, ''
+        if len(message) < 2:
+            raise FrameError('Close frame with a truncated status code')
+        code, = unpack_from('!H', message)
+        return code, str(message[2:], 'utf-8')
+
+
+def valid_close_code(code: int) -> bool:
+    """Whether `code` may be sent in a Close frame: the codes defined by
+    RFC 6455 and the ranges for libraries and applications"""
+    return code in StatusCodes or 3000 <= code < 5000
+
+
+class PreparedMessage:
+    """A whole message encoded once and sent many times.
+    Unmasked, every send reuses the complete frame; masked, only a fresh
+    key is drawn and applied to the kept payload. Prepared messages are
+    never compressed (RSV1 unset), which is valid whatever extension a
+    connection negotiated.
+    """
+    def __init__(self, message, code: int = DataFrames.text.value):
+        if isinstance(message, str):
+            message = message.encode()
+        self.code = code
+        self.payload = bytes(message)
+        self.frame = Frames.pack_length(0b10000000 | code, 0, len(self.payload)) + self.payload
+        self.masked_header = None
+        self.number = None
+
+    def __len__(self):
+        return len(self.frame)
+
+    def encode(self, mask=True):
+        """The buffers of one frame, masked with a new key if `mask`"""
+        if not mask:
+            return self.frame,
+        length = len(self.payload)
+        if self.masked_header is None:
+            self.masked_header = Frames.pack_length(0b10000000 | self.code, 0b10000000, length)
+            # small payloads keep their integer form, masking is then a single XOR
+            if length <= MASK_CHUNK:
+                self.number = int.from_bytes(self.payload, 'little')
+        mask_bits = pack('!I', random.getrandbits(32))
+        if self.number is None:
+            offset = len(self.masked_header) + 4
+            frame = bytearray(offset + length)
+            frame[:offset] = self.masked_header + mask_bits
+            return mask_into(frame, self.payload, mask_bits, offset),
+        key = int.from_bytes((mask_bits * (length // 4 + 1))[:length], 'little')
+        return self.masked_header + mask_bits + (self.number ^ key).to_bytes(length, 'little'),
+
+
+class PreparedCache:
+    """LRU of PreparedMessage keyed on payload and opcode.
+    bytes and str keep their hash, so sending the same payload object
+    again costs one dict lookup. Payloads over `max_payload` bytes are
+    prepared but not kept.
+    """
+    def __init__(self, maxsize: int = 256, max_payload: int = 2**16):
+        self.maxsize = maxsize
+        self.max_payload = max_payload
+        self.messages = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self):
+        return len(self.messages)
+
+    def get(self, message, code: int = DataFrames.text.value) -> PreparedMessage:
+        if not isinstance(message, (bytes, str)):
+            message = bytes(message)
+        key = (message, code)
+        prepared = self.messages.get(key)
+        if prepared is not None:
+            self.messages.move_to_end(key)
+            self.hits += 1
+            return prepared
+        self.misses += 1
+        prepared = PreparedMessage(message, code)
+        if len(prepared.payload) <= self.max_payload:
+            self.messages[key] = prepared
+            if len(self.messages) > self.maxsize:
+                self.messages.popitem(last=False)
+        return prepared
+
+    def clear(self):
+        self.messages.clear()
+
+
+# shared by every connection of the process
+prepared_messages = PreparedCache()
@@ -1,11 +1,34 @@
 import re
 import random
 import base64
+import asyncio
+import hashlib
 
 from .exceptions import HandShakeError
 
 
 _value_re = re.compile(rb"[\x09\x20-\x7e\x80-\xff]*")
+GUID = b'258EAFA5-E914-47DA-95CA-C5AB0DC85B11'
+_KEY = '\x00'
+
+
+def request_template(request: str):
+    """Split a request built around the key placeholder into the bytes
+    before and after the key. Requests with custom headers have no
+    placeholder, their key is taken from the headers if they set one."""
+    prefix, found, suffix = request.encode().partition(_KEY.encode())
+    if found:
+        return prefix, suffix, None
+    for line in request.split('\r\n'):
+        name, _, value = line.partition(':')
+        if name.strip().lower() == 'sec-websocket-key':
+            return prefix, None, value.strip().encode()
+    return prefix, None, None
+
+
+def accept_key(key: bytes) -> str:
+    """The Sec-WebSocket-Accept value the server has to answer `key` with"""
+    return base64.b64encode(hashlib.sha1(key + GUID).digest()).decode()
 
 
 class HandShake:
@@ -18,15 +41,26 @@ class HandShake:
 
     https://tools.ietf.org/html/rfc6455#section-1.3
     """
-    def __init__(self, remote, reader, writer, headers, union_header):
+    __slots__ = ('remote', 'write', 'reader', 'headers', 'union_header', 'extensions',
+                 'subprotocols', 'response_headers', 'key')
+    # request templates by connection settings, shared by all handshakes
+    templates = {}
+    max_templates = 256
+
+    def __init__(self, remote, reader, writer, headers, union_header,
+                 extensions: list = None, subprotocols: list = None):
         self.remote = remote
         self.write = writer
         self.reader = reader
         self.headers = headers
         self.union_header = union_header
+        self.extensions = extensions or []
+        self.subprotocols = subprotocols or []
+        self.response_headers = {}
+        self.key = None
 
     def shake_headers(self, host: str, port: int, resource: str = '/',
-                      version: int = 13):
+                      version: int = 13, key: str = None):
         """Request header information for handshaking
 
         In compliance with [RFC2616], header fields in the handshake may be
@@ -41,8 +75,8 @@ class HandShake:
                 head = ['{}:{}'.format(k, item) for k, item in self.headers.items()]
                 return '\r\n'.join(head) + '\r\n'
 
-        bytes_key = bytes(random.getrandbits(8) for _ in range(16))
-        key = base64.b64encode(bytes_key).decode()
+        if key is None:
+            key = base64.b64encode(random.getrandbits(128).to_bytes(16, 'big')).decode()
         head = {'Host': '{host}:{port}'.format(host=host, port=port),
                 'Connection': 'Upgrade',
                 'Upgrade': 'websocket',
@@ -51,6 +85,10 @@ class HandShake:
                 'Sec-WebSocket-Key': key,
                 'Sec-WebSocket-Version': version
                 }
+        if self.extensions:
+            head['Sec-WebSocket-Extensions'] = ', '.join(e.offer() for e in self.extensions)
+        if self.subprotocols:
+            head['Sec-WebSocket-Protocol'] = ', '.join(self.subprotocols)
         for u, i in self.union_header.items():
             head[u] = i
         headers = ['{}:{}'.format(k, item) for k, item in head.items()]
@@ -58,32 +96,192 @@ class HandShake:
         headers.append('\r\n')
         return '\r\n'.join(headers)
 
+    def request(self) -> bytes:
+        """The request bytes with a fresh key.
+        The rest of the request only depends on the connection settings,
+        it is built once and then reused from the template cache."""
+        headers = self.headers.items() if isinstance(self.headers, dict) else self.headers or ()
+        try:
+            settings = (self.remote, tuple(headers), tuple(self.union_header.items()),
+                        tuple(e.offer() for e in self.extensions), tuple(self.subprotocols))
+            template = self.templates.get(settings)
+        except TypeError:
+            settings = template = None
+        if template is None:
+            porn, host, port, resource, ssl = self.remote
+            template = request_template(self.shake_headers(host=host, port=port,
+                                                           resource=resource, key=_KEY))
+            if settings is not None:
+                if len(self.templates) >= self.max_templates:
+                    self.templates.clear()
+                self.templates[settings] = template
+        prefix, suffix, self.key = template
+        if suffix is None:
+            return prefix
+        self.key = base64.b64encode(random.getrandbits(128).to_bytes(16, 'big'))
+        return prefix + self.key + suffix
+
     async def shake_(self):
         """Initiate a handshake"""
-        porn, host, port, resource, ssl = self.remote
-        handshake_info = self.shake_headers(host=host, port=port,
-                                            resource=resource)
-        self.write.write(data=handshake_info.encode())
+        self.write.write(self.request())
 
     async def shake_result(self):
         """Check handshake results
         Any status code other than 101 indicates that the WebSocket handshake
         has not completed and that the semantics of HTTP still apply.  The
         headers follow the status code.
+
+        The response is read up to the empty line in one go and parsed
+        in one pass; for a 101 the accept key and subprotocol are checked.
         """
-        header = []
-        for _ in range(2**8):
-            result = await self.reader.readline()
-            header.append(result)
-            if result == b'\r\n':
-                break
-        if not header:
-            raise HandShakeError('HandShake not response')
-        protocols, socket_code = header[0].decode('utf-8').split()[:2]
+        try:
+            response = await self.reader.readuntil(b'\r\n\r\n')
+        except asyncio.IncompleteReadError as exc:
+            raise HandShakeError('HandShake not response' if not exc.partial
+                                 else 'Incomplete handshake response') from exc
+        except asyncio.LimitOverrunError as exc:
+            raise HandShakeError('Handshake response is too long') from exc
+        lines = response.decode('latin-1').split('\r\n')
+        status = lines[0].split(' ', 2)
+        if len(status) < 2:
+            raise HandShakeError('Invalid status line: %r' % lines[0])
+        protocols, socket_code = status[:2]
         if protocols != "HTTP/1.1":
             raise HandShakeError("Unsupported HTTP version: %r" % protocols)
+        if not socket_code.isdigit() or not 100 <= int(socket_code) < 1000:
+            raise HandShakeError("Unsupported HTTP status code: %r" % socket_code)
         socket_code = int(socket_code)
-        if not 100 <= socket_code < 1000:
-            raise HandShakeError("Unsupported HTTP status code: %d" % socket_code)
+        headers = self.response_headers
+        for line in lines[1:]:
+            name, _, value = line.partition(':')
+            if _:
+                name, value = name.strip().lower(), value.strip()
+                # repeated headers are one comma separated list
+                headers[name] = headers[name] + ', ' + value if name in headers else value
+        if socket_code == 101:
+            self.verify()
         return socket_code
 
+    def verify(self):
+        """Check the accept key and the subprotocol of a 101 response"""
+        if self.key is not None:
+            if self.response_headers.get('sec-websocket-accept') != accept_key(self.key):
+                raise HandShakeError('Invalid Sec-WebSocket-Accept')
+        subprotocol = self.subprotocol
+        if subprotocol is not None and subprotocol not in self.subprotocols:
+            raise HandShakeError('Server chose a subprotocol that was not offered: %r'
+                                 % subprotocol)
+
+    @property
+    def subprotocol(self):
+        """The subprotocol the server selected, None without one"""
+        return self.response_headers.get('sec-websocket-protocol')
+
+    def negotiate(self):
+        """Return the extensions the server accepted, in offer order"""
+        header = self.response_headers.get('sec-websocket-extensions')
+        if not header:
+            return []
+        accepted = (extension.accept(header) for extension in self.extensions)
+        return [extension for extension in accepted if extension is not None]
+
+
+
+class ServerHandShake:
+    """Server side of the opening handshake.
+    The client's upgrade request is read in one go and checked, the
+    101 response carries the accept key, the chosen subprotocol and the
+    extensions that were agreed on. A request that is not a valid
+    WebSocket upgrade is answered with 400 and raises HandShakeError.
+
+    https://tools.ietf.org/html/rfc6455#section-4.2
+    """
+    __slots__ = ('reader', 'write', 'subprotocols', 'extensions', 'request', 'resource',
+                 'request_headers', 'subprotocol', 'accepted')
+
+    def __init__(self, reader, writer, subprotocols: list = None, extensions: list = None):
+        self.reader = reader
+        self.write = writer
+        self.subprotocols = subprotocols or []
+        self.extensions = extensions or []
+        self.request = None
+        self.resource = None
+        self.request_headers = {}
+        self.subprotocol = None
+        self.accepted = []
+
+    async def shake(self):
+        """Read the request and answer it, return the requested resource"""
+        try:
+            request = await self.reader.readuntil(b'\r\n\r\n')
+        except asyncio.IncompleteReadError as exc:
+            raise HandShakeError('Incomplete handshake request') from exc
+        except asyncio.LimitOverrunError as exc:
+            self.reject()
+            raise HandShakeError('Handshake request is too long') from exc
+        self.request = request
+        request_line, headers = self.parse_request(request)
+        self.request_headers = headers
+        try:
+            key = self.check(request_line, headers)
+        except HandShakeError:
+            self.reject()
+            raise
+        self.resource = request_line[1]
+        response = ['HTTP/1.1 101 Switching Protocols', 'Upgrade: websocket',
+                    'Connection: Upgrade', 'Sec-WebSocket-Accept: ' + accept_key(key)]
+        offered = [item.strip() for item in headers.get('sec-websocket-protocol', '').split(',')]
+        for subprotocol in self.subprotocols:
+            if subprotocol in offered:
+                self.subprotocol = subprotocol
+                response.append('Sec-WebSocket-Protocol: ' + subprotocol)
+                break
+        offer = headers.get('sec-websocket-extensions')
+        if offer:
+            agreed = []
+            for extension in self.extensions:
+                negotiated, value = extension.respond(offer)
+                if negotiated is not None:
+                    self.accepted.append(negotiated)
+                    agreed.append(value)
+            if agreed:
+                response.append('Sec-WebSocket-Extensions: ' + ', '.join(agreed))
+        self.write.write(('\r\n'.join(response) + '\r\n\r\n').encode())
+        return self.resource
+
+    @staticmethod
+    def parse_request(request: bytes):
+        """Split the request line and return it with the headers,
+        keyed by lower case name"""
+        lines = request.decode('latin-1').split('\r\n')
+        headers = {}
+        for line in lines[1:]:
+            name, found, value = line.partition(':')
+            if found:
+                name, value = name.strip().lower(), value.strip()
+                headers[name] = headers[name] + ', ' + value if name in headers else value
+        return lines[0].split(' '), headers
+
+    @staticmethod
+    def check(request_line: list, headers: dict) -> bytes:
+        """Validate the upgrade request, return the client's key"""
+        if len(request_line) != 3 or request_line[0] != 'GET' or request_line[2] != 'HTTP/1.1':
+            raise HandShakeError('Invalid request line: %r' % ' '.join(request_line))
+        if headers.get('upgrade', '').lower() != 'websocket':
+            raise HandShakeError('Missing Upgrade: websocket')
+        if 'upgrade' not in [token.strip().lower() for token in headers.get('connection', '').split(',')]:
+            raise HandShakeError('Missing Connection: Upgrade')
+        if headers.get('sec-websocket-version') != '13':
+            raise HandShakeError('Unsupported Sec-WebSocket-Version: %r'
+                                 % headers.get('sec-websocket-version'))
+        key = headers.get('sec-websocket-key', '').encode()
+        try:
+            if len(base64.b64decode(key, validate=True)) != 16:
+                raise ValueError(key)
+        except ValueError as exc:
+            raise HandShakeError('Invalid Sec-WebSocket-Key: %r' % key) from exc
+        return key
+
+    def reject(self):
+        self.write.write(b'HTTP/1.1 400 Bad Request\r\nSec-WebSocket-Version: 13\r\n'
+                         b'Content-Length: 0\r\nConnection: close\r\n\r\n')
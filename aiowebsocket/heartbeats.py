@@ -0,0 +1,184 @@
+import asyncio
+import logging
+import time
+from struct import pack
+
+from .enumerations import ControlFrames
+
+
+class TimerWheel:
+    """Hashed timer wheel driven by a single loop timer.
+
+    Timers are dropped into one of `size` slots by their due tick; each
+    tick only the current slot is looked at, so the cost per tick
+    depends on the timers due, not on how many are scheduled. The loop
+    timer only runs while there are timers, on the loop that scheduled
+    the last of them.
+    """
+    def __init__(self, resolution: float = 0.5, size: int = 512):
+        self.resolution = resolution
+        self.size = size
+        self.slots = [{} for _ in range(size)]
+        self.where = {}
+        self.tick = 0
+        self.handle = None
+        self.loop = None
+
+    def __len__(self):
+        return len(self.where)
+
+    def bind(self) -> bool:
+        """Run on the current event loop. Return True if that is a new
+        loop; the timers of the previous one are dropped then, as that
+        loop will not run them any more."""
+        loop = asyncio.get_event_loop()
+        if loop is self.loop:
+            return False
+        if self.handle is not None:
+            self.handle.cancel()
+            self.handle = None
+        for slot in self.slots:
+            slot.clear()
+        self.where.clear()
+        self.loop = loop
+        return True
+
+    def schedule(self, key, delay: float, callback):
+        """Call `callback(key)` after about `delay` seconds,
+        replacing the timer `key` had before"""
+        self.bind()
+        self.cancel(key)
+        ticks = round(delay / self.resolution) or 1
+        slot = (self.tick + ticks) % self.size
+        self.slots[slot][key] = [(ticks - 1) // self.size, callback]
+        self.where[key] = slot
+        if self.handle is None:
+            self.handle = self.loop.call_later(self.resolution, self.advance)
+
+    def cancel(self, key):
+        slot = self.where.pop(key, None)
+        if slot is not None:
+            del self.slots[slot][key]
+
+    def advance(self):
+        self.handle = None
+        self.tick += 1
+        slot = self.slots[self.tick % self.size]
+        due = []
+        for key, entry in slot.items():
+            if entry[0]:
+                entry[0] -= 1
+            else:
+                due.append((key, entry[1]))
+        for key, callback in due:
+            del slot[key]
+            del self.where[key]
+        for key, callback in due:
+            try:
+                callback(key)
+            except Exception:
+                logging.exception('Timer callback failed')
+        if self.where and self.handle is None:
+            self.handle = self.loop.call_later(self.resolution, self.advance)
+
+
+class Heartbeat:
+    """Keepalive for any number of connections on one timer wheel.
+
+    Every registered Converse is pinged each `interval` seconds. The
+    matching pong gives the round-trip time; a connection that has not
+    answered within `timeout` is considered dead, its transport is aborted
+    and `on_dead(converse)` is called. A connection holds one timer at a
+    time, pongs do not touch the wheel. Pongs are only seen when frames are
+    read, so the connection needs a reader: the background reader task,
+    raw protocol mode or a consumer that keeps calling receive.
+    """
+    def __init__(self, interval: float = 20, timeout: float = 10,
+                 resolution: float = 0.5, on_dead=None):
+        self.interval = interval
+        self.timeout = timeout
+        self.on_dead = on_dead
+        self.wheel = TimerWheel(resolution)
+        self.states = {}
+        self.counter = 0
+
+    def __len__(self):
+        return len(self.states)
+
+    def register(self, converse):
+        """Start pinging a connection"""
+        if self.wheel.bind():
+            # connections of an event loop that is gone
+            self.states.clear()
+        state = {'payload': None, 'sent': None, 'rtt': None, 'pings': 0, 'pongs': 0}
+        self.states[converse] = state
+        converse.frame.on_pong = lambda message: self.pong(converse, message)
+        # spread the first pings over the interval instead of sending them in one burst
+        self.counter += 1
+        offset = (self.counter * 0.618034) % 1 * self.interval
+        self.wheel.schedule(converse, offset or self.wheel.resolution, self.ping)
+
+    def unregister(self, converse):
+        if self.states.pop(converse, None) is not None:
+            self.wheel.cancel(converse)
+            converse.frame.on_pong = None
+
+    def stats(self, converse):
+        """Round-trip time of the last pong and ping/pong counts"""
+        state = self.states[converse]
+        return {'rtt': state['rtt'], 'pings': state['pings'], 'pongs': state['pongs']}
+
+    def ping(self, converse):
+        state = self.states.get(converse)
+        if state is None:
+            return
+        if converse.writer.is_closing():
+            self.unregister(converse)
+            return
+        self.counter += 1
+        state['payload'] = pack('!Q', self.counter)
+        state['sent'] = time.monotonic()
+        state['pings'] += 1
+        self.wheel.schedule(converse, self.timeout, self.check)
+        converse.frame.send_frame(True, ControlFrames.ping.value, state['payload'])
+
+    def pong(self, converse, message: bytes):
+        state = self.states.get(converse)
+        if state is None or message != state['payload']:
+            return
+        state['rtt'] = time.monotonic() - state['sent']
+        state['pongs'] += 1
+        state['payload'] = None
+
+    def check(self, converse):
+        """The timeout of the last ping is over"""
+        state = self.states.get(converse)
+        if state is None:
+            return
+        if state['payload'] is None:
+            if self.interval > self.timeout:
+                self.wheel.schedule(converse, self.interval - self.timeout, self.ping)
+            else:
+                self.ping(converse)
+            return
+        logging.warning('No pong within {}s, closing the connection'.format(self.timeout))
+        self.unregister(converse)
+        # close would wait for the write buffer to drain, which a dead peer never does
+        transport = getattr(converse.writer, 'transport', None)
+        if transport is not None:
+            transport.abort()
+        else:
+            converse.writer.close()
+        if self.on_dead is not None:
+            self.on_dead(converse)
+
+
+_heartbeat = None
+
+
+def default_heartbeat():
+    """The Heartbeat shared by the connections of the process"""
+    global _heartbeat
+    if _heartbeat is None:
+        _heartbeat = Heartbeat()
+    return _heartbeat
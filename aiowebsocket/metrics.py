@@ -0,0 +1,154 @@
+import weakref
+from bisect import bisect_left
+
+
+OPCODES = {0x00: 'cont', 0x01: 'text', 0x02: 'binary',
+           0x08: 'close', 0x09: 'ping', 0x0A: 'pong'}
+
+
+class Histogram:
+    """Distribution of durations in seconds.
+    Bucket bounds double from one microsecond up to about 17 seconds,
+    recording a value is one bisect and a few additions."""
+    bounds = [2**i / 1e6 for i in range(25)]
+
+    def __init__(self):
+        self.counts = [0] * (len(self.bounds) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.min = None
+        self.max = None
+
+    def record(self, value: float):
+        self.counts[bisect_left(self.bounds, value)] += 1
+        self.count += 1
+        self.total += value
+        if self.min is None or value < self.min:
+            self.min = value
+        if self.max is None or value > self.max:
+            self.max = value
+
+    def quantile(self, q: float):
+        """Upper bound of the bucket holding the q-quantile"""
+        if not self.count:
+            return None
+        rank, seen = q * self.count, 0
+        for bound, count in zip(self.bounds, self.counts):
+            seen += count
+            if seen >= rank:
+                return min(bound, self.max)
+        return self.max
+
+    def snapshot(self):
+        return {'count': self.count, 'sum': self.total, 'min': self.min, 'max': self.max,
+                'p50': self.quantile(0.5), 'p99': self.quantile(0.99),
+                'buckets': {bound: count for bound, count in zip(self.bounds + [None], self.counts)
+                            if count}}
+
+
+class Metrics:
+    """Frame, byte and latency counters of one connection or many.
+
+    Frames and bytes are counted by opcode in both directions; parse
+    time (per received chunk), queue wait time (from parsing a frame to
+    handing it to `receive`), handshake and close duration go into
+    histograms. Closes are counted as clean (the peer answered the Close
+    frame) or aborted.
+    Nothing is measured unless a Metrics is given to AioWebSocket, the
+    hot paths only check for None.
+
+    A Metrics with a `parent` passes everything on to it as well, so
+    one shared Metrics can aggregate any number of connections while
+    each of them keeps its own. `snapshot` returns a plain dict for
+    exporting; `hooks` are called as `hook(name, value, opcode)` for
+    every frame and measurement, for pipelines that want events
+    instead of polling.
+    """
+    histograms = ('parse_time', 'queue_wait', 'handshake', 'close')
+
+    def __init__(self, parent: 'Metrics' = None, hooks: list = None):
+        self.parent = parent
+        self.hooks = list(hooks or [])
+        self.frames_in = [0] * 16
+        self.frames_out = [0] * 16
+        self.bytes_in = [0] * 16
+        self.bytes_out = [0] * 16
+        self.timings = {name: Histogram() for name in self.histograms}
+        self.closes = {'clean': 0, 'aborted': 0}
+        self.converses = weakref.WeakSet()
+
+    def child(self, hooks: list = None):
+        """A Metrics for one connection that reports to this one"""
+        return type(self)(parent=self, hooks=hooks)
+
+    def watch(self, converse):
+        """Include the backlog of a connection in the snapshot"""
+        self.converses.add(converse)
+        if self.parent is not None:
+            self.parent.watch(converse)
+
+    def received(self, frames, elapsed: float):
+        """Frames parsed from one chunk in `elapsed` seconds"""
+        for frame in frames:
+            self.frames_in[frame.code] += 1
+            self.bytes_in[frame.code] += len(frame.message)
+        self.timings['parse_time'].record(elapsed)
+        if self.hooks:
+            for frame in frames:
+                self.call_hooks('frame_in', len(frame.message), frame.code)
+            self.call_hooks('parse_time', elapsed)
+        if self.parent is not None:
+            self.parent.received(frames, elapsed)
+
+    def sent(self, code: int, size: int):
+        self.frames_out[code] += 1
+        self.bytes_out[code] += size
+        if self.hooks:
+            self.call_hooks('frame_out', size, code)
+        if self.parent is not None:
+            self.parent.sent(code, size)
+
+    def observe(self, name: str, value: float):
+        """Record a duration in one of the histograms"""
+        self.timings[name].record(value)
+        if self.hooks:
+            self.call_hooks(name, value)
+        if self.parent is not None:
+            self.parent.observe(name, value)
+
+    def closed(self, clean: bool, elapsed: float):
+        """A connection was closed in `elapsed` seconds"""
+        self.closes['clean' if clean else 'aborted'] += 1
+        self.timings['close'].record(elapsed)
+        if self.hooks:
+            self.call_hooks('close_clean' if clean else 'close_aborted', elapsed)
+        if self.parent is not None:
+            self.parent.closed(clean, elapsed)
+
+    def call_hooks(self, name: str, value, opcode: int = None):
+        for hook in self.hooks:
+            hook(name, value, opcode)
+
+    @property
+    def backlog(self):
+        """Messages and bytes waiting in the receive queues,
+        bytes waiting to be written"""
+        queued = queued_bytes = buffered = 0
+        for converse in list(self.converses):
+            queued += converse.get_queue_size
+            queued_bytes += converse.get_queue_bytes
+            buffered += converse.get_write_buffer_size
+        return {'connections': len(self.converses), 'queued': queued,
+                'queued_bytes': queued_bytes, 'write_buffer': buffered}
+
+    def snapshot(self):
+        """All counters as a dict of plain values"""
+        def by_opcode(counts):
+            return {OPCODES.get(code, code): count for code, count in enumerate(counts) if count}
+        return {'frames_in': by_opcode(self.frames_in),
+                'frames_out': by_opcode(self.frames_out),
+                'bytes_in': by_opcode(self.bytes_in),
+                'bytes_out': by_opcode(self.bytes_out),
+                'closes': dict(self.closes),
+                'backlog': self.backlog,
+                **{name: histogram.snapshot() for name, histogram in self.timings.items()}}
@@ -0,0 +1,54 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+
+from .enumerations import DataFrames
+
+
+class Offload:
+    """Move the payload work of large messages off the event loop.
+
+    Messages of at least `threshold` bytes on the wire are compressed,
+    masked, inflated, decoded from UTF-8 and parsed by codecs in an
+    executor, smaller ones stay on the inline path. (De)compression and
+    masking use the state of their connection and run in a thread pool
+    (zlib releases the GIL, masking is Python code the loop can
+    interleave with). UTF-8 decoding and codec parsing are single calls which hold
+    the GIL; they run in `executor`, which may be a ProcessPoolExecutor
+    to give them a core of their own, and default to the thread pool.
+
+        offload = Offload(threshold=2**20, executor=ProcessPoolExecutor(2))
+        aws = AioWebSocket(uri, offload=offload)
+    """
+    def __init__(self, threshold: int = 2**20, executor=None, threads: int = None):
+        self.threshold = threshold
+        self.executor = executor
+        self.threads = threads
+        self.thread_pool = None
+
+    def wanted(self, size: int):
+        return size >= self.threshold
+
+    def run_thread(self, func, *args):
+        """Run `func` in the thread pool"""
+        if self.thread_pool is None:
+            self.thread_pool = ThreadPoolExecutor(self.threads, thread_name_prefix='aiowebsocket')
+        return asyncio.get_event_loop().run_in_executor(self.thread_pool, func, *args)
+
+    def run(self, func, *args):
+        """Run `func` in `executor`, the thread pool if there is none"""
+        if self.executor is None:
+            return self.run_thread(func, *args)
+        return asyncio.get_event_loop().run_in_executor(self.executor, func, *args)
+
+    async def complete(self, frames, frame, text=False):
+        """The offloaded Frames.complete: inflate and convert a large message"""
+        if frame.rsv1 and frames.extension is not None:
+            frame = await self.run_thread(frames.inflate, frame)
+        if text and frame.code == DataFrames.binary:
+            return await self.run(frames.convert, frame, text)
+        return frames.convert(frame, text)
+
+    def shutdown(self):
+        if self.thread_pool is not None:
+            self.thread_pool.shutdown(wait=False)
+            self.thread_pool = None
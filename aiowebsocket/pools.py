@@ -0,0 +1,143 @@
+import asyncio
+import itertools
+import logging
+import ssl
+
+from .converses import AioWebSocket, close_all
+from .freams import PreparedMessage
+
+
+class WebSocketPool:
+    """Manage many AioWebSocket connections as one.
+
+    Handshakes run at most `max_handshakes` at a time. Like every
+    AioWebSocket, wss connections share the process-wide SSLContext
+    (or `ssl_context`) and hosts are resolved through the DNS cache.
+    Messages from all connections are merged into one stream of
+    (conn_id, message) pairs:
+
+        async with WebSocketPool() as pool:
+            await pool.connect_many(uris)
+            async for conn_id, message in pool:
+                ...
+
+    The merged queue is bounded by `maxsize`; when the consumer falls
+    behind the per-connection readers stop reading, which leaves the
+    backpressure to TCP. Remaining keyword arguments are passed on
+    to every AioWebSocket.
+    """
+    def __init__(self, max_handshakes: int = 64, maxsize: int = 2**16,
+                 text: bool = False, ssl_context: ssl.SSLContext = None, **options):
+        self.max_handshakes = max_handshakes
+        self.text = text
+        self.ssl_context = ssl_context
+        self.options = options
+        self.connections = {}
+        self.readers = {}
+        self.failed = {}
+        self.messages = asyncio.Queue(maxsize=maxsize)
+        self.handshakes = None
+        self.counter = itertools.count()
+
+    def __len__(self):
+        return len(self.connections)
+
+    async def connect(self, uri: str, conn_id=None, **options):
+        """Open one connection, return its id"""
+        if self.handshakes is None:
+            self.handshakes = asyncio.Semaphore(self.max_handshakes)
+        conn_id = next(self.counter) if conn_id is None else conn_id
+        if conn_id in self.connections:
+            raise ValueError('Connection id {} is already in use'.format(conn_id))
+        options = dict(self.options, **options)
+        if self.ssl_context is not None:
+            options.setdefault('ssl', self.ssl_context)
+        async with self.handshakes:
+            aws = AioWebSocket(uri, **options)
+            await aws.__aenter__()
+        self.connections[conn_id] = aws
+        self.readers[conn_id] = asyncio.ensure_future(self.forward(conn_id, aws))
+        return conn_id
+
+    async def connect_many(self, uris, **options):
+        """Open a connection for every uri concurrently.
+        Return the ids in the same order, None for connections
+        that failed; their errors are kept in `failed`."""
+        results = await asyncio.gather(*[self.connect(uri, **options) for uri in uris],
+                                       return_exceptions=True)
+        conn_ids = []
+        for uri, result in zip(uris, results):
+            if isinstance(result, BaseException):
+                logging.warning('Connect to {} failed: {!r}'.format(uri, result))
+                self.failed[uri] = result
+                result = None
+            conn_ids.append(result)
+        return conn_ids
+
+    async def forward(self, conn_id, aws):
+        """Move the messages of one connection into the merged queue"""
+        converse = aws.manipulator
+        try:
+            while True:
+                message = await converse.receive(text=self.text, control=False)
+                await self.messages.put((conn_id, message))
+        except asyncio.CancelledError:
+            raise
+        except Exception as exc:
+            logging.warning('Connection {} lost: {!r}'.format(conn_id, exc))
+            self.failed[conn_id] = exc
+            self.connections.pop(conn_id, None)
+            self.readers.pop(conn_id, None)
+
+    async def receive(self):
+        """Return the next (conn_id, message) from any connection"""
+        return await self.messages.get()
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        return await self.messages.get()
+
+    async def send(self, conn_id, message):
+        """Send a message on one connection"""
+        await self.connections[conn_id].manipulator.send(message)
+
+    async def fan_out(self, message, conn_ids=None):
+        """Send the same message on many connections,
+        all of them when `conn_ids` is not given.
+        The frame is prepared once and only masked per connection."""
+        if conn_ids is None:
+            conn_ids = list(self.connections)
+        if not isinstance(message, PreparedMessage):
+            message = PreparedMessage(message)
+        await asyncio.gather(*[self.connections[conn_id].manipulator.send_prepared(message)
+                               for conn_id in conn_ids])
+
+    async def disconnect(self, conn_id):
+        aws = self.connections.pop(conn_id)
+        reader = self.readers.pop(conn_id, None)
+        if reader is not None:
+            reader.cancel()
+        try:
+            await aws.close_connection()
+        finally:
+            aws.writer.close()
+
+    async def close(self, timeout: float = 5) -> dict:
+        """Close every connection concurrently within `timeout` seconds,
+        return how many were closed cleanly and how many aborted"""
+        readers = list(self.readers.values())
+        self.readers.clear()
+        for reader in readers:
+            reader.cancel()
+        await asyncio.gather(*readers, return_exceptions=True)
+        connections = list(self.connections.values())
+        self.connections.clear()
+        return await close_all(connections, timeout=timeout)
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        await self.close()
@@ -0,0 +1,140 @@
+import asyncio
+import time
+
+from .enumerations import ControlFrames, DataFrames
+from .exceptions import FrameError
+
+
+class WebSocketProtocol(asyncio.Protocol):
+    """Connection mode built directly on asyncio.Protocol.
+
+    Until the handshake is done the protocol behaves like a small
+    StreamReader/StreamWriter pair, so HandShake can use it unchanged.
+    After `upgrade` every chunk from `data_received` goes straight into
+    the frame parser and complete frames land in the Converse message
+    queue, there is no StreamReader buffer and no await per frame.
+    """
+    __slots__ = ('transport', 'converse', 'buffer', 'waiter', 'exception', 'paused',
+                 'drain_waiters')
+
+    def __init__(self):
+        self.transport = None
+        self.converse = None
+        self.buffer = bytearray()
+        self.waiter = None
+        self.exception = None
+        self.paused = False
+        self.drain_waiters = None
+
+    def connection_made(self, transport):
+        self.transport = transport
+
+    def connection_lost(self, exc):
+        self.exception = exc or ConnectionError('Connection closed')
+        self.wakeup()
+        if self.converse is not None:
+            self.converse.message_queue.put_nowait(self.exception)
+            self.converse.frame.connection_lost(self.exception)
+        self.resume_writing()
+
+    def data_received(self, data):
+        if self.converse is None:
+            self.buffer += data
+            self.wakeup()
+        else:
+            self.feed(data)
+
+    def pause_writing(self):
+        self.paused = True
+
+    def resume_writing(self):
+        self.paused = False
+        waiters, self.drain_waiters = self.drain_waiters, None
+        for waiter in waiters or ():
+            if not waiter.done():
+                waiter.set_result(None)
+
+    def wakeup(self):
+        if self.waiter is not None and not self.waiter.done():
+            self.waiter.set_result(None)
+
+    def feed(self, data):
+        """Parse a chunk and queue the complete frames,
+        control frames are answered by the Frames of the converse."""
+        frames = self.converse.frame
+        queue = self.converse.message_queue
+        if frames.capture is not None:
+            frames.capture.record(data)
+        try:
+            if frames.metrics is None:
+                parsed = frames.parser.feed(data)
+            else:
+                started = time.perf_counter()
+                parsed = frames.parser.feed(data)
+                frames.metrics.received(parsed, time.perf_counter() - started)
+        except FrameError as exc:
+            self.transport.close()
+            queue.put_nowait(exc)
+            return
+        for frame in parsed:
+            if frame.code in DataFrames._value2member_map_:
+                queue.put_nowait(frame)
+            elif frame.code in ControlFrames._value2member_map_:
+                asyncio.ensure_future(frames.extra_operation(frame.code, frame.message))
+            else:
+                self.transport.close()
+                queue.put_nowait(FrameError('Invalid operation code.'))
+                return
+
+    def upgrade(self, converse):
+        """Switch from handshake to frame mode, bytes which
+        arrived together with the handshake response are parsed now."""
+        self.converse = converse
+        # the handshake buffer is not needed in frame mode
+        data, self.buffer = bytes(self.buffer), None
+        if data:
+            self.feed(data)
+        if self.exception is not None:
+            converse.message_queue.put_nowait(self.exception)
+
+    async def readuntil(self, separator: bytes = b'\n', limit: int = 2**16):
+        """Return the handshake response up to and including `separator`"""
+        while True:
+            end = self.buffer.find(separator)
+            if end >= 0:
+                data = bytes(self.buffer[:end + len(separator)])
+                del self.buffer[:end + len(separator)]
+                return data
+            if len(self.buffer) > limit:
+                raise asyncio.LimitOverrunError('Separator is not found, limit exceeded',
+                                                len(self.buffer))
+            if self.exception is not None:
+                raise asyncio.IncompleteReadError(bytes(self.buffer), None)
+            self.waiter = asyncio.get_event_loop().create_future()
+            await self.waiter
+            self.waiter = None
+
+    def write(self, data):
+        self.transport.write(data)
+
+    def writelines(self, data):
+        self.transport.writelines(data)
+
+    async def drain(self):
+        if self.exception is not None:
+            raise self.exception
+        if self.paused:
+            waiter = asyncio.get_event_loop().create_future()
+            if self.drain_waiters is None:
+                self.drain_waiters = []
+            self.drain_waiters.append(waiter)
+            await waiter
+
+    def close(self):
+        self.transport.close()
+
+    def is_closing(self):
+        return self.transport.is_closing()
+
+    def get_extra_info(self, name, default=None):
+        return self.transport.get_extra_info(name, default)
@@ -0,0 +1,101 @@
+import asyncio
+import time
+from collections import deque
+
+
+class MessageQueue:
+    """Received frames waiting for the consumer.
+
+    The queue is bounded both by the number of frames and by the bytes
+    of their payloads. Crossing a high watermark calls `on_pause`
+    (normally the transport's pause_reading), falling back under both
+    low watermarks calls `on_resume`, so a slow consumer produces TCP
+    backpressure instead of an ever growing buffer. Putting never
+    blocks: the frames of a chunk which is already parsed are kept.
+    With `metrics` the time every item spent in the queue is recorded.
+    The deques are only allocated when the first item arrives, an idle
+    connection does not pay for them.
+    """
+    __slots__ = ('items', 'nbytes', 'maxsize', 'maxbytes', 'low_size', 'low_bytes', 'on_pause',
+                 'on_resume', 'paused', 'getters', 'resumer', 'metrics', 'stamps')
+
+    def __init__(self, maxsize: int = 2**16, maxbytes: int = 2**24,
+                 low_size: int = None, low_bytes: int = None,
+                 on_pause=None, on_resume=None, metrics=None):
+        self.items = None
+        self.nbytes = 0
+        self.maxsize = maxsize
+        self.maxbytes = maxbytes
+        self.low_size = maxsize // 2 if low_size is None else low_size
+        self.low_bytes = maxbytes // 2 if low_bytes is None else low_bytes
+        self.on_pause = on_pause
+        self.on_resume = on_resume
+        self.paused = False
+        self.getters = None
+        self.resumer = None
+        self.metrics = metrics
+        self.stamps = None
+
+    def qsize(self):
+        return len(self.items) if self.items is not None else 0
+
+    def full(self):
+        return self.qsize() >= self.maxsize or self.nbytes >= self.maxbytes
+
+    @property
+    def watermarks(self):
+        """High and low watermarks as ((messages, bytes), (messages, bytes))"""
+        return (self.maxsize, self.maxbytes), (self.low_size, self.low_bytes)
+
+    def put_nowait(self, item):
+        """Queue a frame, or the exception which ended the connection"""
+        if self.items is None:
+            self.items = deque()
+            if self.metrics is not None:
+                self.stamps = deque()
+        self.items.append(item)
+        if self.stamps is not None:
+            self.stamps.append(time.monotonic())
+        if not isinstance(item, Exception):
+            self.nbytes += len(item.message)
+        if self.getters:
+            getters, self.getters = self.getters, None
+            for getter in getters:
+                if not getter.done():
+                    getter.set_result(None)
+        if not self.paused and self.full():
+            self.paused = True
+            if self.on_pause is not None:
+                self.on_pause()
+
+    def get_nowait(self):
+        item = self.items.popleft()
+        if self.stamps is not None:
+            self.metrics.observe('queue_wait', time.monotonic() - self.stamps.popleft())
+        if not isinstance(item, Exception):
+            self.nbytes -= len(item.message)
+        if self.paused and len(self.items) <= self.low_size and self.nbytes <= self.low_bytes:
+            self.paused = False
+            if self.on_resume is not None:
+                self.on_resume()
+            if self.resumer is not None and not self.resumer.done():
+                self.resumer.set_result(None)
+        return item
+
+    async def get(self):
+        while not self.items:
+            getter = asyncio.get_event_loop().create_future()
+            if self.getters is None:
+                self.getters = []
+            self.getters.append(getter)
+            await getter
+        return self.get_nowait()
+
+    async def wait_resumed(self):
+        """Wait until the consumer drained the queue below the low watermarks"""
+        while self.paused:
+            self.resumer = asyncio.get_event_loop().create_future()
+            try:
+                await self.resumer
+            finally:
+                self.resumer = None
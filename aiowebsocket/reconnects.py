@@ -0,0 +1,189 @@
+import asyncio
+import logging
+import random
+import time
+import weakref
+from collections import deque
+
+from .converses import AioWebSocket
+from .exceptions import HandShakeError
+
+
+class ReconnectingWebSocket:
+    """AioWebSocket that reconnects by itself.
+
+    A lost connection is replaced by a new AioWebSocket after an
+    exponential backoff with full jitter, which applies to the first
+    attempt after the loss as well, so clients that lost the same
+    server do not come back at the same moment. At most
+    `max_concurrent` reconnects of the whole process are in flight at a
+    time. Messages sent while disconnected are kept (up to
+    `pending_limit`, oldest dropped first) and replayed after the
+    `on_reconnect` hooks. The hooks run after every successful
+    connection, the first one included, which makes them the place
+    to subscribe:
+
+        async def resubscribe(ws):
+            await ws.send(subscription)
+
+        ws = ReconnectingWebSocket(uri, on_reconnect=[resubscribe])
+        await ws.connect()
+        while True:
+            message = await ws.receive()
+
+    Remaining keyword arguments are passed on to AioWebSocket.
+    """
+    max_concurrent = 16
+    # a semaphore of max_concurrent per event loop
+    slots = weakref.WeakKeyDictionary()
+
+    def __init__(self, uri: str, base_delay: float = 0.5, max_delay: float = 30,
+                 factor: float = 2, max_attempts: int = None,
+                 pending_limit: int = 1024, on_reconnect: list = None, **options):
+        self.uri = uri
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.factor = factor
+        self.max_attempts = max_attempts
+        self.options = options
+        self.on_reconnect = list(on_reconnect or [])
+        self.pending = deque(maxlen=pending_limit)
+        self.aws = None
+        self.reconnecting = None
+        self.resuming = False
+        self.closed = False
+        self.reconnects = 0
+        self.failed_attempts = 0
+        self.disconnected_since = None
+        self.disconnected_time = 0.0
+
+    @property
+    def connected(self):
+        return self.aws is not None and self.aws.connected
+
+    @property
+    def stats(self):
+        disconnected = self.disconnected_time
+        if self.disconnected_since is not None:
+            disconnected += time.monotonic() - self.disconnected_since
+        return {'reconnects': self.reconnects,
+                'failed_attempts': self.failed_attempts,
+                'disconnected_time': disconnected,
+                'pending': len(self.pending)}
+
+    def backoff(self, attempt: int):
+        """Delay before the given attempt, chosen uniformly
+        between zero and the capped exponential delay"""
+        return random.uniform(0, min(self.max_delay, self.base_delay * self.factor ** attempt))
+
+    async def connect(self):
+        """Connect, retrying with backoff until it works"""
+        task = self.start()
+        if task is not None:
+            await asyncio.shield(task)
+
+    def start(self):
+        """Start (re)connecting in the background unless it already is"""
+        if self.reconnecting is None and not self.closed:
+            self.reconnecting = asyncio.ensure_future(self.establish())
+            self.reconnecting.add_done_callback(self.established)
+        return self.reconnecting
+
+    def established(self, task):
+        self.reconnecting = None
+        if not task.cancelled() and task.exception() is not None:
+            logging.warning('Reconnect to {} gave up: {!r}'.format(self.uri, task.exception()))
+
+    async def establish(self):
+        loop = asyncio.get_event_loop()
+        slots = self.slots.get(loop)
+        if slots is None:
+            slots = self.slots[loop] = asyncio.Semaphore(self.max_concurrent)
+        reconnect = self.aws is not None
+        self.drop()
+        attempt = 0
+        while not self.closed:
+            # a lost connection waits as well, or every client would be back at once
+            if attempt or reconnect:
+                await asyncio.sleep(self.backoff(attempt))
+            async with slots:
+                aws = AioWebSocket(self.uri, **self.options)
+                try:
+                    await aws.__aenter__()
+                except (OSError, asyncio.TimeoutError, asyncio.IncompleteReadError,
+                        HandShakeError) as exc:
+                    if aws.writer is not None:
+                        aws.writer.close()
+                    self.failed_attempts += 1
+                    attempt += 1
+                    logging.warning('Connect to {} failed: {!r}'.format(self.uri, exc))
+                    if self.max_attempts is not None and attempt >= self.max_attempts:
+                        raise
+                    continue
+            self.aws = aws
+            break
+        if self.closed:
+            return
+        if self.disconnected_since is not None:
+            self.disconnected_time += time.monotonic() - self.disconnected_since
+            self.disconnected_since = None
+        if reconnect:
+            self.reconnects += 1
+        self.resuming = True
+        try:
+            for hook in self.on_reconnect:
+                await hook(self)
+        finally:
+            self.resuming = False
+        while self.pending and self.connected:
+            message, options = self.pending.popleft()
+            await self.aws.manipulator.send(message, **options)
+
+    def drop(self):
+        """Forget the current connection"""
+        if self.aws is not None and self.aws.writer is not None:
+            self.aws.writer.close()
+        if self.disconnected_since is None:
+            self.disconnected_since = time.monotonic()
+
+    async def send(self, message, **options):
+        """Send now, or keep the message until the connection is back"""
+        if self.connected and (self.reconnecting is None or self.resuming):
+            try:
+                await self.aws.manipulator.send(message, **options)
+                return
+            except (OSError, ConnectionError):
+                pass
+        self.pending.append((message, options))
+        self.start()
+
+    async def receive(self, text: bool = False):
+        """Return the next data message, reconnecting as often as needed"""
+        while not self.closed:
+            if not self.connected or self.reconnecting is not None:
+                await self.connect()
+                continue
+            try:
+                return await self.aws.manipulator.receive(text=text, control=False)
+            except (OSError, ConnectionError, asyncio.IncompleteReadError) as exc:
+                logging.warning('Connection to {} lost: {!r}'.format(self.uri, exc))
+                self.drop()
+        raise ConnectionError('ReconnectingWebSocket is closed')
+
+    async def close(self):
+        self.closed = True
+        if self.reconnecting is not None:
+            self.reconnecting.cancel()
+            self.reconnecting = None
+        if self.connected:
+            try:
+                await self.aws.close_connection()
+            finally:
+                self.aws.writer.close()
+
+    async def __aenter__(self):
+        await self.connect()
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        await self.close()
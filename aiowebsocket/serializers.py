@@ -0,0 +1,164 @@
+import json
+import re
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+try:
+    import ujson
+except ImportError:
+    ujson = None
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+from .enumerations import DataFrames
+
+
+WHITESPACE = re.compile(r'[ \t\n\r]*')
+
+
+class Codec:
+    """Turns objects into message payloads and back.
+
+    `decode` is given the payload as received, bytes or a memoryview,
+    there is no decoding to str in between. `opcode` is the frame type
+    the encoded payload is sent as.
+    """
+    name = None
+    opcode = DataFrames.text.value
+
+    def encode(self, obj) -> bytes:
+        raise NotImplementedError
+
+    def decode(self, data):
+        raise NotImplementedError
+
+    def decode_many(self, messages: list) -> list:
+        return [self.decode(message) for message in messages]
+
+    def __reduce__(self):
+        # the shared instance of the other process, a codec can be sent to a
+        # process pool although encoders and decoders cannot be pickled
+        return get_codec, (self.name,)
+
+
+class JsonCodec(Codec):
+    """The standard library json module, always available"""
+    name = 'json'
+
+    def __init__(self):
+        self.encoder = json.JSONEncoder(ensure_ascii=False, separators=(',', ':'))
+        self.decoder = json.JSONDecoder()
+
+    def encode(self, obj) -> bytes:
+        return self.encoder.encode(obj).encode()
+
+    def decode(self, data):
+        # WebSocket text is UTF-8, json.loads would detect the encoding of bytes first
+        return json.loads(str(data, 'utf-8'))
+
+    def decode_many(self, messages: list) -> list:
+        # json.loads has a fixed cost per call, the scanner is run over all
+        # messages joined instead; every value must end where its message
+        # ends, a broken message is then found by decoding one by one
+        texts = [str(message, 'utf-8') for message in messages]
+        text = '\n'.join(texts)
+        scan, skip = self.decoder.scan_once, WHITESPACE.match
+        objs, position = [], 0
+        try:
+            for part in texts:
+                boundary = position + len(part)
+                obj, end = scan(text, skip(text, position).end())
+                if not end <= boundary <= skip(text, end).end():
+                    break
+                objs.append(obj)
+                position = boundary + 1
+            else:
+                return objs
+        except StopIteration:
+            pass
+        return [self.decode(message) for message in messages]
+
+
+class OrjsonCodec(Codec):
+    name = 'orjson'
+
+    def __init__(self):
+        if orjson is None:
+            raise ImportError('The orjson codec needs the orjson package')
+
+    def encode(self, obj) -> bytes:
+        return orjson.dumps(obj)
+
+    def decode(self, data):
+        return orjson.loads(data)
+
+
+class UjsonCodec(Codec):
+    name = 'ujson'
+
+    def __init__(self):
+        if ujson is None:
+            raise ImportError('The ujson codec needs the ujson package')
+
+    def encode(self, obj) -> bytes:
+        return ujson.dumps(obj, ensure_ascii=False).encode()
+
+    def decode(self, data):
+        return ujson.loads(data if isinstance(data, (bytes, str)) else bytes(data))
+
+
+class MsgpackCodec(Codec):
+    """MessagePack, sent in binary frames"""
+    name = 'msgpack'
+    opcode = DataFrames.binary.value
+
+    def __init__(self):
+        if msgpack is None:
+            raise ImportError('The msgpack codec needs the msgpack package')
+        self.packer = msgpack.Packer()
+
+    def encode(self, obj) -> bytes:
+        return self.packer.pack(obj)
+
+    def decode(self, data):
+        return msgpack.unpackb(data)
+
+    def decode_many(self, messages: list) -> list:
+        # one Unpacker walks over every payload instead of one unpackb call each,
+        # every object must end where its message ends
+        unpacker = msgpack.Unpacker()
+        objs, boundary = [], 0
+        for message in messages:
+            unpacker.feed(message)
+            boundary += len(message)
+            try:
+                objs.append(unpacker.unpack())
+            except msgpack.OutOfData:
+                break
+            if unpacker.tell() != boundary:
+                break
+        else:
+            return objs
+        return [self.decode(message) for message in messages]
+
+
+CODECS = {codec.name: codec for codec in (OrjsonCodec, UjsonCodec, JsonCodec, MsgpackCodec)}
+
+
+_codecs = {}
+
+
+def get_codec(name: str = None) -> Codec:
+    """Return a codec by name, or without a name the
+    fastest JSON codec that is installed. Codecs keep no state
+    of a connection, every connection shares the same instance."""
+    if name is None:
+        name = 'orjson' if orjson is not None else 'ujson' if ujson is not None else 'json'
+    codec = _codecs.get(name)
+    if codec is None:
+        codec = _codecs[name] = CODECS[name]()
+    return codec
@@ -0,0 +1,189 @@
+import asyncio
+import logging
+
+from .converses import Converse, close_all
+from .enumerations import CloseCodes, DataFrames
+from .exceptions import FrameError, HandShakeError
+from .extensions import PerMessageDeflate
+from .freams import PreparedMessage
+from .handshakes import ServerHandShake
+
+
+class ServerConnection(Converse):
+    """Converse of one client accepted by AioWebSocketServer.
+    It reads masked frames and writes unmasked ones, everything else
+    works like on the client side. Of the handshake only the request
+    bytes, the resource and the subprotocol are kept."""
+    __slots__ = ('request', 'resource', 'subprotocol')
+
+    def __init__(self, reader, writer, hands: ServerHandShake, **options):
+        super().__init__(reader, writer, server=True, **options)
+        self.request = hands.request
+        self.resource = hands.resource
+        self.subprotocol = hands.subprotocol
+        for extension in hands.accepted:
+            self.frame.extension = extension
+
+    async def receive(self, text=False, mask=False, control=False):
+        """Like Converse.receive, but pings and Close frames are only
+        answered and never returned as messages"""
+        return await super().receive(text, mask, control)
+
+    @property
+    def request_headers(self):
+        """Headers of the upgrade request, parsed again on every access
+        instead of keeping a dict per connection"""
+        return ServerHandShake.parse_request(self.request)[1]
+
+    @property
+    def remote_address(self):
+        return self.writer.get_extra_info('peername')
+
+
+class AioWebSocketServer:
+    """WebSocket server on asyncio.start_server.
+
+    Every accepted client is handed to `handler` as a ServerConnection,
+    the connection is closed with a close handshake when the handler
+    returns:
+
+        async def echo(connection):
+            while True:
+                await connection.send(await connection.receive())
+
+        async with AioWebSocketServer(echo, port=8765) as server:
+            await server.serve_forever()
+
+    `broadcast` sends one message to many clients and encodes the frame
+    only once for all of them. `close` says goodbye to every client at
+    once and aborts those that do not answer within `close_timeout`.
+    Remaining keyword arguments are passed on to every ServerConnection.
+    """
+    def __init__(self, handler, host: str = '127.0.0.1', port: int = 0, ssl=None,
+                 subprotocols: list = None, compression: PerMessageDeflate = None,
+                 timeout: float = 10, close_timeout: float = 5, **options):
+        self.handler = handler
+        self.host = host
+        self.port = port
+        self.ssl = ssl
+        self.subprotocols = subprotocols
+        self.compression = compression
+        self.timeout = timeout
+        self.close_timeout = close_timeout
+        self.options = options
+        self.server = None
+        self.connections = set()
+        self.tasks = set()
+        self.closing = False
+
+    async def start(self):
+        self.server = await asyncio.start_server(self.accept, host=self.host, port=self.port,
+                                                 ssl=self.ssl)
+        self.port = self.server.sockets[0].getsockname()[1]
+        return self
+
+    @property
+    def uri(self):
+        return '{}://{}:{}/'.format('wss' if self.ssl else 'ws', self.host, self.port)
+
+    async def accept(self, reader, writer):
+        hands = ServerHandShake(reader, writer, self.subprotocols,
+                                [self.compression] if self.compression else None)
+        try:
+            await asyncio.wait_for(hands.shake(), self.timeout)
+        except (HandShakeError, asyncio.TimeoutError, ConnectionError) as exc:
+            logging.debug('Handshake with {} failed: {!r}'.format(
+                writer.get_extra_info('peername'), exc))
+            writer.close()
+            return
+        try:
+            connection = ServerConnection(reader, writer, hands, **self.options)
+        except Exception:
+            logging.exception('Setting up the connection of {} failed'.format(
+                writer.get_extra_info('peername')))
+            writer.transport.abort()
+            return
+        # this coroutine lives as long as the connection, it must not keep the handshake
+        del hands
+        task = asyncio.current_task()
+        self.connections.add(connection)
+        self.tasks.add(task)
+        try:
+            code = await self.run_handler(connection)
+            if code is not None:
+                await connection.close(code, timeout=self.close_timeout)
+        except asyncio.CancelledError:
+            # cancelled by close, which closes the connection itself
+            if not self.closing:
+                raise
+        finally:
+            self.tasks.discard(task)
+            if not self.closing:
+                self.connections.discard(connection)
+                writer.close()
+
+    async def run_handler(self, connection):
+        """Run the handler, return the code to close the
+        connection with or None if it is gone already"""
+        try:
+            await self.handler(connection)
+        except (ConnectionError, asyncio.IncompleteReadError) as exc:
+            logging.debug('Connection {} lost: {!r}'.format(connection.remote_address, exc))
+            return None
+        except FrameError as exc:
+            logging.debug('Connection {} failed: {!r}'.format(connection.remote_address, exc))
+            return CloseCodes.protocol_error.value
+        except Exception:
+            logging.exception('WebSocket handler failed')
+            return CloseCodes.internal_error.value
+        return CloseCodes.normal.value
+
+    def broadcast(self, message, code: int = None, connections=None, limit: int = None) -> int:
+        """Send one message to many clients, all of them by default.
+        The frame is encoded once and the same bytes object is handed to
+        every transport; `message` may already be a PreparedMessage.
+        Clients with more than `limit` bytes waiting in their write buffer
+        are skipped instead of buffering even more, so are clients in the
+        middle of a fragmented message, which no other message may
+        interrupt.
+        Return the number of clients the message was written to.
+        """
+        if not isinstance(message, PreparedMessage):
+            message = PreparedMessage(message, DataFrames.text.value if code is None else code)
+        frame = message.frame
+        sent = 0
+        for connection in list(self.connections if connections is None else connections):
+            transport = connection.writer.transport
+            if transport.is_closing() or connection.fragmented:
+                continue
+            if limit is not None and transport.get_write_buffer_size() > limit:
+                continue
+            if connection.pending:
+                connection.flush()
+            transport.write(frame)
+            sent += 1
+        return sent
+
+    async def serve_forever(self):
+        await self.server.serve_forever()
+
+    async def close(self) -> dict:
+        """Stop accepting, end the handlers and close every connection
+        with 1001 (going away). Return how many connections were closed
+        cleanly and how many aborted."""
+        self.closing = True
+        self.server.close()
+        tasks = list(self.tasks)
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        connections, self.connections = list(self.connections), set()
+        closes = await close_all(connections, timeout=self.close_timeout)
+        await self.server.wait_closed()
+        return closes
+
+    async def __aenter__(self):
+        return await self.start()
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        await self.close()
@@ -0,0 +1,246 @@
+import asyncio
+import logging
+import multiprocessing
+import os
+import pickle
+import socket
+from collections import deque
+from struct import pack, unpack
+
+from .pools import WebSocketPool
+
+
+async def read_message(reader):
+    """Read one length prefixed, pickled object from a shard channel"""
+    size, = unpack('!I', await reader.readexactly(4))
+    return pickle.loads(await reader.readexactly(size))
+
+
+def write_message(writer, obj):
+    """Write one object to a shard channel without waiting"""
+    data = pickle.dumps(obj, pickle.HIGHEST_PROTOCOL)
+    writer.write(pack('!I', len(data)))
+    writer.write(data)
+
+
+async def open_channel(connection):
+    """Streams on the socket of a multiprocessing Pipe end"""
+    sock = socket.fromfd(connection.fileno(), socket.AF_UNIX, socket.SOCK_STREAM)
+    connection.close()
+    return await asyncio.open_unix_connection(sock=sock)
+
+
+async def forward(pool: WebSocketPool, writer, batch_size: int):
+    """Ship the merged messages of a shard to the parent, everything
+    that is queued already goes out in one batch"""
+    messages = pool.messages
+    while True:
+        batch = [await messages.get()]
+        while len(batch) < batch_size and not messages.empty():
+            batch.append(messages.get_nowait())
+        write_message(writer, ('messages', batch))
+        await writer.drain()
+
+
+async def serve_shard(connection, uris: list, batch_size: int, options: dict):
+    """Body of a shard process: connect its share of the uris and
+    run the commands of the parent until it asks to close"""
+    reader, writer = await open_channel(connection)
+    pool = WebSocketPool(**options)
+    results = await asyncio.gather(*[pool.connect(uri, conn_id) for conn_id, uri in uris],
+                                   return_exceptions=True)
+    failed = {conn_id: repr(result) for (conn_id, _), result in zip(uris, results)
+              if isinstance(result, BaseException)}
+    write_message(writer, ('ready', failed))
+    forwarder = asyncio.ensure_future(forward(pool, writer, batch_size))
+    closes = None
+    try:
+        while True:
+            command = await read_message(reader)
+            if command[0] == 'close':
+                closes = await pool.close(command[1])
+                break
+            try:
+                if command[0] == 'send':
+                    await pool.send(command[1], command[2])
+                elif command[0] == 'fan_out':
+                    await pool.fan_out(command[1], command[2])
+            except (KeyError, OSError) as exc:
+                logging.warning('{} on connection {} failed: {!r}'.format(
+                    command[0], command[-1], exc))
+    except (asyncio.IncompleteReadError, ConnectionError):
+        # the parent is gone
+        pass
+    finally:
+        forwarder.cancel()
+        if closes is None:
+            closes = await pool.close()
+    write_message(writer, ('closed', closes))
+    await writer.drain()
+    writer.close()
+
+
+def run_shard(connection, uris: list, batch_size: int, options: dict):
+    asyncio.run(serve_shard(connection, uris, batch_size, options))
+
+
+class ShardedPool:
+    """Spread connections over worker processes, each with its own
+    event loop and WebSocketPool, so parsing and masking use as many
+    cores as there are `workers`.
+
+        async with ShardedPool(workers=4) as pool:
+            await pool.connect_many(uris)
+            async for conn_id, message in pool:
+                ...
+
+    The uris are dealt out to the shards round robin. A shard sends the
+    messages of its connections to the parent in pickled batches over a
+    socket pair, as many as are queued at once (at most `batch_size`),
+    so the IPC cost is paid per batch and not per message. At most
+    `maxsize` batches wait in the parent; a slow consumer stops the
+    shards reading, which again leaves the backpressure to TCP.
+    `send` and `fan_out` are routed to the shards owning the connections.
+    Shards are started with `context`, a multiprocessing context, or
+    the default one. Remaining keyword arguments are passed on to the
+    WebSocketPool of every shard and must be picklable.
+    """
+    def __init__(self, workers: int = None, batch_size: int = 1024, maxsize: int = 256,
+                 context=None, **options):
+        self.workers = workers or os.cpu_count() or 1
+        self.batch_size = batch_size
+        self.context = context or multiprocessing.get_context()
+        self.options = options
+        self.processes = []
+        self.channels = []
+        self.readers = []
+        self.owners = {}
+        self.failed = {}
+        self.batches = asyncio.Queue(maxsize=maxsize)
+        self.batch = deque()
+        self.closes = {'clean': 0, 'aborted': 0}
+        self.closing = False
+        self.closed = None
+
+    def __len__(self):
+        return len(self.owners)
+
+    async def connect_many(self, uris):
+        """Start the shards and connect every uri. Return the ids in the
+        same order, None for connections that failed; their errors are
+        kept in `failed` as the repr of the exception."""
+        if self.processes:
+            raise RuntimeError('ShardedPool is already connected')
+        shares = [[] for _ in range(min(self.workers, len(uris)))]
+        for conn_id, uri in enumerate(uris):
+            shares[conn_id % len(shares)].append((conn_id, uri))
+        ready = []
+        for index, share in enumerate(shares):
+            parent, child = self.context.Pipe()
+            process = self.context.Process(target=run_shard, daemon=True,
+                                           args=(child, share, self.batch_size, self.options))
+            process.start()
+            child.close()
+            reader, writer = await open_channel(parent)
+            self.processes.append(process)
+            self.channels.append(writer)
+            ready.append(read_message(reader))
+            self.readers.append(reader)
+            for conn_id, _ in share:
+                self.owners[conn_id] = index
+        for (_, failed), (index, reader) in zip(await asyncio.gather(*ready),
+                                                enumerate(self.readers)):
+            for conn_id, error in failed.items():
+                logging.warning('Connect to {} failed: {}'.format(uris[conn_id], error))
+                self.failed[conn_id] = error
+                del self.owners[conn_id]
+            self.readers[index] = asyncio.ensure_future(self.collect(reader))
+        return [None if conn_id in self.failed else conn_id for conn_id in range(len(uris))]
+
+    async def collect(self, reader):
+        """Move the batches of one shard into the parent queue"""
+        try:
+            while True:
+                kind, payload = await read_message(reader)
+                if kind == 'messages':
+                    if not self.closing:
+                        await self.batches.put(payload)
+                elif kind == 'closed':
+                    for key, count in payload.items():
+                        self.closes[key] += count
+                    return
+        except (asyncio.IncompleteReadError, ConnectionError) as exc:
+            logging.warning('Shard lost: {!r}'.format(exc))
+
+    async def receive(self):
+        """Return the next (conn_id, message) of any connection"""
+        if not self.batch:
+            self.batch.extend(await self.batches.get())
+        return self.batch.popleft()
+
+    async def receive_batch(self) -> list:
+        """Return the (conn_id, message) pairs of the next batch,
+        a consumer that can take them at once saves a call per message"""
+        if self.batch:
+            batch, self.batch = list(self.batch), deque()
+            return batch
+        return await self.batches.get()
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        return await self.receive()
+
+    async def send(self, conn_id, message):
+        """Send a message on one connection, through the shard owning it"""
+        writer = self.channels[self.owners[conn_id]]
+        write_message(writer, ('send', conn_id, message))
+        await writer.drain()
+
+    async def fan_out(self, message, conn_ids=None):
+        """Send the same message on many connections, all of them when
+        `conn_ids` is not given; every shard gets one command"""
+        if conn_ids is None:
+            conn_ids = list(self.owners)
+        shares = {}
+        for conn_id in conn_ids:
+            shares.setdefault(self.owners[conn_id], []).append(conn_id)
+        for index, share in shares.items():
+            write_message(self.channels[index], ('fan_out', message, share))
+        await asyncio.gather(*[self.channels[index].drain() for index in shares])
+
+    async def close(self, timeout: float = 5) -> dict:
+        """Close the connections of every shard within `timeout` seconds
+        and end the processes. Return how many connections were closed
+        cleanly and how many aborted."""
+        if self.closed is not None:
+            return self.closed
+        self.closing = True
+        # unblock collectors waiting for room in the queue
+        while not self.batches.empty():
+            self.batches.get_nowait()
+        for writer in self.channels:
+            write_message(writer, ('close', timeout))
+        # the collectors finish with the close results of their shards
+        if self.readers:
+            done, pending = await asyncio.wait(self.readers, timeout=timeout + 1)
+            for reader in pending:
+                reader.cancel()
+        for writer in self.channels:
+            writer.close()
+        # join blocks, the processes are waited for in threads
+        loop = asyncio.get_event_loop()
+        await asyncio.gather(*[loop.run_in_executor(None, process.join, 1)
+                               for process in self.processes])
+        for process in self.processes:
+            if process.is_alive():
+                process.terminate()
+        self.closed = dict(self.closes)
+        return self.closed
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        await self.close()
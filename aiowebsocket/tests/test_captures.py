@@ -0,0 +1,72 @@
+import asyncio
+import os
+
+from aiowebsocket.captures import Capture, CaptureLog, replay
+from aiowebsocket.converses import AioWebSocket
+from aiowebsocket.servers import AioWebSocketServer
+
+MESSAGES = [b'message %d' % number for number in range(50)] + [b'x' * 100000]
+
+
+async def feed(connection):
+    for message in MESSAGES:
+        await connection.send(message)
+    await connection.receive()
+
+
+async def echo(connection):
+    while True:
+        await connection.send(await connection.receive())
+
+
+def record(path):
+    async def run():
+        with Capture(path) as capture:
+            async with AioWebSocketServer(feed) as server:
+                async with AioWebSocket(server.uri, capture=capture) as aws:
+                    received = [await aws.manipulator.receive() for _ in MESSAGES]
+                    await aws.manipulator.send('done')
+        return received
+    return asyncio.run(run())
+
+
+def replayed(log):
+    async def run():
+        converse = replay(log)
+        return [await converse.receive() for _ in MESSAGES]
+    return asyncio.run(run())
+
+
+def test_capture_and_replay(tmp_path):
+    path = str(tmp_path / 'feed.cap')
+    assert record(path) == MESSAGES
+    with CaptureLog(path) as log:
+        assert len(log) > 0 and not log.masked
+        assert replayed(log) == MESSAGES
+
+
+def test_replay_without_index(tmp_path):
+    path = str(tmp_path / 'feed.cap')
+    record(path)
+    with CaptureLog(path) as log:
+        records = len(log)
+    os.remove(path + '.idx')
+    with CaptureLog(path) as log:
+        assert len(log) == records
+        assert replayed(log) == MESSAGES
+
+
+def test_server_capture_logs_every_connection(tmp_path):
+    async def run():
+        with Capture(str(tmp_path / 'client-{n}.cap')) as capture:
+            async with AioWebSocketServer(echo, capture=capture) as server:
+                for number in range(3):
+                    async with AioWebSocket(server.uri) as aws:
+                        await aws.manipulator.send('hello %d' % number)
+                        await aws.manipulator.receive()
+        return capture.paths
+    paths = asyncio.run(run())
+    assert paths == [str(tmp_path / 'client-{}.cap'.format(number)) for number in range(3)]
+    for path in paths:
+        with CaptureLog(path) as log:
+            assert log.masked and len(log) > 0
@@ -0,0 +1,54 @@
+import asyncio
+
+from aiowebsocket.converses import AioWebSocket, close_all
+from aiowebsocket.enumerations import SocketState
+from aiowebsocket.servers import AioWebSocketServer
+
+
+async def echo(connection):
+    while True:
+        await connection.send(await connection.receive(control=False))
+
+
+async def silent(connection):
+    # reads nothing, so a Close frame is never answered
+    await asyncio.sleep(60)
+
+
+def test_close_handshake():
+    async def run():
+        async with AioWebSocketServer(echo) as server:
+            aws = AioWebSocket(server.uri)
+            await aws.create_connection()
+            assert await aws.close_connection() is True
+            assert aws.state is SocketState.closed.value
+            assert aws.writer.is_closing()
+    asyncio.run(run())
+
+
+def test_close_while_another_task_receives():
+    async def run():
+        async with AioWebSocketServer(echo) as server:
+            aws = AioWebSocket(server.uri)
+            await aws.create_connection()
+            receiver = asyncio.ensure_future(aws.manipulator.receive())
+            await asyncio.sleep(0.05)
+            assert await aws.close_connection(timeout=2) is True
+            assert aws.writer.is_closing()
+            # the receiver got the Close frame
+            await asyncio.wait_for(receiver, 1)
+    asyncio.run(run())
+
+
+def test_close_aborts_unanswered_connection():
+    async def run():
+        async with AioWebSocketServer(silent) as server:
+            connections = []
+            for _ in range(3):
+                aws = AioWebSocket(server.uri)
+                await aws.create_connection()
+                connections.append(aws)
+            closes = await close_all(connections, timeout=0.2)
+            assert closes == {'clean': 0, 'aborted': 3}
+            assert all(aws.writer.is_closing() for aws in connections)
+    asyncio.run(run())
@@ -0,0 +1,35 @@
+import pytest
+
+from aiowebsocket.exceptions import HandShakeError
+from aiowebsocket.extensions import PerMessageDeflate
+
+
+def test_round_trip():
+    client = PerMessageDeflate().accept('permessage-deflate; client_max_window_bits=10')
+    server, response = PerMessageDeflate().respond(PerMessageDeflate().offer())
+    message = b'hello hello hello hello' * 10
+    assert server.decode(client.encode(message)) == message
+    assert client.decode(server.encode(message)) == message
+
+
+def test_client_rejects_8_bit_compression_window():
+    with pytest.raises(HandShakeError):
+        PerMessageDeflate().accept('permessage-deflate; client_max_window_bits=8')
+
+
+def test_client_does_not_offer_8_bit_compression_window():
+    with pytest.raises(ValueError):
+        PerMessageDeflate(client_max_window_bits=8).offer()
+
+
+def test_server_declines_8_bit_compression_window():
+    server = PerMessageDeflate()
+    assert server.respond('permessage-deflate; server_max_window_bits=8') == (None, None)
+    negotiated, response = server.respond(
+        'permessage-deflate; server_max_window_bits=8, permessage-deflate')
+    assert response == 'permessage-deflate'
+
+
+def test_8_bit_decompression_window_is_accepted():
+    negotiated = PerMessageDeflate().accept('permessage-deflate; server_max_window_bits=8')
+    assert negotiated.server_max_window_bits == 8
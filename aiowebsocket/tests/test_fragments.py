@@ -0,0 +1,147 @@
+import asyncio
+
+import pytest
+
+from aiowebsocket.converses import AioWebSocket
+from aiowebsocket.enumerations import DataFrames
+from aiowebsocket.exceptions import FrameError
+from aiowebsocket.extensions import PerMessageDeflate
+from aiowebsocket.freams import Frame, Frames
+from aiowebsocket.servers import AioWebSocketServer
+
+
+def receive_from(send, **options):
+    """Connect to a server whose handler runs `send` and return
+    what the client receives, or the exception it raises"""
+    async def handler(connection):
+        await send(connection)
+        await connection.receive(control=False)
+
+    async def run():
+        compression = options.pop('compression', None)
+        async with AioWebSocketServer(handler, compression=compression) as server:
+            async with AioWebSocket(server.uri, compression=compression and PerMessageDeflate(),
+                                    **options) as aws:
+                try:
+                    return await aws.manipulator.receive()
+                except FrameError as exc:
+                    return exc
+                finally:
+                    aws.writer.transport.abort()
+    return asyncio.run(run())
+
+
+async def fragments(connection):
+    await connection.send(b'one ', fin=False)
+    await connection.send(b'two ', fin=False)
+    await connection.send(b'three')
+
+
+@pytest.mark.parametrize('options', [{}, {'reader_task': True}, {'raw_protocol': True}])
+def test_fragmented_message(options):
+    assert receive_from(fragments, **options) == b'one two three'
+
+
+@pytest.mark.parametrize('options', [{}, {'reader_task': True}, {'raw_protocol': True}])
+def test_frame_over_max_size(options):
+    async def send(connection):
+        await connection.send(b'x' * 1001)
+    assert isinstance(receive_from(send, max_size=1000, **options), FrameError)
+
+
+@pytest.mark.parametrize('options', [{}, {'reader_task': True}, {'raw_protocol': True}])
+def test_fragments_over_max_size(options):
+    async def send(connection):
+        for _ in range(3):
+            await connection.send(b'x' * 400, fin=False)
+        await connection.send(b'x' * 400)
+    assert isinstance(receive_from(send, max_size=1000, **options), FrameError)
+
+
+@pytest.mark.parametrize('options', [{}, {'reader_task': True}])
+def test_inflated_message_over_max_size(options):
+    async def send(connection):
+        # a few hundred bytes on the wire
+        await connection.send(bytes(2**20))
+    result = receive_from(send, max_size=2**16, compression=PerMessageDeflate(), **options)
+    assert isinstance(result, FrameError)
+
+
+def stream_from(send, **options):
+    """Like receive_from, through receive_stream"""
+    async def handler(connection):
+        await send(connection)
+        await connection.receive(control=False)
+
+    async def run():
+        async with AioWebSocketServer(handler) as server:
+            async with AioWebSocket(server.uri, **options) as aws:
+                chunks = []
+                try:
+                    async for chunk in aws.manipulator.receive_stream():
+                        chunks.append(bytes(chunk))
+                except FrameError as exc:
+                    return exc
+                finally:
+                    aws.writer.transport.abort()
+                return chunks
+    return asyncio.run(run())
+
+
+MODES = [{}, {'reader_task': True}, {'raw_protocol': True}]
+
+
+@pytest.mark.parametrize('options', MODES)
+def test_stream_fragmented_message(options):
+    assert stream_from(fragments, **options) == [b'one ', b'two ', b'three']
+
+
+@pytest.mark.parametrize('options', MODES)
+def test_stream_rejects_new_message_inside_fragmented_one(options):
+    async def send(connection):
+        connection.frame.send_frame(False, DataFrames.text.value, b'one ')
+        connection.frame.send_frame(True, DataFrames.text.value, b'two')
+    assert isinstance(stream_from(send, **options), FrameError)
+
+
+@pytest.mark.parametrize('options', MODES)
+def test_stream_rejects_continuation_first(options):
+    async def send(connection):
+        connection.frame.send_frame(True, DataFrames.cont.value, b'orphan')
+    assert isinstance(stream_from(send, **options), FrameError)
+
+
+def fragment(code, message, fin):
+    return Frame(fin, code, False, False, False, message)
+
+
+def test_assemble_fragments():
+    frames = Frames(None, None)
+    assert frames.assemble(fragment(DataFrames.text.value, b'one ', False)) is None
+    assert frames.assemble(fragment(DataFrames.cont.value, b'two ', False)) is None
+    frame = frames.assemble(fragment(DataFrames.cont.value, b'three', True))
+    assert frame.fin and frame.code == DataFrames.text.value
+    assert frame.message == b'one two three'
+    assert frames.fragments is None
+
+
+def test_assemble_continuation_without_start():
+    with pytest.raises(FrameError):
+        Frames(None, None).assemble(fragment(DataFrames.cont.value, b'x', True))
+
+
+def test_assemble_new_message_inside_fragmented_one():
+    frames = Frames(None, None)
+    frames.assemble(fragment(DataFrames.text.value, b'x', False))
+    with pytest.raises(FrameError):
+        frames.assemble(fragment(DataFrames.binary.value, b'y', True))
+
+
+def test_assemble_too_long():
+    frames = Frames(None, None, maxsize=10)
+    frames.assemble(fragment(DataFrames.binary.value, b'x' * 6, False))
+    with pytest.raises(FrameError):
+        frames.assemble(fragment(DataFrames.cont.value, b'y' * 6, True))
+    # the broken message is dropped, a new one can start
+    assert frames.fragments is None
+    assert frames.assemble(fragment(DataFrames.binary.value, b'z', True)).message == b'z'
@@ -0,0 +1,87 @@
+import pytest
+
+from aiowebsocket.enumerations import DataFrames
+from aiowebsocket.exceptions import FrameError
+from aiowebsocket.freams import Frame, FrameParser, Frames
+
+
+def frame_bytes(message, code=DataFrames.binary.value, fin=True, mask=False):
+    frames = Frames(None, None)
+    return b''.join(bytes(buffer) for buffer in frames.encode(fin, code, message, mask=mask))
+
+
+LENGTHS = [0, 1, 125, 126, 127, 65535, 65536, 70000]
+
+
+@pytest.mark.parametrize('length', LENGTHS)
+def test_parser_whole_frame(length):
+    message = b'x' * length
+    frames = FrameParser().feed(frame_bytes(message))
+    assert frames == [Frame(True, DataFrames.binary.value, False, False, False, message)]
+
+
+@pytest.mark.parametrize('length', LENGTHS)
+@pytest.mark.parametrize('split', [1, 2, 3, 4, 9, 10, 11])
+def test_parser_split_frame(length, split):
+    message = bytes(range(256)) * (length // 256) + b'y' * (length % 256)
+    data = frame_bytes(message)
+    split = min(split, len(data) - 1)
+    parser = FrameParser()
+    assert parser.feed(data[:split]) == []
+    frames = parser.feed(data[split:])
+    assert [frame.message for frame in frames] == [message]
+    assert parser.buffer is None
+
+
+@pytest.mark.parametrize('length', [0, 1, 125, 126, 127, 300])
+def test_parser_byte_by_byte(length):
+    data = frame_bytes(b'z' * length)
+    parser = FrameParser()
+    frames = []
+    for position in range(len(data)):
+        frames.extend(parser.feed(data[position:position + 1]))
+    assert [frame.message for frame in frames] == [b'z' * length]
+
+
+def test_parser_packed_frames():
+    messages = [b'a' * length for length in LENGTHS]
+    data = b''.join(frame_bytes(message) for message in messages)
+    assert [frame.message for frame in FrameParser().feed(data)] == messages
+
+
+def test_parser_packed_frames_across_chunks():
+    messages = [b'b' * length for length in LENGTHS]
+    data = b''.join(frame_bytes(message) for message in messages)
+    parser = FrameParser()
+    frames = []
+    for start in range(0, len(data), 1000):
+        frames.extend(parser.feed(data[start:start + 1000]))
+    assert [frame.message for frame in frames] == messages
+
+
+@pytest.mark.parametrize('length', LENGTHS)
+def test_parser_masked(length):
+    message = bytes(range(256)) * (length // 256) + b'm' * (length % 256)
+    data = frame_bytes(message, mask=True)
+    parser = FrameParser(mask=True)
+    assert [frame.message for frame in parser.feed(data[:7]) + parser.feed(data[7:])] == [message]
+
+
+def test_parser_views():
+    data = frame_bytes(b'first') + frame_bytes(b'second')
+    frames = FrameParser(views=True).feed(data)
+    assert [type(frame.message) for frame in frames] == [memoryview, memoryview]
+    assert [bytes(frame.message) for frame in frames] == [b'first', b'second']
+    assert Frames.own(frames[0]).message == b'first'
+
+
+def test_parser_rejects_wrong_masking():
+    with pytest.raises(FrameError):
+        FrameParser(mask=True).feed(frame_bytes(b'unmasked'))
+    with pytest.raises(FrameError):
+        FrameParser().feed(frame_bytes(b'masked', mask=True))
+
+
+def test_parser_maxsize():
+    with pytest.raises(FrameError):
+        FrameParser(maxsize=100).feed(frame_bytes(b'x' * 101)[:4])
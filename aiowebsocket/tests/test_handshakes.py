@@ -0,0 +1,100 @@
+import asyncio
+
+import pytest
+
+from aiowebsocket.exceptions import HandShakeError
+from aiowebsocket.handshakes import HandShake, accept_key
+from aiowebsocket.parts import parse_uri
+
+
+def shake(response: bytes, subprotocols=None):
+    """Run a handshake against a canned response,
+    return the HandShake and the status code"""
+    async def run():
+        reader = asyncio.StreamReader()
+        hands = HandShake(parse_uri('ws://example.com/'), reader, Writer(),
+                          headers=[], union_header={}, subprotocols=subprotocols)
+        await hands.shake_()
+        reader.feed_data(response(hands.key) if callable(response) else response)
+        reader.feed_eof()
+        return hands, await hands.shake_result()
+    return asyncio.run(run())
+
+
+class Writer:
+    def __init__(self):
+        self.data = b''
+
+    def write(self, data):
+        self.data += data
+
+
+def switching(accept: str, extra: str = '') -> bytes:
+    return ('HTTP/1.1 101 Switching Protocols\r\nUpgrade: websocket\r\n'
+            'Connection: Upgrade\r\nSec-WebSocket-Accept: {}\r\n{}\r\n').format(
+        accept, extra).encode()
+
+
+def test_accept_key():
+    # the example of RFC 6455 section 1.3
+    assert accept_key(b'dGhlIHNhbXBsZSBub25jZQ==') == 's3pPLMBiTxaQ9kYGzzhZRbK+xOo='
+
+
+def test_shake_result_accepts_valid_key():
+    hands, status = shake(lambda key: switching(accept_key(key)))
+    assert status == 101
+    assert hands.response_headers['upgrade'] == 'websocket'
+
+
+def test_shake_result_rejects_bad_accept():
+    with pytest.raises(HandShakeError):
+        shake(switching(accept_key(b'dGhlIHNhbXBsZSBub25jZQ==')))
+
+
+def test_shake_result_rejects_missing_accept():
+    with pytest.raises(HandShakeError):
+        shake(b'HTTP/1.1 101 Switching Protocols\r\nUpgrade: websocket\r\n\r\n')
+
+
+def test_shake_result_rejects_unoffered_subprotocol():
+    with pytest.raises(HandShakeError):
+        shake(lambda key: switching(accept_key(key), 'Sec-WebSocket-Protocol: chat\r\n'),
+              subprotocols=['json'])
+
+
+def test_shake_result_returns_other_status():
+    hands, status = shake(b'HTTP/1.1 503 Service Unavailable\r\nRetry-After: 1\r\n\r\n')
+    assert status == 503
+
+
+@pytest.mark.parametrize('response', [b'', b'HTTP/1.1 101 Switching', b'HTTP/1.0 101 OK\r\n\r\n',
+                                      b'HTTP/1.1 abc OK\r\n\r\n'])
+def test_shake_result_rejects_broken_response(response):
+    with pytest.raises(HandShakeError):
+        shake(response)
+
+
+def test_request_template_is_reused_with_fresh_key():
+    HandShake.templates.clear()
+    remote = parse_uri('ws://example.com:8080/feed')
+    first = HandShake(remote, None, None, headers=[], union_header={})
+    second = HandShake(remote, None, None, headers=[], union_header={})
+    requests = first.request(), second.request()
+    assert len(HandShake.templates) == 1
+    assert first.key != second.key
+    for hands, request in zip((first, second), requests):
+        assert request.startswith(b'GET /feed HTTP/1.1\r\n')
+        assert b'Sec-WebSocket-Key:' + hands.key + b'\r\n' in request
+        assert request.endswith(b'\r\n\r\n')
+
+
+def test_data_after_the_response_stays_in_the_reader():
+    async def run():
+        reader = asyncio.StreamReader()
+        hands = HandShake(parse_uri('ws://example.com/'), reader, Writer(),
+                          headers=[], union_header={})
+        await hands.shake_()
+        reader.feed_data(switching(accept_key(hands.key)) + b'\x81\x02hi')
+        assert await hands.shake_result() == 101
+        return await reader.read(100)
+    assert asyncio.run(run()) == b'\x81\x02hi'
@@ -0,0 +1,64 @@
+import asyncio
+
+from aiowebsocket.converses import AioWebSocket
+from aiowebsocket.heartbeats import Heartbeat, TimerWheel
+from aiowebsocket.servers import AioWebSocketServer
+
+
+async def echo(connection):
+    while True:
+        await connection.send(await connection.receive())
+
+
+async def silent(connection):
+    # never reads, so pings are never answered
+    await asyncio.sleep(60)
+
+
+def test_timer_wheel():
+    async def run():
+        wheel = TimerWheel(resolution=0.01, size=8)
+        fired = []
+        wheel.schedule('a', 0.03, fired.append)
+        wheel.schedule('b', 0.2, fired.append)
+        wheel.schedule('c', 0.03, fired.append)
+        wheel.cancel('c')
+        await asyncio.sleep(0.1)
+        assert fired == ['a']
+        await asyncio.sleep(0.2)
+        assert fired == ['a', 'b']
+        assert len(wheel) == 0
+    asyncio.run(run())
+
+
+def pings_and_pongs(heartbeat):
+    async def run():
+        async with AioWebSocketServer(echo) as server:
+            async with AioWebSocket(server.uri, heartbeat=heartbeat, reader_task=True) as aws:
+                await asyncio.sleep(0.3)
+                return heartbeat.stats(aws.manipulator)
+    return asyncio.run(run())
+
+
+def test_pings_in_every_event_loop():
+    heartbeat = Heartbeat(interval=0.05, timeout=0.05, resolution=0.01)
+    for _ in range(2):
+        stats = pings_and_pongs(heartbeat)
+        assert stats['pings'] >= 2
+        assert stats['pongs'] >= stats['pings'] - 1
+        assert stats['rtt'] is not None
+
+
+def test_dead_peer_is_aborted():
+    async def run():
+        dead = []
+        heartbeat = Heartbeat(interval=0.05, timeout=0.05, resolution=0.01,
+                              on_dead=dead.append)
+        async with AioWebSocketServer(silent) as server:
+            aws = AioWebSocket(server.uri, heartbeat=heartbeat, reader_task=True)
+            await aws.create_connection()
+            await asyncio.sleep(0.3)
+            assert dead == [aws.manipulator]
+            assert aws.writer.is_closing()
+            assert len(heartbeat) == 0
+    asyncio.run(run())
@@ -0,0 +1,34 @@
+from itertools import cycle
+
+import pytest
+
+from aiowebsocket.exceptions import FrameError
+from aiowebsocket.freams import Frames, mask_into
+
+
+def old_mask(message, mask):
+    """Byte by byte masking as it was done before mask_into"""
+    return bytes(b ^ m for b, m in zip(message, cycle(mask)))
+
+
+@pytest.mark.parametrize('length', [0, 1, 3, 4, 5, 7, 8, 125, 2**14 - 1, 2**14, 2**14 + 3, 2**16 + 5])
+def test_mask_into_matches_byte_masking(length):
+    message = bytes(range(256)) * (length // 256) + bytes(range(length % 256))
+    mask = b'\x12\x34\xab\xcd'
+    target = bytearray(length + 6)
+    mask_into(target, message, mask, 6)
+    assert bytes(target[6:]) == old_mask(message, mask)
+    assert bytes(target[:6]) == bytes(6)
+
+
+def test_mask_into_rejects_bad_key():
+    with pytest.raises(FrameError):
+        mask_into(bytearray(4), b'abcd', b'\x00\x01\x02')
+
+
+@pytest.mark.parametrize('message', [b'', b'abc', bytearray(b'abcdefg'), memoryview(b'x' * 1000)])
+def test_message_mask_round_trip(message):
+    mask = b'\xff\x00\x0f\xf0'
+    masked = Frames.message_mask(message, mask)
+    assert masked == old_mask(message, mask)
+    assert Frames.message_mask(masked, mask) == bytes(message)
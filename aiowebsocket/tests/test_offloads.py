@@ -0,0 +1,31 @@
+import asyncio
+import pickle
+from concurrent.futures import ProcessPoolExecutor
+
+from aiowebsocket.converses import AioWebSocket
+from aiowebsocket.offloads import Offload
+from aiowebsocket.serializers import get_codec
+from aiowebsocket.servers import AioWebSocketServer
+
+OBJ = {'values': list(range(20000)), 'name': 'large'}
+
+
+def test_codec_pickles_to_shared_instance():
+    codec = get_codec('json')
+    assert pickle.loads(pickle.dumps(codec)) is codec
+
+
+def test_receive_obj_in_process_pool():
+    async def handler(connection):
+        await connection.send(get_codec('json').encode(OBJ))
+        await connection.receive(control=False)
+
+    async def run():
+        with ProcessPoolExecutor(1) as executor:
+            offload = Offload(threshold=2**10, executor=executor)
+            async with AioWebSocketServer(handler) as server:
+                async with AioWebSocket(server.uri, codec='json', offload=offload) as aws:
+                    assert await aws.manipulator.receive_obj() == OBJ
+                    await aws.manipulator.send('done')
+            offload.shutdown()
+    asyncio.run(run())
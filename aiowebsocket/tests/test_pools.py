@@ -0,0 +1,37 @@
+import asyncio
+import socket
+
+from aiowebsocket.pools import WebSocketPool
+from aiowebsocket.servers import AioWebSocketServer
+
+
+async def echo(connection):
+    while True:
+        await connection.send(await connection.receive())
+
+
+def unused_uri():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return 'ws://127.0.0.1:{}/'.format(sock.getsockname()[1])
+
+
+def test_pool_merges_messages_of_all_connections():
+    async def run():
+        async with AioWebSocketServer(echo) as server:
+            async with WebSocketPool(max_handshakes=2) as pool:
+                bad = unused_uri()
+                conn_ids = await pool.connect_many([server.uri] * 4 + [bad])
+                assert conn_ids[-1] is None and bad in pool.failed
+                conn_ids = conn_ids[:-1]
+                assert len(pool) == 4
+                await pool.fan_out('all')
+                await pool.send(conn_ids[0], 'first')
+                received = [await pool.receive() for _ in range(5)]
+                assert sorted(received) == sorted([(conn_id, b'all') for conn_id in conn_ids] +
+                                                  [(conn_ids[0], b'first')])
+                await pool.disconnect(conn_ids[0])
+                assert len(pool) == 3
+                closes = await pool.close()
+            assert closes == {'clean': 3, 'aborted': 0}
+    asyncio.run(run())
@@ -0,0 +1,54 @@
+import asyncio
+
+import pytest
+
+from aiowebsocket.converses import AioWebSocket
+from aiowebsocket.protocols import WebSocketProtocol
+from aiowebsocket.servers import AioWebSocketServer
+
+
+async def echo(connection):
+    while True:
+        await connection.send(await connection.receive())
+
+
+def test_raw_protocol_echo():
+    async def run():
+        async with AioWebSocketServer(echo) as server:
+            async with AioWebSocket(server.uri, raw_protocol=True) as aws:
+                assert isinstance(aws.writer, WebSocketProtocol)
+                converse = aws.manipulator
+                messages = ['message {}'.format(number) for number in range(100)]
+                messages.append('x' * 100000)
+                for message in messages:
+                    await converse.send(message)
+                for message in messages:
+                    assert await converse.receive() == message.encode()
+    asyncio.run(run())
+
+
+def test_raw_protocol_greeting_right_after_handshake():
+    async def greet(connection):
+        await connection.send('welcome')
+        await connection.receive()
+
+    async def run():
+        async with AioWebSocketServer(greet) as server:
+            async with AioWebSocket(server.uri, raw_protocol=True) as aws:
+                assert await aws.manipulator.receive() == b'welcome'
+                await aws.manipulator.send('bye')
+    asyncio.run(run())
+
+
+def test_raw_protocol_connection_lost():
+    async def drop(connection):
+        connection.writer.transport.abort()
+
+    async def run():
+        async with AioWebSocketServer(drop) as server:
+            aws = AioWebSocket(server.uri, raw_protocol=True)
+            await aws.create_connection()
+            with pytest.raises(ConnectionError):
+                await asyncio.wait_for(aws.manipulator.receive(), 1)
+            aws.writer.close()
+    asyncio.run(run())
@@ -0,0 +1,74 @@
+import asyncio
+
+from aiowebsocket.converses import AioWebSocket
+from aiowebsocket.enumerations import ControlFrames
+from aiowebsocket.freams import Frame
+from aiowebsocket.queues import MessageQueue
+from aiowebsocket.servers import AioWebSocketServer
+
+
+def frame(message):
+    return Frame(True, 2, False, False, False, message)
+
+
+def test_queue_pauses_and_resumes_at_watermarks():
+    calls = []
+    queue = MessageQueue(maxsize=4, maxbytes=100, on_pause=lambda: calls.append('pause'),
+                         on_resume=lambda: calls.append('resume'))
+    for _ in range(3):
+        queue.put_nowait(frame(b'x'))
+    assert calls == []
+    queue.put_nowait(frame(b'x'))
+    assert calls == ['pause'] and queue.paused
+    queue.get_nowait()
+    assert calls == ['pause']
+    queue.get_nowait()
+    assert calls == ['pause', 'resume'] and not queue.paused
+    # bytes count as well
+    queue.put_nowait(frame(b'y' * 100))
+    assert calls == ['pause', 'resume', 'pause']
+    assert queue.nbytes == 102
+
+
+def test_reader_task_pauses_a_flood_and_keeps_the_order():
+    async def flood(connection):
+        for number in range(200):
+            await connection.send(str(number))
+        await connection.receive()
+
+    async def run():
+        async with AioWebSocketServer(flood) as server:
+            async with AioWebSocket(server.uri, reader_task=True) as aws:
+                converse = aws.manipulator
+                queue = converse.message_queue
+                queue.maxsize, queue.low_size = 20, 10
+                await asyncio.sleep(0.2)
+                assert queue.paused
+                assert converse.get_queue_size < 200
+                received = [await converse.receive() for _ in range(200)]
+                assert received == [str(number).encode() for number in range(200)]
+                assert not queue.paused
+                await converse.send('done')
+    asyncio.run(run())
+
+
+def test_reader_task_answers_pings_without_receive():
+    async def ping(connection):
+        pongs = []
+        connection.frame.on_pong = pongs.append
+        connection.frame.send_frame(True, ControlFrames.ping.value, b'are you there')
+        # the pong is read on the way to the next message
+        await connection.receive()
+        await connection.send(b', '.join(pongs))
+        await connection.receive()
+
+    async def run():
+        async with AioWebSocketServer(ping) as server:
+            async with AioWebSocket(server.uri, reader_task=True) as aws:
+                converse = aws.manipulator
+                await asyncio.sleep(0.1)
+                # nobody called receive, the reader task answered
+                await converse.send('ready')
+                assert await converse.receive() == b'are you there'
+                await converse.send('done')
+    asyncio.run(run())
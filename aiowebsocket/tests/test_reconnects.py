@@ -0,0 +1,50 @@
+import asyncio
+
+from aiowebsocket.reconnects import ReconnectingWebSocket
+from aiowebsocket.servers import AioWebSocketServer
+
+
+async def echo(connection):
+    while True:
+        await connection.send(await connection.receive(control=False))
+
+
+class OneAtATime(ReconnectingWebSocket):
+    max_concurrent = 1
+
+
+def test_connect_in_several_event_loops():
+    async def run():
+        async with AioWebSocketServer(echo) as server:
+            clients = [OneAtATime(server.uri, base_delay=0.01) for _ in range(4)]
+            await asyncio.gather(*[client.connect() for client in clients])
+            assert all(client.connected for client in clients)
+            for client in clients:
+                await client.close()
+    asyncio.run(run())
+    asyncio.run(run())
+
+
+def test_reconnect_resubscribes_and_replays():
+    async def run():
+        async with AioWebSocketServer(echo) as server:
+            hooks = []
+
+            async def resubscribe(ws):
+                hooks.append(ws.connected)
+                await ws.send('subscribe')
+
+            client = ReconnectingWebSocket(server.uri, base_delay=0.01, max_delay=0.05,
+                                           on_reconnect=[resubscribe])
+            await client.connect()
+            assert await client.receive() == b'subscribe'
+            for connection in list(server.connections):
+                connection.writer.transport.abort()
+            with_loss = await client.receive()
+            await client.send('kept')
+            messages = [with_loss, await client.receive()]
+            assert messages == [b'subscribe', b'kept']
+            assert hooks == [True, True]
+            assert client.stats['reconnects'] == 1
+            await client.close()
+    asyncio.run(run())
@@ -0,0 +1,65 @@
+import asyncio
+
+import pytest
+
+from aiowebsocket.converses import AioWebSocket
+from aiowebsocket.exceptions import FrameError
+from aiowebsocket.servers import AioWebSocketServer
+
+
+async def echo(connection):
+    while True:
+        await connection.send(await connection.receive())
+
+
+def with_client(test, **options):
+    async def run():
+        async with AioWebSocketServer(echo) as server:
+            async with AioWebSocket(server.uri, **options) as aws:
+                await test(aws.manipulator)
+    asyncio.run(run())
+
+
+def test_coalesced_sends_share_one_write():
+    async def test(converse):
+        flushes = converse.flushes
+        for number in range(10):
+            await converse.send('message {}'.format(number))
+        assert converse.pending_bytes > 0
+        await asyncio.sleep(0)
+        assert converse.flushes == flushes + 1
+        assert converse.pending is None
+        for number in range(10):
+            assert await converse.receive() == 'message {}'.format(number).encode()
+    with_client(test, coalesce=True)
+
+
+def test_send_many():
+    async def test(converse):
+        flushes = converse.flushes
+        await converse.send_many(['one', 'two', 'three'])
+        assert converse.flushes == flushes + 1
+        assert [await converse.receive() for _ in range(3)] == [b'one', b'two', b'three']
+    with_client(test)
+
+
+def test_send_many_refuses_inside_fragmented_message():
+    async def test(converse):
+        await converse.send('part one ', fin=False)
+        with pytest.raises(FrameError):
+            await converse.send_many(['other'])
+        await converse.send('part two')
+        assert await converse.receive() == b'part one part two'
+    with_client(test)
+
+
+def test_drain_above_high_watermark():
+    async def test(converse):
+        converse.set_write_limits(high=2**12, low=2**10)
+        message = b'x' * 2**16
+        for _ in range(20):
+            await converse.send(message, code=2)
+            assert converse.get_write_buffer_size <= 2**12
+        for _ in range(20):
+            assert await converse.receive() == message
+    with_client(test, reader_task=True)
@@ -0,0 +1,46 @@
+import asyncio
+
+import pytest
+
+from aiowebsocket.converses import AioWebSocket
+from aiowebsocket.serializers import Codec, JsonCodec, get_codec
+from aiowebsocket.servers import AioWebSocketServer
+
+
+def test_json_decode_many():
+    codec = JsonCodec()
+    messages = [b'{"a": 1}', b' [1, 2] ', '"é"'.encode(), b'3']
+    assert codec.decode_many(messages) == [{'a': 1}, [1, 2], 'é', 3]
+
+
+@pytest.mark.parametrize('messages', [[b'1,2', b'3'], [b'1,[2', b'3]'], [b'', b'1'],
+                                      [b'"x"],["y', b'z"'], [b'1 2']])
+def test_json_decode_many_rejects_broken_message(messages):
+    with pytest.raises(ValueError):
+        JsonCodec().decode_many(messages)
+
+
+def test_send_obj_and_receive_objs():
+    async def echo(connection):
+        while True:
+            await connection.send(await connection.receive(), code=connection.codec.opcode)
+
+    async def run():
+        async with AioWebSocketServer(echo) as server:
+            async with AioWebSocket(server.uri, codec='json', reader_task=True) as aws:
+                converse = aws.manipulator
+                objs = [{'n': number} for number in range(5)]
+                for obj in objs:
+                    await converse.send_obj(obj)
+                received = []
+                while len(received) < len(objs):
+                    received.extend(await converse.receive_objs())
+                assert received == objs
+    asyncio.run(run())
+
+
+def test_codecs_by_name():
+    assert get_codec('json') is get_codec('json')
+    assert isinstance(get_codec(), Codec)
+    codec = get_codec('json')
+    assert codec.decode(memoryview(codec.encode({'a': 'é'}))) == {'a': 'é'}
@@ -0,0 +1,46 @@
+import asyncio
+
+from aiowebsocket.converses import AioWebSocket
+from aiowebsocket.heartbeats import Heartbeat
+from aiowebsocket.servers import AioWebSocketServer
+
+
+def test_broadcast_skips_fragmented_connection():
+    async def run():
+        connected = asyncio.Event()
+
+        async def handler(connection):
+            connected.set()
+            await connection.receive()
+
+        async with AioWebSocketServer(handler) as server:
+            async with AioWebSocket(server.uri) as aws:
+                await connected.wait()
+                connection, = server.connections
+                await connection.send(b'part one ', fin=False)
+                assert server.broadcast('news') == 0
+                await connection.send(b'part two')
+                assert server.broadcast('news') == 1
+                converse = aws.manipulator
+                assert await converse.receive() == b'part one part two'
+                assert await converse.receive() == b'news'
+                await converse.send('bye')
+    asyncio.run(run())
+
+
+def test_echo_does_not_return_pings():
+    async def echo(connection):
+        while True:
+            await connection.send(await connection.receive())
+
+    async def run():
+        heartbeat = Heartbeat(interval=0.05, timeout=0.05, resolution=0.01)
+        async with AioWebSocketServer(echo) as server:
+            async with AioWebSocket(server.uri, heartbeat=heartbeat, reader_task=True) as aws:
+                converse = aws.manipulator
+                await asyncio.sleep(0.3)
+                await converse.send('hello')
+                assert await converse.receive() == b'hello'
+                assert heartbeat.stats(converse)['pongs'] >= 2
+                assert converse.get_queue_size == 0
+    asyncio.run(run())
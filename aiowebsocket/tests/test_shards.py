@@ -0,0 +1,36 @@
+import asyncio
+
+from aiowebsocket.servers import AioWebSocketServer
+from aiowebsocket.shards import ShardedPool
+
+
+async def echo(connection):
+    while True:
+        await connection.send(await connection.receive())
+
+
+def test_sharded_pool():
+    async def run():
+        async with AioWebSocketServer(echo) as server:
+            pool = ShardedPool(workers=2)
+            conn_ids = await pool.connect_many([server.uri] * 4)
+            assert conn_ids == [0, 1, 2, 3]
+            assert len(pool) == 4
+            await pool.fan_out('all')
+            await pool.send(2, 'two')
+            received = []
+            while len(received) < 5:
+                received.extend(await pool.receive_batch())
+            assert sorted(received) == sorted([(conn_id, b'all') for conn_id in conn_ids] +
+                                              [(2, b'two')])
+            assert await pool.close() == {'clean': 4, 'aborted': 0}
+            assert not any(process.is_alive() for process in pool.processes)
+    asyncio.run(run())
+
+
+def test_close_without_connections():
+    async def run():
+        async with ShardedPool(workers=2) as pool:
+            pass
+        return await pool.close()
+    assert asyncio.run(run()) == {'clean': 0, 'aborted': 0}
@@ -0,0 +1,53 @@
+"""Server side cost of fanning one message out to many subscribers:
+a send per connection, which encodes the frame for every client, versus
+AioWebSocketServer.broadcast, which encodes it once.
+
+    PYTHONPATH=. python benchmarks/bench_broadcast.py [SUBSCRIBERS]
+"""
+import asyncio
+import sys
+import time
+
+from aiowebsocket.converses import AioWebSocket
+from aiowebsocket.servers import AioWebSocketServer
+
+
+MESSAGE = b'{"channel": "book", "symbol": "XBTUSD", "bids": [[42000.5, 1200]], "asks": []}' * 2
+ROUNDS = 20
+
+
+async def subscribe(connection):
+    await asyncio.Event().wait()
+
+
+async def main(count):
+    async with AioWebSocketServer(subscribe) as server:
+        clients = []
+        for offset in range(0, count, 500):
+            batch = [AioWebSocket(server.uri, raw_protocol=True) for _ in range(min(500, count - offset))]
+            await asyncio.gather(*[aws.create_connection() for aws in batch])
+            clients.extend(batch)
+        while len(server.connections) < count:
+            await asyncio.sleep(0.01)
+        connections = list(server.connections)
+
+        started = time.perf_counter()
+        for _ in range(ROUNDS):
+            for connection in connections:
+                await connection.send(MESSAGE)
+        per_connection = (time.perf_counter() - started) / ROUNDS
+
+        started = time.perf_counter()
+        for _ in range(ROUNDS):
+            server.broadcast(MESSAGE)
+        broadcast = (time.perf_counter() - started) / ROUNDS
+
+        print('{} subscribers, {} byte message'.format(count, len(MESSAGE)))
+        print('send per connection {:8.2f} ms per fan-out'.format(per_connection * 1e3))
+        print('broadcast           {:8.2f} ms per fan-out'.format(broadcast * 1e3))
+        for aws in clients:
+            aws.writer.close()
+
+
+if __name__ == '__main__':
+    asyncio.run(main(int(sys.argv[1]) if len(sys.argv) > 1 else 5000))
@@ -0,0 +1,50 @@
+"""Shut down many client connections at once with close_all: every
+close handshake runs concurrently, peers that do not answer the Close
+frame are aborted when the timeout is over.
+
+    PYTHONPATH=. python benchmarks/bench_close.py [CONNECTIONS] [SILENT_PERCENT]
+
+The server runs in the same process, so the clean handshakes queue up
+behind each other on the one event loop.
+"""
+import asyncio
+import sys
+import time
+
+from aiowebsocket.converses import AioWebSocket, close_all
+from aiowebsocket.metrics import Metrics
+from aiowebsocket.servers import AioWebSocketServer
+
+
+TIMEOUT = 1
+
+
+async def handler(connection):
+    if connection.resource == '/silent':
+        # never reads, so the Close frame of the client is never answered
+        await asyncio.Event().wait()
+    while True:
+        await connection.receive(control=False)
+
+
+async def main(count, silent):
+    metrics = Metrics()
+    async with AioWebSocketServer(handler) as server:
+        clients = []
+        for index in range(count):
+            resource = 'silent' if index * 100 < count * silent else ''
+            clients.append(AioWebSocket(server.uri + resource, raw_protocol=True, metrics=metrics))
+        for offset in range(0, count, 500):
+            await asyncio.gather(*[aws.create_connection() for aws in clients[offset:offset + 500]])
+        started = time.perf_counter()
+        closes = await close_all(clients, timeout=TIMEOUT)
+        elapsed = time.perf_counter() - started
+    snapshot = metrics.snapshot()
+    print('{} connections, {}% silent, timeout {}s'.format(count, silent, TIMEOUT))
+    print('closed in {:.3f} s: {clean} clean, {aborted} aborted'.format(elapsed, **closes))
+    print('metrics: {}, slowest close {:.3f} s'.format(snapshot['closes'], snapshot['close']['max']))
+
+
+if __name__ == '__main__':
+    asyncio.run(main(int(sys.argv[1]) if len(sys.argv) > 1 else 5000,
+                     int(sys.argv[2]) if len(sys.argv) > 2 else 10))
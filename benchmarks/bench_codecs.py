@@ -0,0 +1,61 @@
+"""Decode and encode cost of the codecs on typical market data payloads,
+compared with what consumers did before: receive(text=True) decoding the
+payload to str, then json.loads on the str.
+
+    PYTHONPATH=. python benchmarks/bench_codecs.py
+"""
+import json
+import random
+import timeit
+
+from aiowebsocket.serializers import CODECS
+
+
+BATCH = 100
+
+
+def payloads():
+    random.seed(7)
+    trade = {'e': 'trade', 'E': 1700000000123, 's': 'BTCUSDT', 't': 12345, 'p': '42000.10',
+             'q': '0.012', 'b': 88, 'a': 99, 'T': 1700000000120, 'm': True}
+    ticker = {'channel': 'ticker', 'data': [{'instId': 'ETH-USDT', 'last': 2291.5 + i,
+                                             'bidPx': 2291.4, 'askPx': 2291.6, 'vol24h': 123456.7,
+                                             'ts': 1700000000000 + i} for i in range(10)]}
+    book = {'type': 'snapshot', 'symbol': 'XBTUSD',
+            'bids': [[round(42000 - i * 0.5, 1), random.randint(1, 10**6)] for i in range(1000)],
+            'asks': [[round(42000 + i * 0.5, 1), random.randint(1, 10**6)] for i in range(1000)]}
+    return {'trade': trade, 'ticker': ticker, 'book': book}
+
+
+def measure(func, items: int):
+    timer = timeit.Timer(func)
+    number, _ = timer.autorange()
+    return items * number / min(timer.repeat(repeat=5, number=number))
+
+
+def main():
+    codecs = []
+    for name, codec in CODECS.items():
+        try:
+            codecs.append(codec())
+        except ImportError:
+            print('{} is not installed'.format(name))
+    print('{:<8} {:<10} {:>14} {:>14} {:>14}'.format(
+        'payload', 'codec', 'decode/s', 'batch/s', 'encode/s'))
+    for kind, obj in payloads().items():
+        data = json.dumps(obj).encode()
+        print('{:<8} {:<10} {:>14,.0f} {:>14,.0f} {:>14,.0f}'.format(
+            kind, 'str+json', measure(lambda: json.loads(data.decode()), 1),
+            measure(lambda: [json.loads(message.decode()) for message in [data] * BATCH], BATCH),
+            measure(lambda: json.dumps(obj).encode(), 1)))
+        for codec in codecs:
+            encoded = codec.encode(obj)
+            batch = [encoded] * BATCH
+            print('{:<8} {:<10} {:>14,.0f} {:>14,.0f} {:>14,.0f}'.format(
+                kind, codec.name, measure(lambda: codec.decode(encoded), 1),
+                measure(lambda: codec.decode_many(batch), BATCH),
+                measure(lambda: codec.encode(obj), 1)))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,64 @@
+"""Connect latency against a local TLS echo server: a fresh SSLContext
+and DNS lookup per connection (what ssl=True used to do) versus the
+shared resuming SSLContext with the DNS cache and prewarm().
+
+    PYTHONPATH=. python benchmarks/bench_connect.py
+"""
+import asyncio
+import ssl
+import statistics
+import tempfile
+import time
+
+from aiowebsocket.connectors import create_ssl_context, prewarm, resolver
+from aiowebsocket.converses import AioWebSocket
+from servers import EchoServerProcess, self_signed_certificate
+
+
+COUNT = 200
+
+
+async def connect_many(uri, context_factory, dns_cache):
+    latencies, resumed = [], 0
+    for _ in range(COUNT):
+        aws = AioWebSocket(uri, ssl=context_factory(), dns_cache=dns_cache)
+        started = time.perf_counter()
+        await aws.create_connection()
+        latencies.append(time.perf_counter() - started)
+        resumed += aws.writer.get_extra_info('ssl_object').session_reused
+        aws.writer.close()
+    return latencies, resumed
+
+
+async def main(uri, certfile):
+    print('{:<22} {:>10} {:>10} {:>9}'.format('mode', 'mean ms', 'p50 ms', 'resumed'))
+
+    def fresh():
+        return ssl.create_default_context(cafile=certfile)
+    latencies, resumed = await connect_many(uri, fresh, dns_cache=False)
+    report('fresh context', latencies, resumed)
+
+    shared = create_ssl_context(cafile=certfile)
+    resolver.clear()
+    latencies, resumed = await connect_many(uri, lambda: shared, dns_cache=True)
+    report('shared + dns cache', latencies, resumed)
+
+    warmed = create_ssl_context(cafile=certfile)
+    resolver.clear()
+    started = time.perf_counter()
+    await prewarm([uri], handshake=True, context=warmed)
+    print('prewarm took {:.2f} ms'.format((time.perf_counter() - started) * 1e3))
+    latencies, resumed = await connect_many(uri, lambda: warmed, dns_cache=True)
+    report('prewarmed', latencies, resumed)
+
+
+def report(name, latencies, resumed):
+    print('{:<22} {:>10.2f} {:>10.2f} {:>6}/{}'.format(
+        name, statistics.mean(latencies) * 1e3, statistics.median(latencies) * 1e3, resumed, COUNT))
+
+
+if __name__ == '__main__':
+    with tempfile.TemporaryDirectory() as directory:
+        pem = self_signed_certificate(directory)
+        with EchoServerProcess(certfile=pem) as remote:
+            asyncio.run(main(remote.replace('127.0.0.1', 'localhost'), pem))
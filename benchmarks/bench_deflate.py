@@ -0,0 +1,85 @@
+"""Bytes on the wire and CPU cost of permessage-deflate on a JSON
+market data feed, with and without context takeover.
+
+    PYTHONPATH=. python benchmarks/bench_deflate.py [capture.jsonl]
+
+A capture is one JSON message per line; without one a ticker feed
+shaped like the ones exchanges publish is generated.
+"""
+import json
+import random
+import sys
+import time
+
+from aiowebsocket.extensions import PerMessageDeflate
+
+
+COUNT = 20000
+
+
+def generated_feed():
+    rng = random.Random(7)
+    symbols = ['BTCUSDT', 'ETHUSDT', 'SOLUSDT', 'XRPUSDT', 'DOGEUSDT']
+    for sequence in range(COUNT):
+        price = 100 + rng.random() * 10
+        yield json.dumps({
+            'e': 'depthUpdate', 'E': 1700000000000 + sequence, 's': rng.choice(symbols),
+            'U': sequence, 'u': sequence + 3,
+            'b': [['{:.2f}'.format(price - i / 100), '{:.4f}'.format(rng.random())] for i in range(5)],
+            'a': [['{:.2f}'.format(price + i / 100), '{:.4f}'.format(rng.random())] for i in range(5)],
+        }).encode()
+
+
+def captured_feed(path):
+    with open(path, 'rb') as capture:
+        return [line.rstrip(b'\n') for line in capture if line.strip()]
+
+
+def negotiate(**params):
+    offer = PerMessageDeflate(**params)
+    return offer.accept(offer.offer())
+
+
+def run(messages, **params):
+    sender, receiver = negotiate(**params), negotiate(**params)
+    # the receiving side inflates with the settings of the sending side
+    receiver.server_max_window_bits = sender.client_max_window_bits
+    receiver.server_no_context_takeover = sender.client_no_context_takeover
+    receiver.reset_decompressor()
+    wire = compress_time = decompress_time = 0
+    for message in messages:
+        started = time.perf_counter()
+        if len(message) >= sender.min_size:
+            payload = sender.encode(message)
+        else:
+            payload = message
+        compress_time += time.perf_counter() - started
+        wire += len(payload)
+        if payload is not message:
+            started = time.perf_counter()
+            assert receiver.decode(payload) == message
+            decompress_time += time.perf_counter() - started
+    return wire, compress_time, decompress_time
+
+
+def main():
+    messages = captured_feed(sys.argv[1]) if len(sys.argv) > 1 else list(generated_feed())
+    raw = sum(len(message) for message in messages)
+    print('{} messages, {:,} bytes uncompressed'.format(len(messages), raw))
+    print('{:<28} {:>12} {:>7} {:>14} {:>14}'.format(
+        'settings', 'wire bytes', 'ratio', 'deflate us/msg', 'inflate us/msg'))
+    cases = (
+        ('context takeover', {}),
+        ('no context takeover', {'client_no_context_takeover': True}),
+        ('window bits 10', {'client_max_window_bits': 10}),
+        ('min_size 313', {'min_size': 313}),
+        ('level 1', {'level': 1}),
+    )
+    for name, params in cases:
+        wire, deflate, inflate = run(messages, **params)
+        print('{:<28} {:>12,} {:>6.1%} {:>14.2f} {:>14.2f}'.format(
+            name, wire, wire / raw, deflate / len(messages) * 1e6, inflate / len(messages) * 1e6))
+
+
+if __name__ == '__main__':
+    main()
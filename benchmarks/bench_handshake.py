@@ -0,0 +1,62 @@
+"""Cost of the opening handshake: building the request and parsing the
+101 response without I/O, then complete handshakes per second against
+the loopback echo server.
+
+    PYTHONPATH=. python benchmarks/bench_handshake.py
+"""
+import asyncio
+import time
+import timeit
+
+from aiowebsocket.converses import AioWebSocket
+from aiowebsocket.extensions import PerMessageDeflate
+from aiowebsocket.handshakes import HandShake, accept_key
+from aiowebsocket.parts import parse_uri
+from servers import EchoServerProcess
+
+
+COUNT = 1000
+
+
+class Response:
+    """A reader that returns the same response every time"""
+    def __init__(self, response: bytes):
+        self.response = response
+
+    async def readuntil(self, separator):
+        return self.response
+
+
+def offline():
+    hands = HandShake(parse_uri('wss://stream.example.com/ws/btcusdt@trade'), None, None,
+                      headers=[], union_header={}, extensions=[PerMessageDeflate()])
+    build = min(timeit.repeat(hands.request, number=10000, repeat=5)) / 10000
+    key = hands.key
+    hands.reader = Response(b'HTTP/1.1 101 Switching Protocols\r\nUpgrade: websocket\r\n'
+                            b'Connection: Upgrade\r\nSec-WebSocket-Accept: ' +
+                            accept_key(key).encode() + b'\r\n'
+                            b'Sec-WebSocket-Extensions: permessage-deflate\r\n\r\n')
+    def parse():
+        hands.response_headers = {}
+        coroutine = hands.shake_result()
+        try:
+            coroutine.send(None)
+        except StopIteration:
+            pass
+    parsed = min(timeit.repeat(parse, number=10000, repeat=5)) / 10000
+    print('build request {:.2f} us, parse response {:.2f} us'.format(build * 1e6, parsed * 1e6))
+
+
+async def online(uri):
+    started = time.perf_counter()
+    for _ in range(COUNT):
+        aws = AioWebSocket(uri)
+        await aws.create_connection()
+        aws.writer.close()
+    print('{:,.0f} sequential handshakes per second'.format(COUNT / (time.perf_counter() - started)))
+
+
+if __name__ == '__main__':
+    offline()
+    with EchoServerProcess() as uri:
+        asyncio.run(online(uri))
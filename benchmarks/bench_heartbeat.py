@@ -0,0 +1,71 @@
+"""Event loop cost of keeping many connections alive: one ping task
+per connection versus the shared timer wheel of Heartbeat. The
+connections are stand-ins that answer every ping at once, so only
+the scheduling is measured.
+
+    PYTHONPATH=. python benchmarks/bench_heartbeat.py
+"""
+import asyncio
+import time
+
+from aiowebsocket.heartbeats import Heartbeat
+
+
+INTERVAL = 1.0
+DURATION = 3.0
+
+
+class Connection:
+    """Just enough of a Converse for Heartbeat"""
+    def __init__(self):
+        self.frame = self
+        self.writer = self
+        self.on_pong = None
+
+    def is_closing(self):
+        return False
+
+    def send_frame(self, fin, code, message, mask=True):
+        if self.on_pong is not None:
+            self.on_pong(message)
+
+
+async def per_task(count):
+    async def keepalive(connection):
+        while True:
+            await asyncio.sleep(INTERVAL)
+            connection.send_frame(True, 0x9, b'')
+    tasks = [asyncio.ensure_future(keepalive(Connection())) for _ in range(count)]
+    started = time.process_time()
+    await asyncio.sleep(DURATION)
+    spent = time.process_time() - started
+    for task in tasks:
+        task.cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
+    return spent
+
+
+async def wheel(count):
+    heartbeat = Heartbeat(interval=INTERVAL, timeout=INTERVAL, resolution=0.05)
+    connections = [Connection() for _ in range(count)]
+    for connection in connections:
+        heartbeat.register(connection)
+    started = time.process_time()
+    await asyncio.sleep(DURATION)
+    spent = time.process_time() - started
+    for connection in connections:
+        heartbeat.unregister(connection)
+    return spent
+
+
+def main():
+    print('{:>12} {:>14} {:>14}'.format('connections', 'tasks cpu %', 'wheel cpu %'))
+    for count in (1000, 10000, 50000):
+        tasks = asyncio.run(per_task(count))
+        wheeled = asyncio.run(wheel(count))
+        print('{:>12} {:>14.1f} {:>14.1f}'.format(
+            count, tasks / DURATION * 100, wheeled / DURATION * 100))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,99 @@
+"""Python heap held by one idle connection: a client with asyncio
+streams, a client in raw protocol mode and the server side of a
+connection accepted by AioWebSocketServer. The other end runs in a child
+process, so only the side being measured is counted.
+
+    PYTHONPATH=. python benchmarks/bench_idle_memory.py [CONNECTIONS]
+
+Run it on two commits to compare them.
+"""
+import asyncio
+import gc
+import multiprocessing
+import sys
+import tracemalloc
+
+from aiowebsocket.converses import AioWebSocket
+from aiowebsocket.servers import AioWebSocketServer
+from servers import EchoServerProcess
+
+
+def measure_start():
+    gc.collect()
+    tracemalloc.start()
+    return tracemalloc.get_traced_memory()[0]
+
+
+def measure_stop(before, count):
+    gc.collect()
+    used = tracemalloc.get_traced_memory()[0] - before
+    tracemalloc.stop()
+    return used / count
+
+
+async def clients(uri, count, **options):
+    connections = []
+    # warm up the caches shared by all connections before measuring
+    for _ in range(10):
+        aws = AioWebSocket(uri, **options)
+        await aws.create_connection()
+        connections.append(aws)
+    before = measure_start()
+    for _ in range(count):
+        aws = AioWebSocket(uri, **options)
+        await aws.create_connection()
+        connections.append(aws)
+    per_connection = measure_stop(before, count)
+    for aws in connections:
+        aws.writer.close()
+    return per_connection
+
+
+def _connect(uri, count, done):
+    async def connect():
+        connections = []
+        for _ in range(count):
+            aws = AioWebSocket(uri, raw_protocol=True)
+            await aws.create_connection()
+            connections.append(aws)
+        done.set()
+        await asyncio.sleep(3600)
+    asyncio.run(connect())
+
+
+async def server_side(count):
+    async def idle(connection):
+        await connection.receive()
+
+    async with AioWebSocketServer(idle) as server:
+        done = multiprocessing.Event()
+        warmup = multiprocessing.Process(target=_connect, args=(server.uri, 10, done), daemon=True)
+        warmup.start()
+        while len(server.connections) < 10:
+            await asyncio.sleep(0.01)
+        before = measure_start()
+        process = multiprocessing.Process(target=_connect, args=(server.uri, count, done),
+                                          daemon=True)
+        process.start()
+        while len(server.connections) < count + 10:
+            await asyncio.sleep(0.01)
+        await asyncio.sleep(0.1)
+        per_connection = measure_stop(before, count)
+        process.terminate()
+        warmup.terminate()
+    return per_connection
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    with EchoServerProcess() as uri:
+        print('client, streams      {:8.0f} bytes per idle connection'.format(
+            asyncio.run(clients(uri, count))))
+        print('client, raw protocol {:8.0f} bytes per idle connection'.format(
+            asyncio.run(clients(uri, count, raw_protocol=True))))
+    print('server side          {:8.0f} bytes per idle connection'.format(
+        asyncio.run(server_side(count))))
+
+
+if __name__ == '__main__':
+    main()
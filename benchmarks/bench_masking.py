@@ -0,0 +1,42 @@
+"""Compare payload masking throughput of the word-wise engine
+against the original per-byte generator.
+
+    PYTHONPATH=. python benchmarks/bench_masking.py
+"""
+import os
+import timeit
+from itertools import cycle
+
+from aiowebsocket.freams import mask_into
+
+
+SIZES = (125, 2**16, 2**24)
+
+
+def generator_mask(message: bytes, mask: bytes):
+    """The implementation Frames.message_mask used before"""
+    return bytes(b ^ m for b, m in zip(message, cycle(mask)))
+
+
+def measure(func, size: int, budget: float = 1.0):
+    """Return throughput in MB/s, spending roughly `budget` seconds"""
+    timer = timeit.Timer(func)
+    number, elapsed = timer.autorange()
+    repeat = max(1, int(budget / elapsed))
+    best = min(timer.repeat(repeat=min(repeat, 5), number=number)) / number
+    return size / best / 2**20
+
+
+def main():
+    mask = os.urandom(4)
+    print('{:>10} {:>14} {:>14} {:>8}'.format('size', 'generator', 'mask_into', 'speedup'))
+    for size in SIZES:
+        message = os.urandom(size)
+        target = bytearray(size)
+        old = measure(lambda: generator_mask(message, mask), size)
+        new = measure(lambda: mask_into(target, message, mask), size)
+        print('{:>10} {:>9.1f} MB/s {:>9.1f} MB/s {:>7.1f}x'.format(size, old, new, new / old))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,70 @@
+"""Round-trip latency of small-message connections while one connection
+of the same process sends and receives large compressed JSON messages,
+with the large payloads handled inline, in threads and in processes.
+
+    PYTHONPATH=. python benchmarks/bench_offload.py
+"""
+import asyncio
+import random
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from aiowebsocket.converses import AioWebSocket
+from aiowebsocket.extensions import PerMessageDeflate
+from aiowebsocket.offloads import Offload
+from servers import EchoServerProcess
+
+
+DURATION = 5.0
+SMALL_CONNECTIONS = 8
+SNAPSHOT = {'type': 'snapshot', 'levels': [[42000 + i / 2, random.randint(1, 10**6), 'BTC-USD']
+                                            for i in range(200000)]}
+
+
+async def small(uri, latencies, until):
+    async with AioWebSocket(uri, reader_task=True) as aws:
+        converse = aws.manipulator
+        while time.perf_counter() < until:
+            started = time.perf_counter()
+            await converse.send(b'{"op": "ping"}')
+            await converse.receive()
+            latencies.append(time.perf_counter() - started)
+            await asyncio.sleep(0.001)
+
+
+async def large(uri, offload, until):
+    rounds = 0
+    async with AioWebSocket(uri, reader_task=True, compression=PerMessageDeflate(min_size=2**16),
+                            offload=offload) as aws:
+        converse = aws.manipulator
+        while time.perf_counter() < until:
+            await converse.send_obj(SNAPSHOT)
+            await converse.receive_obj()
+            rounds += 1
+    return rounds
+
+
+async def run(uri, offload):
+    until = time.perf_counter() + DURATION
+    latencies = []
+    results = await asyncio.gather(large(uri, offload, until),
+                                   *[small(uri, latencies, until) for _ in range(SMALL_CONNECTIONS)])
+    latencies.sort()
+    return results[0], len(latencies), [latencies[int(len(latencies) * q)] * 1e3
+                                        for q in (0.5, 0.99, 0.999)] + [latencies[-1] * 1e3]
+
+
+def main():
+    print('{:<10} {:>8} {:>10} {:>9} {:>9} {:>9} {:>9}'.format(
+        'offload', 'large', 'small', 'p50 ms', 'p99 ms', 'p99.9 ms', 'max ms'))
+    with EchoServerProcess() as uri, ProcessPoolExecutor(2) as processes:
+        for name, offload in (('inline', None),
+                              ('threads', Offload(threshold=2**20)),
+                              ('processes', Offload(threshold=2**20, executor=processes))):
+            rounds, count, percentiles = asyncio.run(run(uri, offload))
+            print('{:<10} {:>8} {:>10} {:>9.2f} {:>9.2f} {:>9.2f} {:>9.2f}'.format(
+                name, rounds, count, *percentiles))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,89 @@
+"""Frames per second for small (20 byte) server messages, parsed
+with the old readexactly-per-field loop and with FrameParser.
+
+    PYTHONPATH=. python benchmarks/bench_parser.py
+"""
+import asyncio
+import time
+from struct import unpack
+
+from aiowebsocket.enumerations import DataFrames
+from aiowebsocket.freams import Frames, FrameParser
+
+
+COUNT = 200000
+SEGMENT = 2**16
+
+
+class BufferWriter:
+    def __init__(self):
+        self.data = bytearray()
+
+    def write(self, data):
+        self.data += data
+
+
+def build_stream():
+    writer = BufferWriter()
+    frame = Frames(None, writer)
+    message = b'{"p": 1.25, "q": 10}'
+    for _ in range(COUNT):
+        frame.writer.write(b''.join(frame.encode(True, DataFrames.text.value, message, mask=False)))
+    return bytes(writer.data)
+
+
+class ReadExactlyFrames(Frames):
+    """Frames with the unpack_frame body it had before FrameParser"""
+
+    async def unpack_frame(self, mask=False, maxsize=None):
+        reader = self.reader.readexactly
+        head1, head2 = unpack('!BB', await reader(2))
+        length = head2 & 0b01111111
+        if length == 126:
+            length, = unpack('!H', await reader(2))
+        elif length == 127:
+            length, = unpack('!Q', await reader(8))
+        message = await reader(length)
+        return (True if head1 & 0b10000000 else False, head1 & 0b00001111,
+                False, False, False, message)
+
+
+def stream_reader(data):
+    reader = asyncio.StreamReader(limit=2**32)
+    for start in range(0, len(data), SEGMENT):
+        reader.feed_data(data[start:start + SEGMENT])
+    reader.feed_eof()
+    return reader
+
+
+async def bench_read(frames_class, data):
+    frame = frames_class(stream_reader(data), None)
+    started = time.perf_counter()
+    for _ in range(COUNT):
+        await frame.read()
+    return time.perf_counter() - started
+
+
+def bench_parser(data):
+    parser = FrameParser()
+    started = time.perf_counter()
+    count = 0
+    for start in range(0, len(data), SEGMENT):
+        count += len(parser.feed(data[start:start + SEGMENT]))
+    assert count == COUNT
+    return time.perf_counter() - started
+
+
+def main():
+    data = build_stream()
+    results = [
+        ('readexactly', asyncio.run(bench_read(ReadExactlyFrames, data))),
+        ('Frames.read', asyncio.run(bench_read(Frames, data))),
+        ('FrameParser.feed', bench_parser(data)),
+    ]
+    for name, elapsed in results:
+        print('{:<18} {:>12,.0f} frames/s'.format(name, COUNT / elapsed))
+
+
+if __name__ == '__main__':
+    main()
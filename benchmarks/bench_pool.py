@@ -0,0 +1,51 @@
+"""Open N pooled connections to a loopback echo server, report the
+resident memory per connection and the aggregate messages per second
+of the merged receive stream.
+
+    PYTHONPATH=. python benchmarks/bench_pool.py [N]
+"""
+import asyncio
+import resource
+import sys
+import time
+
+from aiowebsocket.pools import WebSocketPool
+from servers import EchoServerProcess
+
+
+MESSAGE = b'{"channel": "ticker", "price": "42000.5"}'
+ROUNDS = 20
+
+
+def rss():
+    """Resident set size in bytes"""
+    with open('/proc/self/statm') as statm:
+        return int(statm.read().split()[1]) * resource.getpagesize()
+
+
+async def main(uri, count):
+    async with WebSocketPool(max_handshakes=128) as pool:
+        before = rss()
+        started = time.perf_counter()
+        await pool.connect_many([uri] * count)
+        connect_time = time.perf_counter() - started
+        per_connection = (rss() - before) / len(pool)
+        print('{} connections in {:.2f}s, {:,.0f} bytes RSS per connection'.format(
+            len(pool), connect_time, per_connection))
+
+        started = time.perf_counter()
+        for _ in range(ROUNDS):
+            await pool.fan_out(MESSAGE)
+        received = 0
+        async for conn_id, message in pool:
+            received += 1
+            if received == ROUNDS * len(pool):
+                break
+        elapsed = time.perf_counter() - started
+        print('{:,} messages in {:.2f}s, {:,.0f} messages/s'.format(received, elapsed, received / elapsed))
+
+
+if __name__ == '__main__':
+    number = int(sys.argv[1]) if len(sys.argv) > 1 else 1000
+    with EchoServerProcess() as remote:
+        asyncio.run(main(remote, number))
@@ -0,0 +1,74 @@
+"""Send one fixed message on many connections: send, which encodes and
+masks the frame for every connection, versus send_prepared, which
+encodes it once and only masks it per connection (clients) or reuses
+the whole frame (server side).
+
+    PYTHONPATH=. python benchmarks/bench_prepared.py [CONNECTIONS]
+"""
+import asyncio
+import sys
+import time
+import timeit
+
+from aiowebsocket.converses import AioWebSocket
+from aiowebsocket.freams import Frames, PreparedMessage
+from aiowebsocket.servers import AioWebSocketServer
+
+
+MESSAGE = b'{"op": "subscribe", "args": ["orderBookL2_25:XBTUSD", "trade:XBTUSD", "instrument"]}'
+ROUNDS = 20
+
+
+def encoding():
+    """Encode cost of one frame, without any I/O"""
+    frames = Frames(None, None)
+    prepared = PreparedMessage(MESSAGE)
+    for name, func in (('encode masked', lambda: frames.encode(True, 1, MESSAGE)),
+                       ('prepared masked', lambda: prepared.encode(True)),
+                       ('encode unmasked', lambda: frames.encode(True, 1, MESSAGE, mask=False)),
+                       ('prepared unmasked', lambda: prepared.encode(False))):
+        timer = timeit.Timer(func)
+        number, _ = timer.autorange()
+        best = min(timer.repeat(repeat=5, number=number)) / number
+        print('{:<20} {:8.3f} us per frame'.format(name, best * 1e6))
+
+
+async def fan_out(name, converses):
+    started = time.perf_counter()
+    for _ in range(ROUNDS):
+        for converse in converses:
+            await converse.send(MESSAGE)
+    sent = (time.perf_counter() - started) / ROUNDS
+    started = time.perf_counter()
+    for _ in range(ROUNDS):
+        prepared = PreparedMessage(MESSAGE)
+        for converse in converses:
+            await converse.send_prepared(prepared)
+    prepared = (time.perf_counter() - started) / ROUNDS
+    print('{:<8} send {:8.2f} ms, send_prepared {:8.2f} ms per fan-out'.format(
+        name, sent * 1e3, prepared * 1e3))
+
+
+async def idle(connection):
+    await asyncio.Event().wait()
+
+
+async def main(count):
+    async with AioWebSocketServer(idle) as server:
+        clients = []
+        for offset in range(0, count, 500):
+            batch = [AioWebSocket(server.uri, raw_protocol=True) for _ in range(min(500, count - offset))]
+            await asyncio.gather(*[aws.create_connection() for aws in batch])
+            clients.extend(batch)
+        while len(server.connections) < count:
+            await asyncio.sleep(0.01)
+        print('{} connections, {} byte message'.format(count, len(MESSAGE)))
+        await fan_out('client', [aws.manipulator for aws in clients])
+        await fan_out('server', list(server.connections))
+        for aws in clients:
+            aws.writer.close()
+
+
+if __name__ == '__main__':
+    encoding()
+    asyncio.run(main(int(sys.argv[1]) if len(sys.argv) > 1 else 5000))
@@ -0,0 +1,71 @@
+"""Record a flood of messages from the echo server into a capture log,
+then replay the log through the frame pipeline without any network:
+as fast as possible through FrameParser alone and through
+Converse.receive / receive_view, and at the recorded pace.
+
+    PYTHONPATH=. python benchmarks/bench_replay.py [MESSAGES] [SIZE]
+"""
+import asyncio
+import os
+import sys
+import tempfile
+import time
+
+from aiowebsocket.captures import Capture, CaptureLog, replay
+from aiowebsocket.converses import AioWebSocket
+from aiowebsocket.freams import FrameParser
+from servers import EchoServerProcess
+
+
+async def record(uri, path, count, size):
+    with Capture(path) as capture:
+        aws = AioWebSocket('{}flood/{}/{}'.format(uri, count, size), capture=capture)
+        await aws.create_connection()
+        for _ in range(count):
+            await aws.manipulator.receive()
+        aws.writer.close()
+        return capture.count
+
+
+def parse(log):
+    parser = FrameParser(mask=log.masked)
+    frames = 0
+    for _, chunk in log:
+        frames += len(parser.feed(chunk))
+    return frames
+
+
+async def receive_all(log, name, count, speed=None):
+    converse = replay(log, speed)
+    receive = getattr(converse, name)
+    for _ in range(count):
+        await receive()
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 200000
+    size = int(sys.argv[2]) if len(sys.argv) > 2 else 64
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'flood.cap')
+        with EchoServerProcess() as uri:
+            chunks = asyncio.run(record(uri, path, count, size))
+        with CaptureLog(path) as log:
+            print('{} messages of {} bytes in {} chunks, {:.1f} MB log, recorded in {:.3f} s'.format(
+                count, size, chunks, os.path.getsize(path) / 2**20, log.duration))
+            started = time.perf_counter()
+            frames = parse(log)
+            elapsed = time.perf_counter() - started
+            print('{:<22} {:>12,.0f} frames/s'.format('FrameParser.feed', frames / elapsed))
+            for name in ('receive', 'receive_view'):
+                started = time.perf_counter()
+                asyncio.run(receive_all(log, name, count))
+                elapsed = time.perf_counter() - started
+                print('{:<22} {:>12,.0f} messages/s'.format('Converse.' + name, count / elapsed))
+            started = time.perf_counter()
+            asyncio.run(receive_all(log, 'receive', count, speed=1.0))
+            print('{:<22} {:>12.3f} s for {:.3f} s of traffic'.format(
+                'recorded pace', time.perf_counter() - started, log.duration))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,45 @@
+"""Send throughput of one write per frame, write coalescing and
+send_many batches against a loopback echo server.
+
+    PYTHONPATH=. python benchmarks/bench_send.py
+"""
+import asyncio
+import time
+
+from aiowebsocket.converses import AioWebSocket
+from servers import EchoServerProcess
+
+
+MESSAGE = b'{"op": "subscribe", "args": ["trade:XBTUSD"]}'
+COUNT = 100000
+BATCH = 100
+
+
+async def run(uri, coalesce=False, batch=False):
+    async with AioWebSocket(uri, coalesce=coalesce, reader_task=True) as aws:
+        converse = aws.manipulator
+        started = time.perf_counter()
+        if batch:
+            for _ in range(COUNT // BATCH):
+                await converse.send_many([MESSAGE] * BATCH)
+        else:
+            for _ in range(COUNT):
+                await converse.send(MESSAGE)
+        converse.flush()
+        await aws.writer.drain()
+        elapsed = time.perf_counter() - started
+        flushes = converse.flushes
+    aws.writer.close()
+    return COUNT / elapsed, flushes
+
+
+async def main(uri):
+    print('{:<10} {:>12} {:>10}'.format('mode', 'messages/s', 'flushes'))
+    for name, options in (('send', {}), ('coalesce', {'coalesce': True}), ('send_many', {'batch': True})):
+        rate, flushes = await run(uri, **options)
+        print('{:<10} {:>12,.0f} {:>10,}'.format(name, rate, flushes))
+
+
+if __name__ == '__main__':
+    with EchoServerProcess() as remote:
+        asyncio.run(main(remote))
@@ -0,0 +1,64 @@
+"""Aggregate receive rate of many flooding connections: one
+WebSocketPool in this process against ShardedPool with a growing number
+of worker processes. Every connection asks one of several echo server
+processes for a flood of small binary messages.
+
+    PYTHONPATH=. python benchmarks/bench_shards.py [CONNECTIONS] [MESSAGES] [SERVERS]
+
+Sharding only pays off with spare cores: the workers parse and mask
+in parallel while the parent takes whole batches.
+"""
+import asyncio
+import os
+import sys
+import time
+from contextlib import ExitStack
+
+from aiowebsocket.pools import WebSocketPool
+from aiowebsocket.shards import ShardedPool
+from servers import EchoServerProcess
+
+
+SIZE = 64
+
+
+async def single(uris, total):
+    async with WebSocketPool(raw_protocol=True) as pool:
+        started = time.perf_counter()
+        await pool.connect_many(uris)
+        for _ in range(total):
+            await pool.receive()
+        return total / (time.perf_counter() - started)
+
+
+async def sharded(uris, total, workers):
+    async with ShardedPool(workers=workers, raw_protocol=True) as pool:
+        started = time.perf_counter()
+        await pool.connect_many(uris)
+        received = 0
+        while received < total:
+            received += len(await pool.receive_batch())
+        return total / (time.perf_counter() - started)
+
+
+def main():
+    connections = int(sys.argv[1]) if len(sys.argv) > 1 else 16
+    messages = int(sys.argv[2]) if len(sys.argv) > 2 else 20000
+    count = int(sys.argv[3]) if len(sys.argv) > 3 else 4
+    with ExitStack() as stack:
+        servers = [stack.enter_context(EchoServerProcess()) for _ in range(count)]
+        uris = ['{}flood/{}/{}'.format(servers[index % count], messages, SIZE)
+                for index in range(connections)]
+        total = connections * messages
+        print('{} connections, {} messages of {} bytes each, {} servers, {} cores'.format(
+            connections, messages, SIZE, count, os.cpu_count()))
+        print('{:<20} {:>12,.0f} messages/s'.format('WebSocketPool', asyncio.run(single(uris, total))))
+        for workers in (1, 2, 4, 8):
+            if workers > connections:
+                break
+            rate = asyncio.run(sharded(uris, total, workers))
+            print('{:<20} {:>12,.0f} messages/s'.format('ShardedPool({})'.format(workers), rate))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,60 @@
+"""Messages per second and round-trip latency of the stream mode
+and the raw asyncio.Protocol mode against a loopback echo server.
+
+    PYTHONPATH=. python benchmarks/bench_transport.py
+"""
+import asyncio
+import time
+
+from aiowebsocket.converses import AioWebSocket
+from servers import EchoServerProcess
+
+
+MESSAGE = b'{"s": "BTCUSDT", "p": "42000.5"}'
+ROUND_TRIPS = 20000
+PIPELINED = 200000
+
+
+def percentile(values, fraction):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * fraction))]
+
+
+async def run(uri, raw_protocol):
+    async with AioWebSocket(uri, raw_protocol=raw_protocol) as aws:
+        converse = aws.manipulator
+        latencies = []
+        for _ in range(ROUND_TRIPS):
+            started = time.perf_counter()
+            await converse.send(MESSAGE)
+            await converse.receive()
+            latencies.append(time.perf_counter() - started)
+
+        async def produce():
+            for count in range(PIPELINED):
+                await converse.send(MESSAGE)
+                if count % 1000 == 0:
+                    await aws.writer.drain()
+
+        started = time.perf_counter()
+        producer = asyncio.ensure_future(produce())
+        for _ in range(PIPELINED):
+            await converse.receive()
+        elapsed = time.perf_counter() - started
+        await producer
+    aws.writer.close()
+    await asyncio.sleep(0.1)
+    return PIPELINED / elapsed, latencies
+
+
+async def main(uri):
+    print('{:<10} {:>12} {:>10} {:>10}'.format('mode', 'messages/s', 'p50 us', 'p99 us'))
+    for name, raw_protocol in (('stream', False), ('protocol', True)):
+        rate, latencies = await run(uri, raw_protocol)
+        print('{:<10} {:>12,.0f} {:>10.1f} {:>10.1f}'.format(
+            name, rate, percentile(latencies, 0.5) * 1e6, percentile(latencies, 0.99) * 1e6))
+
+
+if __name__ == '__main__':
+    with EchoServerProcess() as remote:
+        asyncio.run(main(remote))
@@ -0,0 +1,41 @@
+"""Measure how much memory Frames.write allocates on top of the
+payload itself when sending one large binary message.
+
+    PYTHONPATH=. python benchmarks/bench_write_memory.py
+"""
+import asyncio
+import tracemalloc
+
+from aiowebsocket.enumerations import DataFrames
+from aiowebsocket.freams import Frames
+
+
+SIZE = 50 * 2**20
+
+
+class NullWriter:
+    """Stands in for a StreamWriter whose transport sends everything at once"""
+
+    def write(self, data):
+        pass
+
+
+async def peak(payload, mask: bool):
+    frame = Frames(None, NullWriter())
+    tracemalloc.start()
+    await frame.write(fin=True, code=DataFrames.binary.value, message=payload, mask=mask)
+    _, highest = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return highest
+
+
+def main():
+    payload = bytearray(SIZE)
+    for mask in (False, True):
+        highest = asyncio.run(peak(memoryview(payload), mask))
+        print('mask={!s:<5} payload {:>4} MiB, peak extra allocation {:>8.2f} MiB'
+              .format(mask, SIZE // 2**20, highest / 2**20))
+
+
+if __name__ == '__main__':
+    main()
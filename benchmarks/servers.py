@@ -0,0 +1,102 @@
+"""A minimal loopback WebSocket echo server for the benchmarks.
+It runs on AioWebSocketServer, echoes every data frame back as it
+came (compressed frames included) and answers pings, so only the
+client side is being measured. Requesting /flood/<count>/<size> makes
+it send `count` binary messages of `size` bytes right after the
+handshake instead.
+"""
+import asyncio
+import multiprocessing
+import os
+import ssl
+import subprocess
+
+from aiowebsocket.enumerations import ControlFrames, DataFrames
+from aiowebsocket.extensions import PerMessageDeflate
+from aiowebsocket.servers import AioWebSocketServer
+
+
+async def echo(connection):
+    if connection.resource.startswith('/flood/'):
+        await flood(connection, *map(int, connection.resource.split('/')[2:4]))
+    frame, writer = connection.frame, connection.writer
+    while True:
+        # frames are echoed untouched, the client can inflate compressed ones
+        # because its compressor produced exactly the stream it expects
+        fin, code, rsv1, rsv2, rsv3, message = await frame.unpack_frame()
+        if writer.is_closing():
+            return
+        if code == ControlFrames.close:
+            await frame.receive_close(message)
+            return
+        if code == ControlFrames.ping:
+            frame.send_frame(True, ControlFrames.pong, message)
+        elif code in DataFrames._value2member_map_:
+            frame.send_frame(fin, code, message, rsv1=rsv1)
+        if not frame.frames:
+            await writer.drain()
+
+
+async def flood(connection, count: int, size: int):
+    message = os.urandom(size)
+    for _ in range(count):
+        connection.frame.send_frame(True, DataFrames.binary, message)
+        await connection.writer.drain()
+
+
+async def start_echo_server(host: str = '127.0.0.1', port: int = 0, certfile: str = None):
+    """Start the echo server, return it with the uri to connect to.
+    With a certificate it serves wss://, otherwise ws://."""
+    context = None
+    if certfile:
+        context = ssl.create_default_context(ssl.Purpose.CLIENT_AUTH)
+        context.load_cert_chain(certfile)
+    server = AioWebSocketServer(echo, host=host, port=port, ssl=context,
+                                compression=PerMessageDeflate())
+    await server.start()
+    return server, server.uri
+
+
+def self_signed_certificate(directory: str, host: str = 'localhost'):
+    """Create a certificate for `host` with the openssl command line tool,
+    return the path of the PEM file holding certificate and key"""
+    path = os.path.join(directory, 'echo.pem')
+    subprocess.run(['openssl', 'req', '-x509', '-newkey', 'rsa:2048', '-nodes', '-days', '1',
+                    '-subj', '/CN={}'.format(host), '-addext', 'subjectAltName=DNS:{}'.format(host),
+                    '-keyout', path, '-out', path + '.crt'],
+                   check=True, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    with open(path, 'a') as pem, open(path + '.crt') as crt:
+        pem.write(crt.read())
+    return path
+
+
+def _serve(queue, host, certfile):
+    async def serve():
+        server, uri = await start_echo_server(host, certfile=certfile)
+        queue.put(uri)
+        await server.serve_forever()
+    asyncio.run(serve())
+
+
+class EchoServerProcess:
+    """Run the echo server in a child process, so that the client
+    being measured has the event loop and the CPU core to itself.
+
+        with EchoServerProcess() as uri:
+            ...
+    """
+    def __init__(self, host: str = '127.0.0.1', certfile: str = None):
+        self.host = host
+        self.certfile = certfile
+        self.process = None
+
+    def __enter__(self):
+        queue = multiprocessing.Queue()
+        self.process = multiprocessing.Process(target=_serve, args=(queue, self.host, self.certfile),
+                                               daemon=True)
+        self.process.start()
+        return queue.get(timeout=10)
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.process.terminate()
+        self.process.join()
@@ -0,0 +1,230 @@
+"""Run the standard set of client benchmarks against the loopback echo
+server and write the results as JSON, so runs of different commits can
+be compared:
+
+    PYTHONPATH=. python benchmarks/suite.py --output before.json
+    PYTHONPATH=. python benchmarks/suite.py --compare before.json
+
+Every benchmark returns a flat dict of numbers. Rates are higher-is-better
+(`*_per_s`, `*_mb_s`), times and sizes lower-is-better; --compare prints
+the change of every value against the baseline file.
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+import timeit
+import tracemalloc
+
+from aiowebsocket import __version__
+from aiowebsocket.converses import AioWebSocket
+from aiowebsocket.freams import Frames, mask_into
+from servers import EchoServerProcess
+
+
+SCALES = {
+    'full': {'small': 100000, 'large': 200, 'rtt': 5000, 'handshakes': 500,
+             'flood': 200000, 'idle': 1000},
+    'quick': {'small': 10000, 'large': 20, 'rtt': 500, 'handshakes': 50,
+              'flood': 20000, 'idle': 100},
+}
+SMALL = b'{"op": "subscribe", "args": ["trade:XBTUSD"]}'
+LARGE = os.urandom(2**20)
+
+
+async def small_throughput(uri, count):
+    """Echo of small messages, sent and received concurrently"""
+    async with AioWebSocket(uri, reader_task=True) as aws:
+        converse = aws.manipulator
+
+        async def produce():
+            for _ in range(count):
+                await converse.send(SMALL)
+        started = time.perf_counter()
+        producer = asyncio.ensure_future(produce())
+        for _ in range(count):
+            await converse.receive()
+        await producer
+        elapsed = time.perf_counter() - started
+    return {'messages_per_s': count / elapsed}
+
+
+async def large_throughput(uri, count):
+    """Echo of 1 MiB messages, one at a time"""
+    async with AioWebSocket(uri, reader_task=True) as aws:
+        converse = aws.manipulator
+        started = time.perf_counter()
+        for _ in range(count):
+            await converse.send(LARGE)
+            await converse.receive()
+        elapsed = time.perf_counter() - started
+    return {'round_trip_mb_s': count * len(LARGE) / elapsed / 2**20}
+
+
+async def flood_throughput(uri, count):
+    """Receive only: the server sends binary messages as fast as it can,
+    taken as bytes by receive and as views by receive_view, queued by the
+    raw protocol and read on demand (the read_ rates)"""
+    results = {}
+    for prefix, raw_protocol in (('', True), ('read_', False)):
+        for name in ('receive', 'receive_view'):
+            aws = AioWebSocket('{}flood/{}/{}'.format(uri, count, len(SMALL)),
+                               raw_protocol=raw_protocol)
+            await aws.create_connection()
+            receive = getattr(aws.manipulator, name)
+            started = time.perf_counter()
+            for _ in range(count):
+                await receive()
+            results[prefix + name + '_per_s'] = count / (time.perf_counter() - started)
+            aws.writer.close()
+    return results
+
+
+async def round_trip(uri, count):
+    """Latency of one message echoed back, percentiles in microseconds"""
+    latencies = []
+    async with AioWebSocket(uri) as aws:
+        converse = aws.manipulator
+        for _ in range(count):
+            started = time.perf_counter()
+            await converse.send(SMALL)
+            await converse.receive()
+            latencies.append((time.perf_counter() - started) * 1e6)
+    latencies.sort()
+    return {'p50_us': latencies[len(latencies) // 2],
+            'p90_us': latencies[int(len(latencies) * 0.9)],
+            'p99_us': latencies[int(len(latencies) * 0.99)],
+            'mean_us': statistics.mean(latencies)}
+
+
+async def handshakes(uri, count):
+    """Connections opened per second, one after the other and 50 at a time"""
+    started = time.perf_counter()
+    for _ in range(count):
+        aws = AioWebSocket(uri)
+        await aws.create_connection()
+        aws.writer.close()
+    sequential = count / (time.perf_counter() - started)
+
+    async def connect():
+        aws = AioWebSocket(uri)
+        await aws.create_connection()
+        return aws
+    started = time.perf_counter()
+    for _ in range(0, count, 50):
+        for aws in await asyncio.gather(*[connect() for _ in range(50)]):
+            aws.writer.close()
+    concurrent = count // 50 * 50 / (time.perf_counter() - started)
+    return {'sequential_per_s': sequential, 'concurrent_per_s': concurrent}
+
+
+async def idle_memory(uri, count):
+    """Python heap held by an open connection nobody uses"""
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    connections = []
+    for _ in range(count):
+        aws = AioWebSocket(uri)
+        await aws.create_connection()
+        connections.append(aws)
+    used = tracemalloc.get_traced_memory()[0] - before
+    tracemalloc.stop()
+    for aws in connections:
+        aws.writer.close()
+    return {'bytes_per_connection': used / count}
+
+
+def masking():
+    """Masking and encoding cost, without any I/O"""
+    frames = Frames(None, None)
+    target = bytearray(len(LARGE))
+    results = {}
+    # one call handles a MiB or a whole small frame, so calls per second is the rate
+    for name, func in (
+            ('mask_1mib_mb_s', lambda: mask_into(target, LARGE, b'\x01\x02\x03\x04')),
+            ('encode_small_per_s', lambda: frames.encode(True, 1, SMALL)),
+            ('encode_1mib_mb_s', lambda: frames.encode(True, 2, LARGE))):
+        timer = timeit.Timer(func)
+        number, _ = timer.autorange()
+        best = min(timer.repeat(repeat=5, number=number)) / number
+        results[name] = 1 / best
+    return results
+
+
+BENCHMARKS = {
+    'small_throughput': ('small', small_throughput),
+    'large_throughput': ('large', large_throughput),
+    'flood_throughput': ('flood', flood_throughput),
+    'round_trip': ('rtt', round_trip),
+    'handshakes': ('handshakes', handshakes),
+    'idle_memory': ('idle', idle_memory),
+    'masking': (None, masking),
+}
+
+
+def environment():
+    try:
+        commit = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True,
+                                text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {'commit': commit, 'version': __version__, 'python': sys.version.split()[0],
+            'implementation': platform.python_implementation(), 'machine': platform.machine(),
+            'time': time.strftime('%Y-%m-%dT%H:%M:%S')}
+
+
+def run(names, scale):
+    counts = SCALES[scale]
+    results = {}
+    with EchoServerProcess() as uri:
+        for name in names:
+            key, benchmark = BENCHMARKS[name]
+            if key is None:
+                results[name] = benchmark()
+            else:
+                results[name] = asyncio.run(benchmark(uri, counts[key]))
+            print('{:<18} {}'.format(name, ', '.join(
+                '{}={:,.1f}'.format(k, v) for k, v in results[name].items())), flush=True)
+    return results
+
+
+def compare(results, baseline):
+    print('\n{:<36} {:>14} {:>14} {:>8}'.format('against ' + str(baseline['environment']['commit']),
+                                              'baseline', 'now', 'change'))
+    for name, values in results.items():
+        for key, value in values.items():
+            old = baseline['results'].get(name, {}).get(key)
+            if not old:
+                continue
+            print('{:<36} {:>14,.1f} {:>14,.1f} {:>+7.1f}%'.format(
+                '{}.{}'.format(name, key), old, value, (value / old - 1) * 100))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('benchmarks', nargs='*', metavar='benchmark',
+                        help='benchmarks to run, all by default: ' + ', '.join(BENCHMARKS))
+    parser.add_argument('--scale', choices=SCALES, default='full')
+    parser.add_argument('--output', help='JSON file to write the results to')
+    parser.add_argument('--compare', help='JSON file of an earlier run')
+    args = parser.parse_args()
+    for name in args.benchmarks:
+        if name not in BENCHMARKS:
+            parser.error('unknown benchmark {!r}'.format(name))
+    results = run(args.benchmarks or list(BENCHMARKS), args.scale)
+    report = {'environment': dict(environment(), scale=args.scale), 'results': results}
+    if args.output:
+        with open(args.output, 'w') as output:
+            json.dump(report, output, indent=2)
+    if args.compare:
+        with open(args.compare) as baseline:
+            compare(results, json.load(baseline))
+
+
+if __name__ == '__main__':
+    main()